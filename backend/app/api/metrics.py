@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Query
+from backend.app.core import metrics
+from backend.app.modules.journal.core.llm_ledger import ledger_llm
+from backend.app.modules.journal.core.run_report import cargar_reportes
+
+router = APIRouter()
+
+@router.get("")
+def get_metrics():
+    return metrics.snapshot()
+
+@router.get("/runs")
+def get_run_reports(limit: int = Query(10, ge=1, le=100)):
+    """Performance reports of the latest batch analyzer runs (newest first)."""
+    return cargar_reportes(limit)
+
+@router.get("/llm")
+def get_llm_usage(window_minutes: int = Query(60, ge=1, le=60 * 24 * 30)):
+    """LLM calls of the last `window_minutes`: tokens, latency, retries and 429 waits per caller and model."""
+    return ledger_llm.agregados(window_minutes * 60)
@@ -1,10 +1,11 @@
+import os
 from pathlib import Path
 
 # Raíz del proyecto (Diario/)
 BASE_DIR = Path(__file__).resolve().parents[2]
 
-# data/
-DATA_DIR = BASE_DIR / "data"
+# data/ (NEXUS_DATA_DIR lo mueve, p. ej. a un directorio temporal en los benchmarks)
+DATA_DIR = Path(os.getenv("NEXUS_DATA_DIR", BASE_DIR / "data"))
 
 # diary/
 DIARY_DIR = DATA_DIR / "diary"
@@ -29,3 +30,64 @@ FAISS_INDEX_FILE = PROCESSED_DIR / "index.faiss"
 # ── DATABASE ─────────────────────────────
 DATABASE_PATH = DATA_DIR / "diario.db"
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+
+# ── LLM (PROCESAMIENTO BATCH) ─────────────
+# Endpoint compatible con OpenAI (los benchmarks lo apuntan a un servidor local)
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+# Límites del proveedor: ajustarlos al plan de la API key usada
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "6000"))
+
+# Archivos de diario analizados en paralelo por procesar_carpeta_diarios
+ANALYZER_WORKERS = int(os.getenv("ANALYZER_WORKERS", "4"))
+
+# Análisis + chunking en una sola llamada al LLM (0 = dos llamadas separadas)
+LLM_COMBINED_EXTRACTION = os.getenv("LLM_COMBINED_EXTRACTION", "1") == "1"
+
+# Chunking: "llm", "heuristico" (offline, sin LLM) o "auto" (LLM con fallback heurístico)
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "llm")
+
+# Entradas largas: se chunkean en ventanas de párrafos solapadas, en paralelo
+CHUNKING_WINDOW_WORDS = int(os.getenv("CHUNKING_WINDOW_WORDS", "600"))
+CHUNKING_WINDOW_OVERLAP = int(os.getenv("CHUNKING_WINDOW_OVERLAP", "1"))  # párrafos
+CHUNKING_WINDOW_WORKERS = int(os.getenv("CHUNKING_WINDOW_WORKERS", "4"))
+
+# Reanálisis incremental: por debajo de esta proporción de texto cambiado
+# se reutiliza el análisis de la entrada (solo se rechunkea lo editado)
+INCREMENTAL_ANALYSIS_THRESHOLD = float(os.getenv("INCREMENTAL_ANALYSIS_THRESHOLD", "0.1"))
+
+# Entradas por commit al sincronizar la DB en el procesamiento batch
+DB_SYNC_BATCH_SIZE = int(os.getenv("DB_SYNC_BATCH_SIZE", "50"))
+
+# Caché persistente de respuestas del LLM
+LLM_CACHE_FILE = DATA_DIR / "llm_cache.db"
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "200"))
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "0") == "1"
+
+# Estado de cuota del proveedor compartido entre procesos (CLI batch + API)
+LLM_RATE_LIMIT_FILE = DATA_DIR / "llm_rate_limit.db"
+
+# Registro de cada llamada al proveedor (tokens, latencia, reintentos)
+LLM_LEDGER_FILE = DATA_DIR / "llm_ledger.db"
+LLM_LEDGER_DISABLED = os.getenv("LLM_LEDGER_DISABLED", "0") == "1"
+LLM_LEDGER_RETENTION_DAYS = int(os.getenv("LLM_LEDGER_RETENTION_DAYS", "30"))
+
+# ── COLA DE PROCESAMIENTO (API) ───────────
+# Hilos que procesan las entradas guardadas desde la API
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Segundos sin nuevos guardados de una fecha antes de procesarla (autosave)
+JOB_DEBOUNCE_SECONDS = float(os.getenv("JOB_DEBOUNCE_SECONDS", "10"))
+# Reintentos con backoff exponencial: base * 2^(intento-1) segundos
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+# Un job en curso se renueva cada tercio de esto; si su proceso muere, otro lo retoma al vencer
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# ── VIGILANCIA DE LA CARPETA DE ENTRADAS ──
+# 1 = la API vigila DIARY_ENTRIES_DIR y procesa los .md nuevos o editados
+DIARY_WATCH_ENABLED = os.getenv("DIARY_WATCH_ENABLED", "0") == "1"
+# Segundos sin eventos de un archivo antes de procesarlo
+WATCH_DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2"))
+# Intervalo del escaneo por polling cuando watchdog no está instalado
+WATCH_POLL_SECONDS = float(os.getenv("WATCH_POLL_SECONDS", "5"))
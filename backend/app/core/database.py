@@ -1,10 +1,38 @@
+import logging
+from sqlalchemy import inspect, text
 from sqlmodel import create_engine, Session, SQLModel
 from backend.app.config import DATABASE_URL
 
+logger = logging.getLogger(__name__)
+
 engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+
+def add_missing_columns():
+    """
+    Minimal migration for SQLite: create_all does not alter existing tables,
+    so nullable columns added to a model later are added with ALTER TABLE.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    logger.warning(f"Skipping NOT NULL column {table.name}.{column.name}: needs a manual migration")
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+                logger.info(f"Added column {table.name}.{column.name}")
 
 def get_session():
     with Session(engine) as session:
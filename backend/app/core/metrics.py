@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Métricas en memoria del proceso (contadores y duraciones acumuladas).
+# No reemplaza a un sistema de monitoreo externo: sirve para inspeccionar
+# el estado de la API vía /api/metrics.
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = defaultdict(int)
+_timings: Dict[str, Dict[str, float]] = {}
+_started_at = time.time()
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Incrementa un contador."""
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name: str, seconds: float) -> None:
+    """Registra una duración (en segundos) para una métrica de tiempo."""
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = {"count": 0, "total": 0.0, "max": 0.0}
+            _timings[name] = timing
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+
+def snapshot() -> Dict[str, Any]:
+    """Devuelve una copia de todas las métricas registradas."""
+    with _lock:
+        timings = {
+            name: {
+                "count": t["count"],
+                "total_s": round(t["total"], 4),
+                "avg_s": round(t["total"] / t["count"], 4) if t["count"] else 0.0,
+                "max_s": round(t["max"], 4),
+            }
+            for name, t in _timings.items()
+        }
+        return {
+            "uptime_s": round(time.time() - _started_at, 1),
+            "counters": dict(_counters),
+            "timings": timings,
+        }
+
+
+# ============================================================
+# TRAZAS POR UNIDAD DE TRABAJO
+# ============================================================
+#
+# Un span mide una etapa: siempre se registra con observe() y, si el hilo
+# tiene una traza activa (p. ej. la de la entrada que está procesando),
+# también se anota en ella. Así el analizador puede armar un reporte por
+# etapa y por entrada sin pasar la traza por cada función.
+
+_local = threading.local()
+
+
+class Traza:
+    """Duraciones por etapa, espera del LLM y tokens de una unidad de trabajo."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.etapas: Dict[str, List[float]] = defaultdict(list)
+        self.espera_llm = 0.0
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.llamadas_llm = 0
+        self._lock = threading.Lock()
+
+    def agregar(self, etapa: str, segundos: float, espera_llm: bool = False) -> None:
+        # Los hilos de chunking por ventanas comparten la traza de su entrada
+        with self._lock:
+            self.etapas[etapa].append(segundos)
+            if espera_llm:
+                self.espera_llm += segundos
+
+    def agregar_tokens(self, prompt: int, completion: int) -> None:
+        with self._lock:
+            self.tokens["prompt"] += prompt
+            self.tokens["completion"] += completion
+            self.llamadas_llm += 1
+
+    def copia(self) -> Dict[str, Any]:
+        """Copia consistente de lo registrado hasta ahora."""
+        with self._lock:
+            return {
+                "etapas": {etapa: list(d) for etapa, d in self.etapas.items()},
+                "espera_llm": self.espera_llm,
+                "tokens": dict(self.tokens),
+                "llamadas_llm": self.llamadas_llm,
+            }
+
+
+def traza_actual() -> Optional[Traza]:
+    """Traza activa en este hilo (None si no hay)."""
+    return getattr(_local, "traza", None)
+
+
+@contextmanager
+def usar_traza(traza: Optional[Traza]) -> Iterator[Optional[Traza]]:
+    """Activa `traza` en este hilo (para propagarla a hilos de un pool)."""
+    anterior = traza_actual()
+    _local.traza = traza
+    try:
+        yield traza
+    finally:
+        _local.traza = anterior
+
+
+@contextmanager
+def span(name: str, espera_llm: bool = False) -> Iterator[None]:
+    """
+    Mide la duración de una etapa. Se usa como `with` o como decorador.
+    
+    Args:
+        name: Nombre de la métrica de tiempo
+        espera_llm: True si el tiempo es espera del proveedor del LLM
+            (solicitud HTTP, limitador de tasa, backoff) y no CPU propia
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        observe(name, segundos)
+        traza = traza_actual()
+        if traza is not None:
+            traza.agregar(name, segundos, espera_llm)
+
+
+def registrar_tokens(prompt: int, completion: int) -> None:
+    """Suma los tokens de una respuesta del LLM (contadores y traza activa)."""
+    increment("llm.tokens.prompt", prompt)
+    increment("llm.tokens.completion", completion)
+    traza = traza_actual()
+    if traza is not None:
+        traza.agregar_tokens(prompt, completion)
@@ -2,7 +2,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
-from backend.app.modules.journal.api import diary, chat, stats
+from backend.app.config import DIARY_WATCH_ENABLED
+from backend.app.api import metrics
+from backend.app.modules.journal.api import diary, chat, stats, jobs, tags
 from backend.app.modules.eisenhower import router as eisenhower
 from backend.app.modules.retroplanning import router as retroplanning
 from backend.app.modules.profile import router as profile
@@ -20,14 +22,38 @@ def on_startup():
     from backend.app.modules.profile import models as profile_models
     init_db()
 
+    from backend.app.modules.journal.core.emotion_stats import asegurar_conteos
+    from backend.app.modules.journal.core.entry_tags import asegurar_tags
+    asegurar_conteos()
+    asegurar_tags()
+
+    from backend.app.modules.journal.services.job_queue import start_workers
+    start_workers()
+
+    if DIARY_WATCH_ENABLED:
+        from backend.app.modules.journal.services.diary_watcher import start_watcher
+        start_watcher()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    if DIARY_WATCH_ENABLED:
+        from backend.app.modules.journal.services.diary_watcher import stop_watcher
+        stop_watcher()
+
+    from backend.app.modules.journal.services.job_queue import stop_workers
+    stop_workers()
+
 app.add_exception_handler(Exception, global_exception_handler)
 
 app.include_router(diary.router, prefix="/api/journal/diary")
 app.include_router(chat.router, prefix="/api/journal/chat")
 app.include_router(stats.router, prefix="/api/journal/stats")
+app.include_router(jobs.router, prefix="/api/journal/jobs")
+app.include_router(tags.router, prefix="/api/journal/tags")
 app.include_router(eisenhower.router, prefix="/api/eisenhower")
 app.include_router(retroplanning.router, prefix="/api/retroplanning")
 app.include_router(profile.router, prefix="/api/profile")
+app.include_router(metrics.router, prefix="/api/metrics")
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,12 +1,39 @@
-from fastapi import APIRouter
+import asyncio
+import threading
+from fastapi import APIRouter, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from backend.app.core import metrics
+from backend.app.modules.journal.core.rag_chat_engine_api import ChatCancelledError
 from backend.app.modules.journal.services.chat_service import ask_chat
 
 router = APIRouter()
 
+# Cada cuánto se revisa si el cliente sigue conectado (segundos)
+DISCONNECT_POLL_INTERVAL = 0.5
+
 class ChatRequest(BaseModel):
     question: str
 
 @router.post("")
-def chat(req: ChatRequest):
-    return {"answer": ask_chat(req.question)}
+async def chat(req: ChatRequest, request: Request):
+    cancel_event = threading.Event()
+    task = asyncio.ensure_future(run_in_threadpool(ask_chat, req.question, cancel_event))
+
+    # Mientras la consulta corre en el threadpool, vigilar la conexión:
+    # si el cliente se fue, se cancela la recuperación y la llamada al LLM.
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            break
+        if await request.is_disconnected():
+            cancel_event.set()
+            metrics.increment("journal.chat.client_disconnected")
+            break
+
+    try:
+        answer = await task
+    except ChatCancelledError:
+        # 499: el cliente cerró la conexión (nadie va a leer esta respuesta)
+        return Response(status_code=499)
+    return {"answer": answer}
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from backend.app.modules.journal.services.diary_service import (
     save_entry,
     list_entries,
-    read_entry,
-    process_diary_entry
+    read_entry
 )
+from backend.app.modules.journal.services.job_queue import enqueue_entry
 
 router = APIRouter()
 
@@ -14,10 +14,10 @@ class DiaryEntry(BaseModel):
     date: str = None
 
 @router.post("/save")
-def save_diary(entry: DiaryEntry, background_tasks: BackgroundTasks):
+def save_diary(entry: DiaryEntry):
     date_str = save_entry(entry.text, entry.date)
-    background_tasks.add_task(process_diary_entry, entry.text, date_str)
-    return {"status": "ok", "message": "Entry saved and processing started"}
+    job_id = enqueue_entry(date_str)
+    return {"status": "ok", "message": "Entry saved and queued for processing", "job_id": job_id}
 
 @router.get("/list")
 def list_diary():
@@ -0,0 +1,19 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from backend.app.modules.journal.services.job_queue import list_jobs, get_job
+
+router = APIRouter()
+
+@router.get("")
+def jobs(status: Optional[str] = None, date: Optional[str] = None, limit: int = 50):
+    try:
+        return list_jobs(status=status, date_str=date, limit=min(max(limit, 1), 500))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+
+@router.get("/{job_id}")
+def job(job_id: int):
+    result = get_job(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return result
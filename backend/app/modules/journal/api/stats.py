@@ -1,15 +1,25 @@
 from datetime import datetime, timedelta
-import json
-from collections import Counter, defaultdict
+from typing import Optional
 from fastapi import APIRouter, HTTPException
-from backend.app.config import RAW_DIARY_JSON
+from fastapi.responses import JSONResponse
+from sqlmodel import Session
+from backend.app.core.database import engine
+from backend.app.modules.journal.core import emotion_stats, emotion_trends
 
 router = APIRouter()
 
+# Etiquetas para el frontend (Lun, Mar...)
+WEEKDAY_LABELS = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+CHART_COLORS = ["#818cf8", "#c084fc", "#60a5fa"]  # Colores que usa el front
+
 @router.get("")
 def stats():
     """
     Devuelve estadísticas agregadas y tendencias semanales.
+
+    Sale de los conteos diarios de emociones ya normalizadas
+    (core/emotion_stats.py): el costo depende de los días consultados,
+    no del tamaño del diario.
     """
     stats_data = {
         "total_entries": 0,
@@ -22,133 +32,58 @@ def stats():
         }
     }
 
-    if not RAW_DIARY_JSON.exists():
-        return stats_data
-
     try:
-        data = json.loads(RAW_DIARY_JSON.read_text(encoding="utf-8"))
-        if not isinstance(data, list):
-            return stats_data
-            
-        stats_data["total_entries"] = len(data)
-        
-        # Contadores globales
-        all_emotions = []
-        current_month = datetime.now().strftime("%Y-%m")
-        month_emotions = []
-        
-        # Estructuras para tendencias
-        today = datetime.now().date()
-        last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
-        trends_map = {d.strftime("%d-%m-%Y"): [] for d in last_7_days}
-        
-        # Etiquetas para el frontend (Lun, Mar...)
-        dias_semana_esp = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
-        stats_data["weekly_trends"]["dates"] = [dias_semana_esp[d.weekday()] for d in last_7_days]
-
-        for entry in data:
-            emotions = entry.get("emotions", [])
-            if not emotions: continue
-            if isinstance(emotions, str): emotions = [emotions]
-            
-        # Mapeo de normalización para asegurar consistencia
-        normalization_map = {
-            "felicidad": "alegría",
-            "feliz": "alegría",
-            "emocionado": "alegría",
-            "emocionante": "alegría",
-            "tranquilidad": "calma",
-            "paz": "calma",
-            "estrés": "ansiedad",
-            "nervios": "ansiedad",
-            "tristeza": "tristeza",
-            "miedo": "miedo",
-            "inseguridad": "miedo",
-            "frustración": "frustración",
-            "enojo": "enojo",
-            "aburrimiento": "aburrimiento",
-            "aburrido": "aburrimiento"
-        }
+        with Session(engine) as session:
+            total_entries = emotion_stats.contar_entradas_analizadas(session)
+            if not total_entries:
+                return stats_data
 
-        def normalize_emotion(e):
-            e = e.lower().strip()
-            return normalization_map.get(e, e)
-
-        for entry in data:
-            emotions = entry.get("emotions", [])
-            if not emotions: continue
-            if isinstance(emotions, str): emotions = [emotions]
-            
-            # Limpiar y normalizar
-            clean_emotions = [normalize_emotion(e) for e in emotions if isinstance(e, str)]
-            all_emotions.extend(clean_emotions)
-            
-            entry_date_str = entry.get("fecha") 
-            if entry_date_str:
-                fecha_obj = None
-                # Intentar format YYYY-MM-DD (nuevo standard)
-                try:
-                    fecha_obj = datetime.strptime(entry_date_str, "%Y-%m-%d")
-                except ValueError:
-                    # Intentar DD-MM-YYYY (legacy posible)
-                    try:
-                        fecha_obj = datetime.strptime(entry_date_str, "%d-%m-%Y")
-                    except ValueError:
-                        pass
-                
-                if fecha_obj:
-                    # Mes actual
-                    if fecha_obj.strftime("%Y-%m") == current_month:
-                        month_emotions.extend(clean_emotions)
-                        
-                    # Tendencias (si está en los últimos 7 días)
-                    # Convertir fecha_obj a DD-MM-YYYY para machear con keys de trends_map
-                    key_date = fecha_obj.strftime("%d-%m-%Y")
-                    if key_date in trends_map:
-                        trends_map[key_date].extend(clean_emotions)
-
-        # Calcular frecuencias globales
-        counter_global = Counter(all_emotions)
-        stats_data["emotion_counts"] = dict(counter_global)
-        
-        # Calcular frecuencias de los últimos 7 días para el gráfico
-        recent_emotions = []
-        for ems in trends_map.values():
-            recent_emotions.extend(ems)
-        counter_recent = Counter(recent_emotions)
+            today = datetime.now().date()
+            last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
 
-        # Usar las top 3 recientes para el gráfico si existen, si no las globales
-        chart_emotions = [e[0] for e in counter_recent.most_common(3)]
-        if not chart_emotions:
-            chart_emotions = [e[0] for e in counter_global.most_common(3)]
-        
+            month_start = today.replace(day=1)
+            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+            # Todas en orden de primera mención: empates como Counter.most_common
+            global_counts = emotion_stats.totales(session)
+            month_counts = emotion_stats.conteos_en_rango(session, month_start, month_end)
+            recent_counts = emotion_stats.conteos_en_rango(session, last_7_days[0], today)
+            daily_rows = emotion_stats.conteos_por_dia(session, last_7_days[0], today)
+
+        stats_data["total_entries"] = total_entries
+        stats_data["emotion_counts"] = global_counts
         stats_data["top_emotions"] = [
-            {"name": k, "value": v} 
-            for k, v in counter_global.most_common(5)
+            {"name": k, "value": v}
+            for k, v in emotion_stats.mas_frecuentes(global_counts, 5)
+        ]
+        stats_data["month_emotions"] = month_counts
+        stats_data["weekly_trends"]["dates"] = [WEEKDAY_LABELS[d.weekday()] for d in last_7_days]
+
+        # Conteos de los últimos 7 días: por (día, emoción) y total por día
+        per_day = {}
+        day_totals = {d: 0 for d in last_7_days}
+        for day, emotion, count in daily_rows:
+            per_day[(day, emotion)] = count
+            day_totals[day] += count
+
+        # Usar las top 3 recientes para el gráfico si existen, si no las globales
+        chart_emotions = [
+            e for e, _ in (emotion_stats.mas_frecuentes(recent_counts, 3) or emotion_stats.mas_frecuentes(global_counts, 3))
         ]
-        stats_data["month_emotions"] = dict(Counter(month_emotions))
 
-        # Construir datasets para el gráfico
         datasets = []
-        colores = ["#818cf8", "#c084fc", "#60a5fa"] # Colores que usa el front
-        
         for i, emotion in enumerate(chart_emotions):
-            data_points = []
-            for date_obj in last_7_days:
-                date_str = date_obj.strftime("%d-%m-%Y")
-                # Contar ocurrencias de ESTA emoción en ESTE día
-                count = trends_map[date_str].count(emotion)
-                # Normalizar: porcentaje sobre el TOTAL de emociones de ese día
-                total_day = len(trends_map[date_str])
-                val = (count / total_day * 100) if total_day > 0 else 0
-                data_points.append(round(val))
-            
+            # Porcentaje sobre el TOTAL de emociones de cada día
+            data_points = [
+                round(per_day.get((day, emotion), 0) / day_totals[day] * 100) if day_totals[day] else 0
+                for day in last_7_days
+            ]
             datasets.append({
                 "label": emotion.capitalize(),
                 "data": data_points,
-                "borderColor": colores[i % len(colores)],
+                "borderColor": CHART_COLORS[i % len(CHART_COLORS)],
             })
-            
+
         stats_data["weekly_trends"]["datasets"] = datasets
 
     except Exception as e:
@@ -156,3 +91,37 @@ def stats():
         raise HTTPException(status_code=500, detail=str(e))
 
     return stats_data
+
+@router.get("/trends")
+def trends(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    granularity: str = "week",
+    window: int = 1,
+    top_k: int = 3
+):
+    """
+    Evolución de las emociones en un rango arbitrario (por defecto, el
+    último año): proporción por día/semana/mes, media móvil de `window`
+    buckets y top-k de cada bucket (ver core/emotion_trends.py).
+    """
+    try:
+        end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else datetime.now().date()
+        start_date = datetime.strptime(start, "%Y-%m-%d").date() if start else end_date - timedelta(days=365)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+    if granularity not in emotion_trends.GRANULARIDADES:
+        raise HTTPException(status_code=400, detail=f"Invalid granularity, expected one of: {', '.join(emotion_trends.GRANULARIDADES)}")
+
+    try:
+        with Session(engine) as session:
+            result = emotion_trends.tendencias(
+                session, start_date, end_date, granularidad=granularity,
+                ventana=min(max(window, 1), 365), top_k=min(max(top_k, 1), 20)
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Ya son tipos JSON nativos: sin pasar por jsonable_encoder, que recorre
+    # cada valor (miles de buckets en rangos de años por día)
+    return JSONResponse(content=result)
@@ -0,0 +1,49 @@
+from datetime import date, datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from sqlmodel import Session
+from backend.app.core.database import engine
+from backend.app.modules.journal.core import entry_tags
+
+router = APIRouter()
+
+def _check_kind(kind: str):
+    if kind not in entry_tags.TIPOS_TAG:
+        raise HTTPException(status_code=400, detail=f"Invalid tag kind, expected one of: {', '.join(entry_tags.TIPOS_TAG)}")
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date, expected YYYY-MM-DD")
+
+@router.get("/{kind}")
+def tag_counts(kind: str, start: Optional[str] = None, end: Optional[str] = None, limit: int = 20):
+    """Entries mentioning each normalized value of a tag kind (emotion, topic, person)."""
+    _check_kind(kind)
+    start_date, end_date = _parse_date(start), _parse_date(end)
+    with Session(engine) as session:
+        counts = entry_tags.entradas_por_valor(
+            session, kind, desde=start_date, hasta=end_date, limite=min(max(limit, 1), 500)
+        )
+    return {
+        "kind": kind,
+        "counts": [{"name": k, "value": v} for k, v in counts.items()]
+    }
+
+@router.get("/{kind}/{value}")
+def tag_dates(kind: str, value: str, start: Optional[str] = None, end: Optional[str] = None):
+    """Dates whose analysis mentions a value; it is normalized like on write ("Feliz" finds "alegría")."""
+    _check_kind(kind)
+    start_date, end_date = _parse_date(start), _parse_date(end)
+    with Session(engine) as session:
+        dates = entry_tags.fechas_con_tag(session, kind, value, desde=start_date, hasta=end_date)
+        variants = entry_tags.variantes(session, kind, value)
+    return {
+        "kind": kind,
+        "value": entry_tags.normalizar_tag(kind, value),
+        "variants": variants,
+        "dates": [d.isoformat() for d in dates]
+    }
@@ -0,0 +1,326 @@
+"""
+Log de Análisis del Diario (append-only)
+---------------------------------------
+Reemplaza la reescritura completa de diario.json en cada entrada por un
+archivo JSONL al que solo se agregan líneas, más un índice fecha → offset.
+
+- Guardar un análisis cuesta O(1): una línea al final del archivo.
+- Re-guardar una fecha agrega una versión nueva; al leer gana la última
+  (upsert por fecha). `compactar` descarta las versiones viejas.
+- La vista JSON legacy (lista de análisis) se genera bajo demanda.
+
+Uso:
+    python -m backend.app.modules.journal.core.analysis_log compactar
+    python -m backend.app.modules.journal.core.analysis_log exportar
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_fecha(fecha: str) -> str:
+    """
+    Normaliza una fecha (yyyy-mm-dd o dd-mm-yyyy) a ISO yyyy-mm-dd,
+    para que ambos formatos históricos apunten a la misma entrada.
+    """
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(fecha, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return fecha
+
+
+# ============================================================
+# CLASE PRINCIPAL
+# ============================================================
+
+class AnalysisLog:
+    """
+    Log JSONL de análisis con índice de offsets por fecha.
+
+    El índice se persiste en `<log>.idx` junto con el tamaño del log que
+    cubre; al abrir solo se escanea la cola escrita después de ese punto.
+    """
+
+    def __init__(self, ruta_log: Path, ruta_json_legacy: Optional[Path] = None):
+        self.ruta_log = Path(ruta_log)
+        self.ruta_indice = self.ruta_log.with_name(self.ruta_log.name + ".idx")
+        self._lock = threading.Lock()
+        self._indice: Dict[str, int] = {}
+        self._cubierto = 0  # bytes del log ya reflejados en el índice
+        self._inodo: Optional[int] = None
+        self._cargado = False
+        self._ruta_json_legacy = Path(ruta_json_legacy) if ruta_json_legacy else None
+
+    # --------------------------------------------------------
+
+    def _asegurar_cargado(self) -> None:
+        """
+        Carga el índice la primera vez y lo pone al día si otro proceso
+        agregó líneas (crece el archivo) o compactó el log (cambia el inodo).
+        """
+        inodo = self._inodo_log()
+        if self._cargado and inodo == self._inodo:
+            if self._tamano_log() > self._cubierto:
+                self._escanear_desde(self._cubierto)
+            return
+
+        self._indice = {}
+        self._cubierto = 0
+
+        if not self.ruta_log.exists():
+            self._importar_legacy()
+
+        if self.ruta_indice.exists():
+            try:
+                datos = json.loads(self.ruta_indice.read_text(encoding="utf-8"))
+                if datos.get("size", 0) <= self._tamano_log():
+                    self._indice = datos["offsets"]
+                    self._cubierto = datos["size"]
+            except (ValueError, KeyError):
+                logger.warning(f"Índice {self.ruta_indice} inválido, reconstruyendo")
+                self._indice = {}
+
+        if self._escanear_desde(self._cubierto):
+            self._guardar_indice()
+
+        self._inodo = self._inodo_log()
+        self._cargado = True
+
+    def _tamano_log(self) -> int:
+        return self.ruta_log.stat().st_size if self.ruta_log.exists() else 0
+
+    def _inodo_log(self) -> Optional[int]:
+        return self.ruta_log.stat().st_ino if self.ruta_log.exists() else None
+
+    def _escanear_desde(self, offset: int) -> int:
+        """Indexa las líneas a partir de `offset`. Devuelve cuántas leyó."""
+        if not self.ruta_log.exists():
+            return 0
+
+        leidas = 0
+        with open(self.ruta_log, "rb") as f:
+            f.seek(offset)
+            while True:
+                posicion = f.tell()
+                linea = f.readline()
+                if not linea:
+                    break
+                if not linea.endswith(b"\n"):
+                    # Línea incompleta de una escritura interrumpida
+                    logger.warning(f"Ignorando línea incompleta al final de {self.ruta_log}")
+                    break
+                self._cubierto = f.tell()
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    logger.warning(f"Línea inválida en {self.ruta_log} (offset {posicion})")
+                    continue
+                fecha = registro.get("fecha")
+                if fecha:
+                    self._indice[normalizar_fecha(fecha)] = posicion
+                leidas += 1
+        return leidas
+
+    def _guardar_indice(self) -> None:
+        temporal = self.ruta_indice.with_name(self.ruta_indice.name + ".tmp")
+        temporal.write_text(
+            json.dumps({"size": self._cubierto, "offsets": self._indice}),
+            encoding="utf-8"
+        )
+        os.replace(temporal, self.ruta_indice)
+
+    def _importar_legacy(self) -> None:
+        """Migra un diario.json existente al log la primera vez."""
+        ruta = self._ruta_json_legacy
+        if ruta is None or not ruta.exists():
+            return
+
+        try:
+            historial = json.loads(ruta.read_text(encoding="utf-8") or "[]")
+        except ValueError as e:
+            logger.error(f"No se pudo importar {ruta} al log de análisis: {e}")
+            return
+
+        if not isinstance(historial, list):
+            return
+
+        logger.info(f"Importando {len(historial)} análisis desde {ruta} a {self.ruta_log}")
+        self.ruta_log.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.ruta_log, "ab") as f:
+            for registro in historial:
+                if isinstance(registro, dict) and registro.get("fecha"):
+                    f.write(self._serializar(registro))
+
+    @staticmethod
+    def _serializar(registro: Dict[str, Any]) -> bytes:
+        return (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+
+    # --------------------------------------------------------
+
+    def upsert(self, analisis: Dict[str, Any]) -> None:
+        """Agrega la versión más reciente del análisis de una fecha."""
+        fecha = analisis.get("fecha")
+        if not fecha:
+            raise ValueError("El análisis no tiene 'fecha'")
+
+        with self._lock:
+            self._asegurar_cargado()
+            self.ruta_log.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.ruta_log, "ab") as f:
+                posicion = f.tell()
+                f.write(self._serializar(analisis))
+                f.flush()
+                os.fsync(f.fileno())
+                fin = f.tell()
+            if posicion == self._cubierto:
+                self._indice[normalizar_fecha(fecha)] = posicion
+                self._cubierto = fin
+            else:
+                # Otro proceso escribió entre medio: reindexar la cola
+                self._escanear_desde(self._cubierto)
+            self._inodo = self._inodo_log()
+
+    def obtener(self, fecha: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el último análisis guardado para una fecha."""
+        with self._lock:
+            self._asegurar_cargado()
+            posicion = self._indice.get(normalizar_fecha(fecha))
+            if posicion is None:
+                return None
+            return self._leer_en(posicion)
+
+    def _leer_en(self, posicion: int) -> Dict[str, Any]:
+        with open(self.ruta_log, "rb") as f:
+            f.seek(posicion)
+            return json.loads(f.readline())
+
+    def fechas(self) -> Set[str]:
+        """Fechas (ISO yyyy-mm-dd) con al menos un análisis."""
+        with self._lock:
+            self._asegurar_cargado()
+            return set(self._indice)
+
+    def todos(self) -> List[Dict[str, Any]]:
+        """Última versión de cada análisis, en orden de escritura."""
+        with self._lock:
+            self._asegurar_cargado()
+            if not self._indice:
+                return []
+            vigentes = set(self._indice.values())
+            registros = []
+            with open(self.ruta_log, "rb") as f:
+                for posicion in sorted(vigentes):
+                    f.seek(posicion)
+                    registros.append(json.loads(f.readline()))
+            return registros
+
+    # --------------------------------------------------------
+
+    def compactar(self) -> int:
+        """
+        Reescribe el log dejando solo la última versión de cada fecha.
+
+        Returns:
+            Cantidad de registros descartados
+        """
+        with self._lock:
+            self._asegurar_cargado()
+            if not self.ruta_log.exists():
+                return 0
+
+            total = 0
+            with open(self.ruta_log, "rb") as f:
+                for _ in f:
+                    total += 1
+
+            temporal = self.ruta_log.with_name(self.ruta_log.name + ".tmp")
+            nuevo_indice = {}
+            with open(self.ruta_log, "rb") as origen, open(temporal, "wb") as destino:
+                for fecha, posicion in sorted(self._indice.items(), key=lambda x: x[1]):
+                    origen.seek(posicion)
+                    nuevo_indice[fecha] = destino.tell()
+                    destino.write(origen.readline())
+                destino.flush()
+                os.fsync(destino.fileno())
+            os.replace(temporal, self.ruta_log)
+
+            self._indice = nuevo_indice
+            self._cubierto = self._tamano_log()
+            self._inodo = self._inodo_log()
+            self._guardar_indice()
+
+            descartados = total - len(nuevo_indice)
+            logger.info(f"Log compactado: {len(nuevo_indice)} análisis, {descartados} versiones descartadas")
+            return descartados
+
+    def exportar_json(self, ruta_json: Path) -> int:
+        """
+        Genera la vista legacy (lista JSON de análisis) bajo demanda.
+
+        Returns:
+            Cantidad de análisis exportados
+        """
+        registros = self.todos()
+        ruta_json = Path(ruta_json)
+        temporal = ruta_json.with_name(ruta_json.name + ".tmp")
+        temporal.write_text(
+            json.dumps(registros, indent=2, ensure_ascii=False),
+            encoding="utf-8"
+        )
+        os.replace(temporal, ruta_json)
+        logger.info(f"Vista JSON exportada en {ruta_json} ({len(registros)} análisis)")
+        return len(registros)
+
+
+# ============================================================
+# REGISTRO DE LOGS POR RUTA
+# ============================================================
+
+_logs: Dict[Path, AnalysisLog] = {}
+_logs_lock = threading.Lock()
+
+
+def obtener_log_analisis(ruta_json: Path) -> AnalysisLog:
+    """
+    Devuelve el log asociado a la ruta legacy `diario.json`
+    (vive al lado, como `diario.jsonl`). Una instancia por ruta y proceso.
+    """
+    ruta_json = Path(ruta_json).resolve()
+    with _logs_lock:
+        log = _logs.get(ruta_json)
+        if log is None:
+            log = AnalysisLog(ruta_json.with_suffix(".jsonl"), ruta_json_legacy=ruta_json)
+            _logs[ruta_json] = log
+        return log
+
+
+# ============================================================
+# EJECUCIÓN DIRECTA
+# ============================================================
+
+if __name__ == "__main__":
+    import sys
+    from backend.app.config import RAW_DIARY_JSON
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    comando = sys.argv[1] if len(sys.argv) > 1 else "compactar"
+    log = obtener_log_analisis(RAW_DIARY_JSON)
+
+    if comando == "compactar":
+        log.compactar()
+    elif comando == "exportar":
+        log.exportar_json(RAW_DIARY_JSON)
+    else:
+        print("Uso: python -m backend.app.modules.journal.core.analysis_log [compactar|exportar]")
+        sys.exit(1)
@@ -0,0 +1,392 @@
+"""
+Almacén de Chunks del Diario
+----------------------------
+Reemplaza el chunks.json que crecía con cada guardado por una tabla
+SQLite con clave `chunk_id` (ver generar_id_chunk).
+
+- Guardar los chunks de una entrada es un upsert: reemplaza sus chunks
+  anteriores y elimina los que ya no existen, en una sola transacción.
+- Cada fila tiene un `id` entero estable que se usa como ID del vector
+  en FAISS, y un hash del contenido. Así el indexador puede consumir
+  solo el delta: chunks nuevos o modificados y vectores a eliminar.
+- Los chunks con offsets (`start_offset`/`end_offset` sobre el texto
+  analizado de su entrada) se guardan sin su texto, que se materializa
+  al leer recortando el texto de la entrada. Llevan `source_hash`, el
+  hash del texto sobre el que se calcularon los offsets: si la entrada
+  se editó y todavía no se reprocesó, se recorta la versión analizada
+  (ver entry_texts) y, si no está, el chunk se marca `stale`.
+- El chunks.json legacy se genera bajo demanda.
+
+Uso:
+    python -m backend.app.modules.journal.core.chunk_store exportar
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+def hash_chunk(chunk: Dict[str, Any]) -> str:
+    """Hash del contenido que determina el embedding de un chunk."""
+    return hashlib.sha256(chunk.get("text", "").encode("utf-8")).hexdigest()
+
+
+def hash_texto(texto: str) -> str:
+    """Hash del texto completo de una entrada (el `source_hash` de sus chunks)."""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+# ============================================================
+# TEXTO POR OFFSETS
+# ============================================================
+
+def texto_de_rango(texto_entrada: str, inicio: int, fin: int) -> str:
+    """Texto de un chunk a partir de sus offsets en el texto de la entrada."""
+    return texto_entrada[inicio:fin].strip()
+
+
+def tiene_offsets(chunk: Dict[str, Any]) -> bool:
+    return chunk.get("start_offset") is not None and chunk.get("end_offset") is not None
+
+
+def sin_texto(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Copia para persistir: sin `text` si se puede reconstruir desde los offsets."""
+    if not tiene_offsets(chunk):
+        return chunk
+    return {k: v for k, v in chunk.items() if k not in ("text", "stale")}
+
+
+def materializar_textos(
+    chunks: List[Dict[str, Any]],
+    cargar_textos: Callable[[Dict[str, Optional[str]]], Dict[str, str]]
+) -> List[Dict[str, Any]]:
+    """
+    Completa (in place) el `text` de los chunks guardados solo con offsets.
+    Los textos de las entradas se cargan una sola vez para todo el lote.
+
+    `cargar_textos` recibe {entry_id: source_hash} y devuelve, por
+    entrada, el texto con ese hash si lo tiene. Los chunks cuyo texto no
+    coincide con su `source_hash` (o sin texto de entrada) quedan con
+    `text` vacío y `stale=True`: quien los use los descarta en lugar de
+    recortar offsets viejos sobre un texto nuevo.
+    """
+    faltantes = [c for c in chunks if "text" not in c and tiene_offsets(c)]
+    if not faltantes:
+        return chunks
+
+    pedidos: Dict[str, Optional[str]] = {}
+    for chunk in faltantes:
+        pedidos.setdefault(chunk["entry_id"], chunk.get("source_hash"))
+    textos = cargar_textos(pedidos)
+
+    hashes: Dict[str, str] = {}
+    desactualizadas = set()
+    for chunk in faltantes:
+        entry_id = chunk["entry_id"]
+        texto_entrada = textos.get(entry_id)
+        esperado = chunk.get("source_hash")
+        if texto_entrada is not None and esperado is not None:
+            if entry_id not in hashes:
+                hashes[entry_id] = hash_texto(texto_entrada)
+            if hashes[entry_id] != esperado:
+                texto_entrada = None
+
+        if texto_entrada is None:
+            desactualizadas.add(entry_id)
+            chunk["text"] = ""
+            chunk["stale"] = True
+        else:
+            chunk["text"] = texto_de_rango(texto_entrada, chunk["start_offset"], chunk["end_offset"])
+
+    if desactualizadas:
+        logger.warning(
+            f"Sin el texto analizado de {len(desactualizadas)} entradas "
+            f"(p. ej. {min(desactualizadas)}): sus chunks quedan fuera hasta reprocesarlas"
+        )
+    return chunks
+
+
+# ============================================================
+# CLASE PRINCIPAL
+# ============================================================
+
+class ChunkStore:
+    """
+    Chunks persistidos por chunk_id, con seguimiento de qué falta indexar.
+    Una misma instancia puede usarse desde varios hilos.
+    """
+
+    def __init__(
+        self,
+        ruta_db: Path,
+        ruta_json_legacy: Optional[Path] = None,
+        cargar_textos: Optional[Callable[[Dict[str, Optional[str]]], Dict[str, str]]] = None
+    ):
+        self.ruta_db = Path(ruta_db)
+        self._ruta_json_legacy = Path(ruta_json_legacy) if ruta_json_legacy else None
+        self._cargar_textos = cargar_textos
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # --------------------------------------------------------
+
+    def _conexion(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+
+        nueva = not self.ruta_db.exists()
+        self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.ruta_db), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chunk_id TEXT NOT NULL UNIQUE,
+                entry_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                embedded_hash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_chunks_entry_id ON chunks (entry_id);
+
+            -- IDs de vectores que siguen en el índice FAISS pero ya no en el almacén
+            CREATE TABLE IF NOT EXISTS removed_vectors (
+                id INTEGER PRIMARY KEY
+            );
+        """)
+        conn.commit()
+        self._conn = conn
+
+        if nueva:
+            self._importar_legacy()
+        return conn
+
+    def _importar_legacy(self) -> None:
+        """Migra un chunks.json existente la primera vez (sin duplicados)."""
+        ruta = self._ruta_json_legacy
+        if ruta is None or not ruta.exists():
+            return
+
+        try:
+            chunks = json.loads(ruta.read_text(encoding="utf-8") or "[]")
+        except ValueError as e:
+            logger.error(f"No se pudo importar {ruta} al almacén de chunks: {e}")
+            return
+
+        por_entrada: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for chunk in chunks:
+            if isinstance(chunk, dict) and chunk.get("chunk_id") and chunk.get("entry_id"):
+                por_entrada.setdefault(chunk["entry_id"], {})[chunk["chunk_id"]] = chunk
+
+        logger.info(f"Importando {len(chunks)} chunks desde {ruta} a {self.ruta_db}")
+        self._reemplazar(
+            {eid: list(por_id.values()) for eid, por_id in por_entrada.items()}
+        )
+
+    # --------------------------------------------------------
+
+    def reemplazar_entradas(self, chunks_por_entrada: Dict[str, List[Dict[str, Any]]]) -> None:
+        """
+        Upsert de los chunks de varias entradas en una transacción.
+        Los chunks previos de esas entradas que no vienen en la lista se eliminan.
+        """
+        with self._lock:
+            self._conexion()
+            self._reemplazar(chunks_por_entrada)
+
+    def reemplazar_entrada(self, entry_id: str, chunks: List[Dict[str, Any]]) -> None:
+        self.reemplazar_entradas({entry_id: chunks})
+
+    def eliminar_entrada(self, entry_id: str) -> None:
+        self.reemplazar_entradas({entry_id: []})
+
+    def _reemplazar(self, chunks_por_entrada: Dict[str, List[Dict[str, Any]]]) -> None:
+        conn = self._conn
+        with conn:
+            for entry_id, chunks in chunks_por_entrada.items():
+                nuevos = {c["chunk_id"] for c in chunks}
+                sobrantes = [
+                    (fila_id,)
+                    for fila_id, chunk_id in conn.execute(
+                        "SELECT id, chunk_id FROM chunks WHERE entry_id = ?", (entry_id,)
+                    )
+                    if chunk_id not in nuevos
+                ]
+                conn.executemany("INSERT OR IGNORE INTO removed_vectors (id) VALUES (?)", sobrantes)
+                conn.executemany("DELETE FROM chunks WHERE id = ?", sobrantes)
+
+                conn.executemany(
+                    """
+                    INSERT INTO chunks (chunk_id, entry_id, chunk_index, data, content_hash)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(chunk_id) DO UPDATE SET
+                        entry_id = excluded.entry_id,
+                        chunk_index = excluded.chunk_index,
+                        data = excluded.data,
+                        content_hash = excluded.content_hash
+                    """,
+                    [
+                        (
+                            c["chunk_id"],
+                            entry_id,
+                            c.get("index", 0),
+                            json.dumps(sin_texto(c), ensure_ascii=False),
+                            hash_chunk(c),
+                        )
+                        for c in chunks
+                    ]
+                )
+
+    # --------------------------------------------------------
+
+    def todos(self) -> List[Dict[str, Any]]:
+        """Todos los chunks, ordenados por entrada e índice, con su `vector_id`."""
+        with self._lock:
+            conn = self._conexion()
+            filas = conn.execute(
+                "SELECT id, data FROM chunks ORDER BY entry_id, chunk_index"
+            ).fetchall()
+        return self._materializar([self._con_vector_id(fila_id, data) for fila_id, data in filas])
+
+    def de_entrada(self, entry_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            conn = self._conexion()
+            filas = conn.execute(
+                "SELECT id, data FROM chunks WHERE entry_id = ? ORDER BY chunk_index",
+                (entry_id,)
+            ).fetchall()
+        return self._materializar([self._con_vector_id(fila_id, data) for fila_id, data in filas])
+
+    def _materializar(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self._cargar_textos is None:
+            return chunks
+        return materializar_textos(chunks, self._cargar_textos)
+
+    @staticmethod
+    def _con_vector_id(fila_id: int, data: str) -> Dict[str, Any]:
+        chunk = json.loads(data)
+        chunk["vector_id"] = fila_id
+        return chunk
+
+    def contar(self) -> int:
+        with self._lock:
+            return self._conexion().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    # --------------------------------------------------------
+
+    def delta(self) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Cambios pendientes de indexar.
+
+        Returns:
+            Tupla (chunks nuevos o modificados con su vector_id,
+                   IDs de vectores a eliminar del índice)
+        """
+        with self._lock:
+            conn = self._conexion()
+            pendientes = conn.execute(
+                """
+                SELECT id, data FROM chunks
+                WHERE embedded_hash IS NULL OR embedded_hash != content_hash
+                ORDER BY id
+                """
+            ).fetchall()
+            eliminados = [fila[0] for fila in conn.execute("SELECT id FROM removed_vectors")]
+        return self._materializar([self._con_vector_id(i, d) for i, d in pendientes]), eliminados
+
+    def confirmar_indexado(
+        self,
+        indexados: Iterable[Dict[str, Any]],
+        eliminados: Iterable[int]
+    ) -> None:
+        """Marca como aplicado al índice un delta obtenido con `delta()`."""
+        with self._lock:
+            conn = self._conexion()
+            with conn:
+                conn.executemany(
+                    "UPDATE chunks SET embedded_hash = ? WHERE id = ?",
+                    [(hash_chunk(c), c["vector_id"]) for c in indexados]
+                )
+                conn.executemany(
+                    "DELETE FROM removed_vectors WHERE id = ?",
+                    [(i,) for i in eliminados]
+                )
+
+    def marcar_todo_pendiente(self) -> None:
+        """Fuerza a reindexar todo (p. ej. si el índice FAISS se perdió)."""
+        with self._lock:
+            conn = self._conexion()
+            with conn:
+                conn.execute("UPDATE chunks SET embedded_hash = NULL")
+                conn.execute("DELETE FROM removed_vectors")
+
+    # --------------------------------------------------------
+
+    def exportar_json(self, ruta_json: Path) -> int:
+        """Genera el chunks.json legacy bajo demanda."""
+        chunks = self.todos()
+        for chunk in chunks:
+            chunk.pop("vector_id", None)
+        ruta_json = Path(ruta_json)
+        temporal = ruta_json.with_name(ruta_json.name + ".tmp")
+        temporal.write_text(json.dumps(chunks, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(temporal, ruta_json)
+        logger.info(f"Chunks exportados en {ruta_json} ({len(chunks)})")
+        return len(chunks)
+
+
+# ============================================================
+# REGISTRO DE ALMACENES POR RUTA
+# ============================================================
+
+_stores: Dict[Path, ChunkStore] = {}
+_stores_lock = threading.Lock()
+
+
+def obtener_chunk_store(ruta_chunks: Path) -> ChunkStore:
+    """
+    Devuelve el almacén asociado a la ruta legacy `chunks.json`
+    (vive al lado, como `chunks.db`). Una instancia por ruta y proceso.
+    Los textos de los chunks con offsets se toman de JournalEntry (o del
+    log de análisis si la entrada cambió desde que se analizó).
+    """
+    from backend.app.modules.journal.core.entry_texts import cargar_textos_de_entradas
+
+    ruta_chunks = Path(ruta_chunks).resolve()
+    with _stores_lock:
+        store = _stores.get(ruta_chunks)
+        if store is None:
+            store = ChunkStore(
+                ruta_chunks.with_suffix(".db"),
+                ruta_json_legacy=ruta_chunks,
+                cargar_textos=cargar_textos_de_entradas
+            )
+            _stores[ruta_chunks] = store
+        return store
+
+
+# ============================================================
+# EJECUCIÓN DIRECTA
+# ============================================================
+
+if __name__ == "__main__":
+    import sys
+    from backend.app.config import CHUNKS_FILE
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    comando = sys.argv[1] if len(sys.argv) > 1 else "exportar"
+    if comando == "exportar":
+        obtener_chunk_store(CHUNKS_FILE).exportar_json(CHUNKS_FILE)
+    else:
+        print("Uso: python -m backend.app.modules.journal.core.chunk_store exportar")
+        sys.exit(1)
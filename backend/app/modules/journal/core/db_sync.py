@@ -0,0 +1,195 @@
+"""
+Sincronización en Lote con la Base de Datos
+-------------------------------------------
+Persiste en SQLite los análisis y chunks de un lote de entradas con una
+sola sesión y un solo commit:
+
+1. Resuelve los IDs de todas las JournalEntry del lote en una consulta
+   (crea las que faltan; el texto de las existentes no se toca).
+2. Borra los EntryAnalysis / EntryChunk viejos con un único
+   `DELETE ... WHERE entry_id IN (...)`.
+3. Inserta las filas nuevas con add_all y actualiza los conteos diarios
+   de emociones de esos días (ver emotion_stats) y las etiquetas
+   normalizadas de esas entradas (ver entry_tags).
+
+Así una importación grande no queda dominada por round-trips y fsyncs.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from backend.app.core.database import engine
+from backend.app.modules.journal.models import JournalEntry, EntryAnalysis, EntryChunk
+from backend.app.modules.journal.core.chunk_store import sin_texto
+from backend.app.modules.journal.core.emotion_stats import actualizar_conteos
+from backend.app.modules.journal.core.entry_tags import actualizar_tags
+from backend.app.modules.journal.core.entry_texts import fecha_de_entry_id
+
+
+logger = logging.getLogger(__name__)
+
+# Límite prudente de parámetros por consulta en SQLite
+_LOTE_IN = 500
+
+
+def _fecha(fecha: str) -> Optional[date]:
+    """Fecha de un análisis (yyyy-mm-dd o dd-mm-yyyy)."""
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(fecha, fmt).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _en_lotes(valores: List[Any]) -> Iterable[List[Any]]:
+    for i in range(0, len(valores), _LOTE_IN):
+        yield valores[i:i + _LOTE_IN]
+
+
+# ============================================================
+# RESOLUCIÓN DE ENTRADAS
+# ============================================================
+
+def resolver_entradas(
+    session: Session,
+    fechas: Iterable[date],
+    textos: Dict[date, str]
+) -> Dict[date, int]:
+    """
+    Devuelve {fecha: JournalEntry.id} para las fechas pedidas.
+
+    Las entradas que no existen se crean si hay texto para ellas. Las que
+    existen conservan su texto aunque el analizado sea otro: puede ser
+    una versión anterior a un guardado posterior (el job de ese guardado
+    ya está en cola), y los offsets de los chunks se resuelven contra el
+    texto analizado del log (ver entry_texts). No hace commit.
+    """
+    fechas = list(set(fechas))
+    entradas: Dict[date, JournalEntry] = {}
+    for lote in _en_lotes(fechas):
+        for entrada in session.exec(select(JournalEntry).where(JournalEntry.date.in_(lote))):
+            entradas[entrada.date] = entrada
+
+    nuevas = []
+    for fecha in fechas:
+        texto = textos.get(fecha)
+        entrada = entradas.get(fecha)
+        if entrada is None:
+            if texto is None:
+                logger.warning(f"Entrada {fecha} no existe en la DB y no hay texto para crearla")
+                continue
+            entrada = JournalEntry(
+                date=fecha,
+                raw_text=texto,
+                word_count=len(texto.split()),
+                char_count=len(texto)
+            )
+            nuevas.append(entrada)
+            entradas[fecha] = entrada
+
+    if nuevas:
+        session.add_all(nuevas)
+    session.flush()  # asigna los IDs de las nuevas
+
+    return {fecha: entrada.id for fecha, entrada in entradas.items()}
+
+
+# ============================================================
+# SINCRONIZACIÓN DEL LOTE
+# ============================================================
+
+def sincronizar_lote(
+    analisis: List[Dict[str, Any]],
+    chunks: List[Dict[str, Any]]
+) -> None:
+    """
+    Reemplaza en la DB los análisis y chunks de las entradas del lote.
+
+    Args:
+        analisis: Análisis enriquecidos (con "fecha" y "raw_text")
+        chunks: Chunks enriquecidos de esas u otras entradas; reemplazan
+            a todos los chunks previos de su entrada
+    """
+    if not analisis and not chunks:
+        return
+
+    textos: Dict[date, str] = {}
+    analisis_por_fecha: Dict[date, Dict[str, Any]] = {}
+    for a in analisis:
+        fecha = _fecha(a.get("fecha"))
+        if fecha is None:
+            logger.warning(f"Análisis con fecha inválida: {a.get('fecha')}")
+            continue
+        analisis_por_fecha[fecha] = a
+        if a.get("raw_text"):
+            textos[fecha] = a["raw_text"]
+
+    chunks_por_fecha: Dict[date, List[Dict[str, Any]]] = {}
+    for c in chunks:
+        fecha = fecha_de_entry_id(c.get("entry_id", ""))
+        if fecha is None:
+            logger.warning(f"Chunk con entry_id inválido: {c.get('entry_id')}")
+            continue
+        chunks_por_fecha.setdefault(fecha, []).append(c)
+
+    with Session(engine) as session:
+        ids = resolver_entradas(session, set(analisis_por_fecha) | set(chunks_por_fecha), textos)
+
+        ids_analisis = [ids[f] for f in analisis_por_fecha if f in ids]
+        for lote in _en_lotes(ids_analisis):
+            session.execute(delete(EntryAnalysis).where(EntryAnalysis.entry_id.in_(lote)))
+
+        ids_chunks = [ids[f] for f in chunks_por_fecha if f in ids]
+        for lote in _en_lotes(ids_chunks):
+            session.execute(delete(EntryChunk).where(EntryChunk.entry_id.in_(lote)))
+
+        nuevos_analisis = {
+            fecha: EntryAnalysis(
+                entry_id=ids[fecha],
+                summary=a.get("summary", ""),
+                intensity=a.get("intensity", "media"),
+                emotions=a.get("emotions", []),
+                topics=a.get("topics", []),
+                people=a.get("people", [])
+            )
+            for fecha, a in analisis_por_fecha.items()
+            if fecha in ids
+        }
+        session.add_all(list(nuevos_analisis.values()))
+        # Los IDs (orden de escritura) ordenan las emociones en los conteos
+        session.flush()
+        actualizar_conteos(session, nuevos_analisis)
+        actualizar_tags(session, {
+            ids[fecha]: a
+            for fecha, a in analisis_por_fecha.items()
+            if fecha in ids
+        })
+
+        session.add_all([
+            EntryChunk(
+                entry_id=ids[fecha],
+                index=c.get("index", 0),
+                chunk_type=c.get("type", "mixto"),
+                text=sin_texto(c).get("text", ""),
+                start_offset=c.get("start_offset"),
+                end_offset=c.get("end_offset"),
+                word_count=c.get("word_count", 0),
+                char_count=c.get("char_count", 0),
+                metadata_json=c.get("metadata", {})
+            )
+            for fecha, lista in chunks_por_fecha.items()
+            if fecha in ids
+            for c in lista
+        ])
+
+        session.commit()
+
+    logger.info(
+        f"DB sincronizada: {len(analisis_por_fecha)} análisis, "
+        f"{sum(len(l) for l in chunks_por_fecha.values())} chunks"
+    )
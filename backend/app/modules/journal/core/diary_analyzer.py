@@ -5,7 +5,9 @@ Script para analizar entradas de diario usando LM Studio y extraer información
 Incluye sistema de chunking semántico para preparar datos para embeddings futuros.
 
 Uso:
-    python diary_analyzer.py
+    python diary_analyzer.py               # procesa archivos nuevos o modificados
+    python diary_analyzer.py --reanudar    # retoma la última corrida interrumpida
+    python diary_analyzer.py --indexar     # además actualiza el índice FAISS
 
 Requisitos:
     - lmstudio
@@ -17,18 +19,41 @@ import json
 import logging
 import hashlib
 from pathlib import Path
-from typing import Dict, Optional, Any, List, Set, Tuple
+from typing import Callable, Dict, Optional, Any, List, Set, Tuple
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 import requests
 import time
 import random
-from sqlmodel import Session, select
+from sqlmodel import Session
+from backend.app.core import metrics
 from backend.app.core.database import engine
-from backend.app.modules.journal.models import JournalEntry, EntryAnalysis, EntryChunk
 from backend.app.modules.profile.models import UserProfile
 from backend.app.modules.profile.service import ProfileService
-import time
+from backend.app.modules.journal.core.rate_limiter import (
+    limitador_llm,
+    cuota_compartida,
+    estimar_tokens,
+    parsear_retry_after
+)
+from backend.app.modules.journal.core.llm_cache import cache_llm
+from backend.app.modules.journal.core.llm_ledger import ledger_llm
+from backend.app.modules.journal.core.analysis_log import obtener_log_analisis
+from backend.app.modules.journal.core.chunk_store import hash_texto, obtener_chunk_store, texto_de_rango
+from backend.app.modules.journal.core.db_sync import sincronizar_lote
+from backend.app.modules.journal.core.file_manifest import escanear_pendientes, registrar_procesado
+from backend.app.modules.journal.core import run_journal
+from backend.app.modules.journal.core.run_report import ReporteCorrida, resumen_para_log
+from backend.app.config import (
+    LLM_COMBINED_EXTRACTION,
+    CHUNKING_MODE,
+    CHUNKING_WINDOW_WORDS,
+    CHUNKING_WINDOW_OVERLAP,
+    CHUNKING_WINDOW_WORKERS,
+    DB_SYNC_BATCH_SIZE,
+    GROQ_API_URL
+)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -38,45 +63,196 @@ def post_with_retry(
     payload: dict,
     headers: dict,
     max_retries: int = 5,
-    base_delay: float = 2.0
+    base_delay: float = 2.0,
+    llamador: str = "analyzer"
 ):
     """
-    POST con retry y backoff exponencial para manejar 429.
+    POST con retry adaptativo frente a límites de tasa y fallos transitorios.
+    
+    - Antes de cada intento pasa por el limitador local (hilos del proceso)
+      y por la cuota compartida entre procesos, que se alimenta de los
+      headers x-ratelimit-* del proveedor: así se frena antes del 429.
+    - Un 429 respeta Retry-After (o backoff exponencial si no viene) y
+      bloquea a todos los procesos durante ese tiempo.
+    - Timeouts, errores de conexión y 5xx se reintentan con backoff + jitter.
+    - Otros 4xx no son transitorios y se propagan de inmediato.
+    
+    Cada llamada (exitosa o no) queda en el registro de llamadas LLM a
+    nombre de `llamador`, con su latencia total, reintentos y espera por 429.
     """
-    for intento in range(1, max_retries + 1):
-        response = requests.post(
-            url,
-            json=payload,
-            headers=headers,
-            timeout=90
+    tokens_estimados = estimar_tokens(payload)
+    proveedor = f"{LLM_PROVIDER}:{payload.get('model')}"
+    ultimo_error = None
+    inicio = time.perf_counter()
+    espera_429 = 0.0
+    tras_429 = False
+
+    def registrar(intento: int, estado: str, usage: Optional[dict] = None) -> None:
+        usage = usage or {}
+        ledger_llm.registrar(
+            llamador,
+            LLM_PROVIDER,
+            payload.get("model") or "",
+            latency_s=time.perf_counter() - inicio,
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+            retries=intento - 1,
+            wait_429_s=espera_429,
+            status=estado
         )
 
-        if response.status_code != 429:
-            response.raise_for_status()
-            return response
+    for intento in range(1, max_retries + 1):
+        inicio_espera = time.perf_counter()
+        with metrics.span("llm.rate_limit_wait", espera_llm=True):
+            limitador_llm.adquirir(tokens_estimados)
+            cuota_compartida.esperar_turno(proveedor, tokens_estimados)
+        if tras_429:
+            # El bloqueo que dejó el 429 se cumple en esta espera
+            espera_429 += time.perf_counter() - inicio_espera
+            tras_429 = False
 
-        # 429 → esperar y reintentar
-        wait = base_delay * (2 ** (intento - 1))
-        jitter = random.uniform(0, 0.5)
-        sleep_time = wait + jitter
+        backoff = base_delay * (2 ** (intento - 1)) + random.uniform(0, 0.5)
 
-        logger.warning(
-            f"429 Too Many Requests. "
-            f"Reintento {intento}/{max_retries} "
-            f"esperando {sleep_time:.2f}s"
-        )
+        try:
+            with metrics.span("llm.request", espera_llm=True):
+                response = requests.post(
+                    url,
+                    json=payload,
+                    headers=headers,
+                    timeout=90
+                )
+        except (requests.Timeout, requests.ConnectionError) as e:
+            ultimo_error = e
+            logger.warning(
+                f"Error de red ({type(e).__name__}). "
+                f"Reintento {intento}/{max_retries} en {backoff:.2f}s"
+            )
+            with metrics.span("llm.backoff", espera_llm=True):
+                time.sleep(backoff)
+            continue
+
+        if response.status_code == 429:
+            retry_after = parsear_retry_after(response.headers.get("retry-after"))
+            espera = retry_after if retry_after is not None else backoff
+            # La espera se comparte: el próximo esperar_turno (de este o de
+            # cualquier otro proceso) la respeta
+            cuota_compartida.actualizar(proveedor, response.headers, bloquear_por=espera)
+            ultimo_error = "429 Too Many Requests"
+            tras_429 = True
+            logger.warning(
+                f"429 Too Many Requests. "
+                f"Reintento {intento}/{max_retries} "
+                f"esperando {espera:.2f}s"
+            )
+            continue
+
+        cuota_compartida.actualizar(proveedor, response.headers)
+
+        if response.status_code >= 500:
+            ultimo_error = f"HTTP {response.status_code}"
+            logger.warning(
+                f"Error del proveedor ({response.status_code}). "
+                f"Reintento {intento}/{max_retries} en {backoff:.2f}s"
+            )
+            with metrics.span("llm.backoff", espera_llm=True):
+                time.sleep(backoff)
+            continue
+
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            registrar(intento, "error")
+            raise
 
-        time.sleep(sleep_time)
+        usage = {}
+        try:
+            usage = response.json().get("usage") or {}
+            if "total_tokens" in usage:
+                limitador_llm.ajustar(tokens_estimados, usage["total_tokens"])
+            metrics.registrar_tokens(usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0)
+        except ValueError:
+            pass
+        registrar(intento, "ok", usage)
+        return response
 
-    raise ModelError("Se excedieron los reintentos por rate limit (429)")
+    registrar(max_retries, "error")
+    raise ModelError(f"Se excedieron los reintentos ({max_retries}): {ultimo_error}")
 
 # Configuraci'on con api
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 if not GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY no definida")
 
+LLM_PROVIDER = "groq"
+
+# Versiones de las plantillas de prompt. Subirlas invalida la caché LLM
+# cuando cambia cómo se interpreta la respuesta aunque el prompt sea igual.
+PROMPT_VERSION_ANALISIS = "analisis-v1"
+PROMPT_VERSION_CHUNKING = "chunking-v2"
+PROMPT_VERSION_COMBINADO = "combinado-v2"
+
+# Nombre con el que cada plantilla aparece en el registro de llamadas LLM
+LLAMADOR_POR_PLANTILLA = {
+    PROMPT_VERSION_ANALISIS: "analyzer.analysis",
+    PROMPT_VERSION_CHUNKING: "analyzer.chunking",
+    PROMPT_VERSION_COMBINADO: "analyzer.combined",
+}
+
+
+def solicitar_completado(
+    payload: dict,
+    version_plantilla: str,
+    usar_cache: bool = True
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Obtiene el contenido de la respuesta del LLM, consultando antes la caché.
+    
+    Args:
+        payload: Cuerpo de la solicitud (model, messages, temperature)
+        version_plantilla: Versión de la plantilla del prompt
+        usar_cache: Si False, ignora la caché y siempre llama a la API
+        
+    Returns:
+        Tupla (contenido, clave). clave es None si la respuesta vino de la
+        caché; si no, el llamador debe guardarla con cache_llm.guardar()
+        una vez validada, para no cachear respuestas inservibles.
+    """
+    llamador = LLAMADOR_POR_PLANTILLA.get(version_plantilla, "analyzer")
+    clave = cache_llm.clave(
+        LLM_PROVIDER,
+        payload["model"],
+        version_plantilla,
+        payload.get("temperature"),
+        payload["messages"]
+    )
+    
+    if usar_cache:
+        inicio = time.perf_counter()
+        contenido = cache_llm.obtener(clave)
+        if contenido is not None:
+            ledger_llm.registrar(
+                llamador,
+                LLM_PROVIDER,
+                payload["model"],
+                latency_s=time.perf_counter() - inicio,
+                cache_hit=True
+            )
+            return contenido, None
+    
+    headers = {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    
+    response = post_with_retry(
+        GROQ_API_URL,
+        payload,
+        headers,
+        llamador=llamador
+    )
+    return response.json()["choices"][0]["message"]["content"], clave
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -186,13 +362,14 @@ def extraer_fecha_de_nombre(nombre: str) -> Optional[str]:
     return None
 
 
-def dividir_en_chunks_semanticos(
+def dividir_en_rangos_semanticos(
     texto: str,
     min_palabras: int = 100,
     max_palabras: int = 300
-) -> List[str]:
+) -> List[Tuple[int, int]]:
     """
     Divide el texto en chunks semánticos basados en párrafos y longitud.
+    Un párrafo más largo que el máximo se corta en grupos de oraciones.
     
     Args:
         texto: Texto completo a dividir
@@ -200,50 +377,99 @@ def dividir_en_chunks_semanticos(
         max_palabras: Máximo de palabras por chunk
         
     Returns:
-        Lista de strings, cada uno un chunk semántico
+        Lista de rangos [inicio, fin) de cada chunk en el texto
     """
-    # Separar por párrafos (doble salto de línea o headers markdown)
-    parrafos = re.split(r'\n\s*\n|(?=^#{1,6}\s)', texto, flags=re.MULTILINE)
-    parrafos = [p.strip() for p in parrafos if p.strip()]
-    
-    chunks = []
-    chunk_actual = []
-    palabras_actual = 0
-    
-    for parrafo in parrafos:
-        palabras_parrafo = len(parrafo.split())
-        
-        # Si el chunk actual + este párrafo excede el máximo
-        if palabras_actual + palabras_parrafo > max_palabras and chunk_actual:
-            # Guardar el chunk actual si tiene suficientes palabras
-            if palabras_actual >= min_palabras:
-                chunks.append('\n\n'.join(chunk_actual))
-                chunk_actual = [parrafo]
-                palabras_actual = palabras_parrafo
+    # Unidades: párrafos (o grupos de oraciones de párrafos muy largos)
+    unidades = []
+    for p_inicio, p_fin in rangos_de_parrafos(texto):
+        if len(texto[p_inicio:p_fin].split()) <= max_palabras:
+            unidades.append((p_inicio, p_fin, len(texto[p_inicio:p_fin].split())))
+            continue
+        grupo = None
+        for o_inicio, o_fin in segmentar_parrafo(texto, p_inicio, p_fin):
+            palabras = len(texto[o_inicio:o_fin].split())
+            if grupo and grupo[2] + palabras > max_palabras:
+                unidades.append(tuple(grupo))
+                grupo = None
+            if grupo is None:
+                grupo = [o_inicio, o_fin, palabras]
             else:
-                # Si es muy pequeño, agregar este párrafo de todas formas
-                chunk_actual.append(parrafo)
-                palabras_actual += palabras_parrafo
+                grupo[1] = o_fin
+                grupo[2] += palabras
+        if grupo:
+            unidades.append(tuple(grupo))
+    
+    rangos = []
+    actual = None  # [inicio, fin, palabras]
+    
+    for inicio, fin, palabras in unidades:
+        # Si el chunk actual + esta unidad excede el máximo y ya es suficiente, se cierra
+        if actual and actual[2] + palabras > max_palabras and actual[2] >= min_palabras:
+            rangos.append((actual[0], actual[1]))
+            actual = None
+        if actual is None:
+            actual = [inicio, fin, palabras]
         else:
-            chunk_actual.append(parrafo)
-            palabras_actual += palabras_parrafo
+            actual[1] = fin
+            actual[2] += palabras
     
     # Agregar el último chunk
-    if chunk_actual:
-        chunks.append('\n\n'.join(chunk_actual))
-    
-    # Si el texto es muy corto, devolver como un solo chunk
-    if not chunks:
-        chunks = [texto]
+    if actual:
+        rangos.append((actual[0], actual[1]))
     
-    logger.debug(f"Texto dividido en {len(chunks)} chunks")
-    return chunks
+    logger.debug(f"Texto dividido en {len(rangos)} chunks")
+    return rangos
+
+
+def dividir_en_chunks_semanticos(
+    texto: str,
+    min_palabras: int = 100,
+    max_palabras: int = 300
+) -> List[str]:
+    """
+    Igual que dividir_en_rangos_semanticos, devolviendo el texto de cada chunk.
+    Si el texto es muy corto, se devuelve como un solo chunk.
+    """
+    rangos = dividir_en_rangos_semanticos(texto, min_palabras, max_palabras)
+    return [texto[a:b] for a, b in rangos] or [texto]
+
+
+# Palabras indicadoras de cada tipo de chunk
+PALABRAS_POR_TIPO = {
+    'emociones': (
+        'sentí', 'siento', 'emoción', 'feliz', 'triste', 'ansioso', 'enojado',
+        'frustrado', 'emocionado', 'nervioso', 'alegre', 'deprimido'
+    ),
+    'reflexion': (
+        'creo', 'pienso', 'reflexión', 'aprendí', 'me di cuenta', 'comprendo',
+        'entiendo', 'debería', 'necesito', 'quiero', 'debo'
+    ),
+    'hechos': (
+        'hoy', 'fui', 'hice', 'pasó', 'ocurrió', 'reunión', 'trabajo',
+        'proyecto', 'tarea', 'clase', 'estudié'
+    ),
+}
+
+_TIPO_POR_PALABRA = {
+    palabra: tipo
+    for tipo, palabras in PALABRAS_POR_TIPO.items()
+    for palabra in palabras
+}
+
+# Una sola alternancia con todas las palabras (las más largas primero)
+_PATRON_TIPOS = re.compile(
+    '|'.join(re.escape(p) for p in sorted(_TIPO_POR_PALABRA, key=len, reverse=True))
+)
 
 
 def clasificar_tipo_chunk(texto: str, analisis: Dict[str, Any]) -> str:
     """
     Clasifica el tipo de contenido del chunk usando heurísticas simples.
     
+    Recorre el texto una sola vez con un patrón que reúne todas las
+    palabras indicadoras; cada palabra distinta encontrada suma un punto
+    a su tipo.
+    
     Args:
         texto: Contenido del chunk
         analisis: Análisis completo de la entrada
@@ -251,36 +477,9 @@ def clasificar_tipo_chunk(texto: str, analisis: Dict[str, Any]) -> str:
     Returns:
         Tipo de chunk: "hechos", "emociones", "reflexion", "mixto"
     """
-    texto_lower = texto.lower()
-    
-    # Palabras indicadoras de emociones
-    palabras_emocionales = [
-        'sentí', 'siento', 'emoción', 'feliz', 'triste', 'ansioso', 'enojado',
-        'frustrado', 'emocionado', 'nervioso', 'alegre', 'deprimido'
-    ]
-    
-    # Palabras indicadoras de reflexión
-    palabras_reflexion = [
-        'creo', 'pienso', 'reflexión', 'aprendí', 'me di cuenta', 'comprendo',
-        'entiendo', 'debería', 'necesito', 'quiero', 'debo'
-    ]
-    
-    # Palabras indicadoras de hechos
-    palabras_hechos = [
-        'hoy', 'fui', 'hice', 'pasó', 'ocurrió', 'reunión', 'trabajo',
-        'proyecto', 'tarea', 'clase', 'estudié'
-    ]
-    
-    puntos_emociones = sum(1 for palabra in palabras_emocionales if palabra in texto_lower)
-    puntos_reflexion = sum(1 for palabra in palabras_reflexion if palabra in texto_lower)
-    puntos_hechos = sum(1 for palabra in palabras_hechos if palabra in texto_lower)
-    
-    # Determinar tipo predominante
-    puntos = {
-        'emociones': puntos_emociones,
-        'reflexion': puntos_reflexion,
-        'hechos': puntos_hechos
-    }
+    puntos = {tipo: 0 for tipo in PALABRAS_POR_TIPO}
+    for palabra in set(_PATRON_TIPOS.findall(texto.lower())):
+        puntos[_TIPO_POR_PALABRA[palabra]] += 1
     
     max_puntos = max(puntos.values())
     if max_puntos == 0:
@@ -294,30 +493,79 @@ def clasificar_tipo_chunk(texto: str, analisis: Dict[str, Any]) -> str:
     return top_categorias[0]
 
 
+MODOS_CHUNKING = ("llm", "heuristico", "auto")
+
+
+@metrics.span("analyzer.heuristic_chunking")
+def chunkear_heuristico(
+    texto: str,
+    analisis: Dict[str, Any],
+    min_palabras: int = 40,
+    max_palabras: int = 120
+) -> List[Dict[str, Any]]:
+    """
+    Chunking offline (sin LLM): párrafos agrupados por tamaño y tipo por
+    palabras clave. Devuelve el mismo formato que chunkear_con_llm; la
+    metadata propone las personas y emociones del análisis y
+    sanitizar_chunk deja solo las que aparecen en cada chunk.
+    
+    Los tamaños por defecto siguen las reglas del prompt de chunking.
+    """
+    metadata = {
+        "people": analisis.get("people") or [],
+        "emotions": analisis.get("emotions") or [],
+    }
+    rangos = dividir_en_rangos_semanticos(texto, min_palabras, max_palabras) or [(0, len(texto))]
+    return [
+        {
+            "index": i,
+            "type": clasificar_tipo_chunk(texto[a:b], analisis),
+            "text": texto_de_rango(texto, a, b),
+            "start": a,
+            "end": b,
+            "metadata": metadata
+        }
+        for i, (a, b) in enumerate(rangos)
+    ]
+
+
+@metrics.span("analyzer.chunking")
 def crear_chunks_enriquecidos(
     texto: str,
     analisis: Dict[str, Any],
     entry_id: str,
-    modelo: str = "qwen/qwen3-32b"
+    modelo: str = "qwen/qwen3-32b",
+    chunks_llm: Optional[List[Dict[str, Any]]] = None,
+    usar_cache: bool = True,
+    modo: str = CHUNKING_MODE
 ) -> List[Dict[str, Any]]:
     """
     Crea chunks semánticos enriquecidos usando IA con fallback heurístico.
+    Si se pasan `chunks_llm` (p. ej. de la extracción combinada) no se
+    vuelve a llamar al LLM: solo se validan y enriquecen.
+    
+    Modos: "llm" (falla si falla el LLM), "heuristico" (sin LLM) y
+    "auto" (LLM y, si falla, heurístico).
     """
+    if modo not in MODOS_CHUNKING:
+        raise ValueError(f"Modo de chunking desconocido: {modo}")
+    
+    origen = "llm"
+    if chunks_llm is None and modo == "heuristico":
+        chunks_llm = chunkear_heuristico(texto, analisis)
+        origen = "heuristico"
+    
     try:
-        chunks_llm = chunkear_con_llm(texto, modelo)
-        logger.info(f"Chunking LLM exitoso ({len(chunks_llm)} chunks)")
+        if chunks_llm is None:
+            chunks_llm = chunkear_con_llm_por_ventanas(texto, modelo, usar_cache)
+        logger.info(f"Chunking {origen} exitoso ({len(chunks_llm)} chunks)")
     except Exception as e:
-        logger.error("Chunking con LLM falló y fallback está desactivado")
-        raise
-        # logger.warning("Usando fallback heurístico de chunking")
-        # chunks_llm = [
-        #     {
-        #         "index": i,
-        #         "type": clasificar_tipo_chunk(t, analisis),
-        #         "text": t
-        #     }
-        #     for i, t in enumerate(dividir_en_chunks_semanticos(texto))
-        # ]
+        if modo != "auto":
+            logger.error("Chunking con LLM falló y fallback está desactivado")
+            raise
+        logger.warning(f"Chunking con LLM falló ({e}), usando fallback heurístico")
+        chunks_llm = chunkear_heuristico(texto, analisis)
+        origen = "heuristico"
 
     chunks_enriquecidos = []
 
@@ -332,7 +580,12 @@ def crear_chunks_enriquecidos(
             )
             chunk["type"] = "mixto"
 
-        chunk_texto = chunk["text"]
+        # Con offsets, el texto es siempre el recorte del original
+        inicio, fin = chunk.get("start"), chunk.get("end")
+        if inicio is not None and fin is not None:
+            chunk_texto = texto_de_rango(texto, inicio, fin)
+        else:
+            chunk_texto = chunk["text"]
 
         chunk_metadata = chunk.get("metadata") or {}
 
@@ -341,6 +594,10 @@ def crear_chunks_enriquecidos(
             "entry_id": entry_id,
             "index": chunk["index"],
             "text": chunk_texto,
+            "start_offset": inicio,
+            "end_offset": fin,
+            # Texto sobre el que valen los offsets (ver entry_texts)
+            "source_hash": hash_texto(texto) if inicio is not None and fin is not None else None,
             "word_count": len(chunk_texto.split()),
             "char_count": len(chunk_texto),
             "type": chunk.get("type"),
@@ -351,7 +608,7 @@ def crear_chunks_enriquecidos(
                 # "topics": analisis.get("topics", []),
                 # "intensity": analisis.get("intensity"),
                 # "people": analisis.get("people"),
-                # "source": "llm" if "chunks_llm" in locals() else "heuristic"
+                "source": origen
             }
         }
 
@@ -421,12 +678,13 @@ def obtener_fechas_procesadas(ruta_json: str = "diario.json") -> Set[str]:
         Set con las fechas ya procesadas (formato: dd-mm-yyyy)
     """
     try:
-        historial = cargar_historial_diario(ruta_json)
-        
+        # El log indexa por fecha ISO; acá se comparan contra nombres dd-mm-yyyy
         fechas = set()
-        for entrada in historial:
-            if 'fecha' in entrada:
-                fechas.add(entrada['fecha'])
+        for fecha in obtener_log_analisis(ruta_json).fechas():
+            try:
+                fechas.add(datetime.strptime(fecha, '%Y-%m-%d').strftime('%d-%m-%Y'))
+            except ValueError:
+                fechas.add(fecha)
         
         logger.info(f"Encontradas {len(fechas)} entradas ya procesadas")
         return fechas
@@ -441,7 +699,12 @@ def obtener_archivos_pendientes(
     ruta_json: Path
 ) -> List[Path]:
     """
-    Obtiene los archivos que aún no han sido procesados.
+    Obtiene los archivos nuevos o modificados desde su último procesamiento.
+    
+    Compara cada archivo contra el manifiesto (ver file_manifest): solo se
+    hashean los archivos cuyo mtime o tamaño cambiaron. El historial
+    `ruta_json` solo se consulta para archivos que aún no están en el
+    manifiesto (procesados antes de que existiera).
     
     Args:
         carpeta: Carpeta con los archivos de diario
@@ -451,17 +714,21 @@ def obtener_archivos_pendientes(
         Lista de archivos pendientes de procesar
     """
     todos_archivos = obtener_archivos_diario(carpeta)
-    fechas_procesadas = obtener_fechas_procesadas(ruta_json)
+    fechas_procesadas = None
     
-    pendientes = [
-        archivo for archivo in todos_archivos
-        if extraer_fecha_de_nombre(archivo.name) not in fechas_procesadas
-    ]
+    def ya_procesado(archivo: Path) -> bool:
+        nonlocal fechas_procesadas
+        if fechas_procesadas is None:
+            fechas_procesadas = obtener_fechas_procesadas(ruta_json)
+        return extraer_fecha_de_nombre(archivo.name) in fechas_procesadas
+    
+    pendientes = escanear_pendientes(todos_archivos, ya_procesado)
     
     logger.info(f"Archivos pendientes de procesar: {len(pendientes)}")
     return pendientes
 
 
+@metrics.span("analyzer.read")
 def leer_archivo_diario(ruta_archivo: str) -> str:
     """
     Lee el contenido de un archivo de diario.
@@ -498,13 +765,19 @@ def leer_archivo_diario(ruta_archivo: str) -> str:
         raise FileReadError(f"Error inesperado al leer el archivo: {e}")
 
 
-def analizar_con_llm(contenido: str, modelo: str = "qwen/qwen3-32b") -> str:
+@metrics.span("analyzer.llm_analysis")
+def analizar_con_llm(
+    contenido: str,
+    modelo: str = "qwen/qwen3-32b",
+    usar_cache: bool = True
+) -> str:
     """
     Analiza el contenido del diario usando LM Studio.
     
     Args:
         contenido: Texto del diario a analizar
         modelo: Identificador del modelo a usar
+        usar_cache: Si False, no se consulta la caché de respuestas
         
     Returns:
         Respuesta del modelo como string
@@ -555,20 +828,18 @@ def analizar_con_llm(contenido: str, modelo: str = "qwen/qwen3-32b") -> str:
         "temperature": 0.3
     }
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     try:
-        response = post_with_retry(
-            GROQ_API_URL,
-            payload,
-            headers
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+        respuesta, clave = solicitar_completado(payload, PROMPT_VERSION_ANALISIS, usar_cache)
+
+        # Solo se cachean respuestas con un JSON utilizable
+        if clave is not None:
+            try:
+                json.loads(extraer_json_de_respuesta(respuesta))
+                cache_llm.guardar(clave, respuesta)
+            except (JSONParseError, json.JSONDecodeError):
+                pass
+
+        return respuesta
 
     except Exception as e:
         raise ModelError(f"Error al procesar con API: {e}")
@@ -588,45 +859,9 @@ def analizar_con_llm(contenido: str, modelo: str = "qwen/qwen3-32b") -> str:
     # except Exception as e:
     #     raise ModelError(f"Error al procesar con el modelo: {e}")
 
-def chunkear_con_llm(
-    texto: str,
-    modelo: str = "qwen/qwen3-32b"
-) -> List[Dict[str, str]]:
-    """
-    Usa un LLM para dividir el texto en chunks semánticos conscientes.
-
-    Returns:
-        Lista de objetos:
-        {
-            "index": int,
-            "type": "hechos|emociones|reflexion|mixto",
-            "text": string
-        }
-    """
-    # Obtener contexto del perfil si está disponible
-    profile_context = get_profile_context()
-    profile_note = ""
-    if profile_context:
-        profile_note = f"""
-
-CONTEXTO DEL USUARIO (para mejor comprensión):
-{profile_context}
-
-Usa esta información solo para contextualizar mejor el contenido, NO la menciones en los chunks.
-"""
-    
-    prompt = f"""
-Eres un modelo de lenguaje encargado de procesar entradas de un diario personal.{profile_note}
-
-Tu tarea es:
-1. Dividir TODO el texto en CHUNKS SEMÁNTICOS.
-2. Cada chunk debe ser coherente, completo y autosuficiente.
-3. Enriquecer cada chunk con metadatos SOLO si están explícitamente justificados por el texto del chunk.
-4. No inventar información.
-5. No asumir contexto externo.
-6. No interpretar más allá de lo escrito.
-
-────────────────────────
+# Reglas de chunking compartidas por el prompt de chunking
+# y el de extracción combinada (análisis + chunks)
+REGLAS_CHUNKING = """────────────────────────
 REGLAS DE CHUNKING (OBLIGATORIAS)
 ────────────────────────
 
@@ -634,11 +869,16 @@ DEFINICIÓN DE CHUNK:
 Un chunk es una unidad narrativa completa que desarrolla UNA idea principal.
 Puede incluir varias oraciones o párrafos mientras sigan siendo la misma idea.
 
+FORMATO:
+- El texto viene dividido en SEGMENTOS numerados: [0], [1], [2], ...
+- Cada chunk es un rango CONTIGUO de segmentos: start_segment y end_segment (inclusive).
+- NO copies el texto de los chunks: devuelve SOLO los números de segmento.
+
 OBLIGATORIO:
 - TODO el texto original debe quedar cubierto.
-- NO omitas ningún fragmento.
-- NO reescribas ni resumas el texto.
-- El texto del chunk debe ser EXACTAMENTE el original.
+- Los rangos van en orden, empiezan en el segmento 0 y terminan en el último.
+- Sin huecos ni solapamientos: cada chunk empieza en el segmento siguiente
+  al último del chunk anterior.
 
 TAMAÑO:
 - Un chunk NO PUEDE tener menos de 40 palabras.
@@ -684,7 +924,60 @@ Incluye metadatos SOLO si el texto lo justifica claramente.
 SI UN DATO NO ES CLARO, NO LO INCLUYAS.
 NO infieras.
 NO completes campos por obligación.
+"""
 
+
+@metrics.span("analyzer.llm_chunking")
+def chunkear_con_llm(
+    texto: str,
+    modelo: str = "qwen/qwen3-32b",
+    usar_cache: bool = True
+) -> List[Dict[str, str]]:
+    """
+    Usa un LLM para dividir el texto en chunks semánticos conscientes.
+    Si usar_cache es False, no se consulta la caché de respuestas.
+
+    El modelo no repite el texto: recibe el texto en segmentos numerados
+    y devuelve rangos de segmentos, que se convierten en offsets.
+
+    Returns:
+        Lista de objetos:
+        {
+            "index": int,
+            "type": "hechos|emociones|reflexion|mixto",
+            "text": string,       # recortado del original
+            "start": int,         # offsets en `texto`
+            "end": int
+        }
+    """
+    segmentos = segmentar_texto(texto)
+    if not segmentos:
+        raise ModelError("Texto vacío, no hay nada que chunkear")
+
+    # Obtener contexto del perfil si está disponible
+    profile_context = get_profile_context()
+    profile_note = ""
+    if profile_context:
+        profile_note = f"""
+
+CONTEXTO DEL USUARIO (para mejor comprensión):
+{profile_context}
+
+Usa esta información solo para contextualizar mejor el contenido, NO la menciones en los chunks.
+"""
+    
+    prompt = f"""
+Eres un modelo de lenguaje encargado de procesar entradas de un diario personal.{profile_note}
+
+Tu tarea es:
+1. Dividir TODO el texto en CHUNKS SEMÁNTICOS.
+2. Cada chunk debe ser coherente, completo y autosuficiente.
+3. Enriquecer cada chunk con metadatos SOLO si están explícitamente justificados por el texto del chunk.
+4. No inventar información.
+5. No asumir contexto externo.
+6. No interpretar más allá de lo escrito.
+
+{REGLAS_CHUNKING}
 ────────────────────────
 SALIDA OBLIGATORIA (FORMATO EXACTO)
 ────────────────────────
@@ -696,7 +989,8 @@ Devuelve SOLO un JSON válido con esta estructura exacta:
     {{
       "index": 0,
       "type": "emociones | reflexion | hechos | mixto",
-      "text": "texto del chunk",
+      "start_segment": 0,
+      "end_segment": 3,
       "metadata": {{
         "people": []
       }}
@@ -708,8 +1002,10 @@ NO agregues texto fuera del JSON.
 NO agregues campos adicionales.
 
 ────────────────────────
-TEXTO A PROCESAR:
-<<<{texto}>>>
+TEXTO A PROCESAR ({len(segmentos)} segmentos, del 0 al {len(segmentos) - 1}):
+<<<
+{renderizar_segmentos(texto, segmentos)}
+>>>
 """
 
     payload = {
@@ -721,20 +1017,8 @@ TEXTO A PROCESAR:
         "temperature": 0.2
     }
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     try:
-        response = post_with_retry(
-            GROQ_API_URL,
-            payload,
-            headers
-        )
-        response.raise_for_status()
-
-        raw = response.json()["choices"][0]["message"]["content"]
+        raw, clave = solicitar_completado(payload, PROMPT_VERSION_CHUNKING, usar_cache)
         logger.debug("Respuesta cruda chunking LLM:\n" + raw)
 
         json_text = extraer_json_de_respuesta(raw)
@@ -743,11 +1027,441 @@ TEXTO A PROCESAR:
         if "chunks" not in data:
             raise JSONParseError("Respuesta sin chunks")
 
-        return data["chunks"]
+        chunks = chunks_desde_segmentos(texto, segmentos, data["chunks"])
+
+        if clave is not None:
+            cache_llm.guardar(clave, raw)
+
+        return chunks
 
     except Exception as e:
         raise ModelError(f"Chunking vía API falló: {e}")
 
+# ============================================================
+# CHUNKS COMO OFFSETS Y CHUNKING POR VENTANAS
+# ============================================================
+
+# Mínimo de palabras por chunk según REGLAS_CHUNKING
+MIN_PALABRAS_CHUNK = 40
+
+_PATRON_FIN_ORACION = re.compile(r'(?<=[.!?…])\s+')
+
+
+def rangos_de_parrafos(texto: str) -> List[Tuple[int, int]]:
+    """Rangos [inicio, fin) de cada párrafo no vacío (separados por líneas en blanco)."""
+    rangos = []
+    inicio = 0
+    for separador in re.finditer(r'\n\s*\n', texto):
+        if texto[inicio:separador.start()].strip():
+            rangos.append((inicio, separador.start()))
+        inicio = separador.end()
+    if texto[inicio:].strip():
+        rangos.append((inicio, len(texto)))
+    return rangos
+
+
+def segmentar_parrafo(texto: str, inicio: int, fin: int) -> List[Tuple[int, int]]:
+    """Rangos [inicio, fin) de cada oración de texto[inicio:fin]."""
+    segmentos = []
+    for corte in _PATRON_FIN_ORACION.finditer(texto, inicio, fin):
+        if texto[inicio:corte.start()].strip():
+            segmentos.append((inicio, corte.start()))
+        inicio = corte.end()
+    if texto[inicio:fin].strip():
+        segmentos.append((inicio, fin))
+    return segmentos
+
+
+def segmentar_texto(texto: str) -> List[Tuple[int, int]]:
+    """
+    Segmentos (oraciones, sin cruzar párrafos) que el LLM usa para
+    expresar los chunks como rangos. Juntos cubren todo el texto salvo
+    espacios en blanco.
+    """
+    return [
+        segmento
+        for p_inicio, p_fin in rangos_de_parrafos(texto)
+        for segmento in segmentar_parrafo(texto, p_inicio, p_fin)
+    ]
+
+
+def renderizar_segmentos(texto: str, segmentos: List[Tuple[int, int]]) -> str:
+    """Texto para el prompt: `[n] oración`, con una línea en blanco entre párrafos."""
+    lineas = []
+    fin_anterior = 0
+    for n, (inicio, fin) in enumerate(segmentos):
+        if n and re.search(r'\n\s*\n', texto[fin_anterior:inicio]):
+            lineas.append("")
+        lineas.append(f"[{n}] {' '.join(texto[inicio:fin].split())}")
+        fin_anterior = fin
+    return "\n".join(lineas)
+
+
+def chunks_desde_segmentos(
+    texto: str,
+    segmentos: List[Tuple[int, int]],
+    chunks_llm: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Convierte los rangos de segmentos del LLM en chunks con offsets
+    ("start"/"end") y su texto recortado del original.
+    
+    Valida en O(n) la regla de cobertura: los rangos, en orden, deben
+    empezar en el segmento 0, terminar en el último y no dejar huecos
+    ni solaparse.
+    
+    Raises:
+        JSONParseError: Si los rangos son inválidos o no cubren todo el texto
+    """
+    rangos = []
+    for i, chunk in enumerate(chunks_llm):
+        if not isinstance(chunk, dict):
+            raise JSONParseError(f"Chunk {i} inválido")
+        desde, hasta = chunk.get("start_segment"), chunk.get("end_segment")
+        if not isinstance(desde, int) or not isinstance(hasta, int) or not 0 <= desde <= hasta < len(segmentos):
+            raise JSONParseError(f"Chunk {i} con rango de segmentos inválido: {desde}-{hasta}")
+        rangos.append((desde, hasta, chunk))
+    rangos.sort(key=lambda r: r[0])
+    
+    chunks = []
+    esperado = 0
+    for desde, hasta, chunk in rangos:
+        if desde != esperado:
+            problema = "hueco" if desde > esperado else "solapamiento"
+            raise JSONParseError(f"Cobertura inválida: {problema} en el segmento {min(desde, esperado)}")
+        inicio, fin = segmentos[desde][0], segmentos[hasta][1]
+        limpio = {k: v for k, v in chunk.items() if k not in ("start_segment", "end_segment", "text")}
+        chunks.append({
+            **limpio,
+            "index": len(chunks),
+            "start": inicio,
+            "end": fin,
+            "text": texto_de_rango(texto, inicio, fin)
+        })
+        esperado = hasta + 1
+    
+    if esperado != len(segmentos):
+        raise JSONParseError(f"Cobertura inválida: faltan los segmentos {esperado} a {len(segmentos) - 1}")
+    
+    return chunks
+
+
+def dividir_en_ventanas(
+    texto: str,
+    max_palabras: int = CHUNKING_WINDOW_WORDS,
+    solape: int = CHUNKING_WINDOW_OVERLAP
+) -> List[Tuple[int, int]]:
+    """
+    Divide el texto en ventanas de párrafos completos de hasta `max_palabras`.
+    Cada ventana repite los últimos `solape` párrafos de la anterior, para
+    que el modelo vea contexto a ambos lados de cada corte.
+    
+    Returns:
+        Lista de rangos [inicio, fin) que juntos cubren todo el texto
+    """
+    parrafos = rangos_de_parrafos(texto)
+    if not parrafos:
+        return [(0, len(texto))]
+    
+    palabras = [len(texto[a:b].split()) for a, b in parrafos]
+    ventanas = []
+    i = 0
+    while True:
+        j = i
+        total = palabras[i]
+        while j + 1 < len(parrafos) and total + palabras[j + 1] <= max_palabras:
+            j += 1
+            total += palabras[j]
+        ventanas.append((parrafos[i][0], parrafos[j][1]))
+        if j == len(parrafos) - 1:
+            break
+        i = max(i + 1, j + 1 - solape)
+    
+    ventanas[0] = (0, ventanas[0][1])
+    ventanas[-1] = (ventanas[-1][0], len(texto))
+    return ventanas
+
+
+def ubicar_chunks(
+    texto: str,
+    chunks: List[Dict[str, Any]],
+    inicio: int = 0,
+    fin: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Ubica en texto[inicio:fin] los chunks devueltos por el LLM y devuelve
+    copias con offsets absolutos "start"/"end".
+    
+    Los chunks que ya traen "start" (absoluto) se usan tal cual; los demás
+    se buscan por su texto. Cada chunk va desde su comienzo hasta el
+    comienzo del siguiente, así los huecos (saltos de línea o texto que el
+    modelo omitió) quedan cubiertos. Un chunk que no aparece literalmente
+    se descarta y su texto queda dentro del anterior.
+    """
+    fin = len(texto) if fin is None else fin
+    ubicados = []
+    cursor = inicio
+    
+    for chunk in chunks:
+        if isinstance(chunk.get("start"), int) and cursor <= chunk["start"] < fin:
+            ubicados.append(dict(chunk))
+            cursor = chunk["start"] + 1
+            continue
+        cabeza = (chunk.get("text") or "").strip()[:60]
+        if not cabeza:
+            continue
+        posicion = texto.find(cabeza, cursor, fin)
+        if posicion < 0:
+            logger.warning(f"Chunk {chunk.get('index')} no coincide con el texto original, se fusiona con el anterior")
+            continue
+        ubicados.append({**chunk, "start": posicion})
+        cursor = posicion + len(cabeza)
+    
+    if not ubicados:
+        raise JSONParseError("Ningún chunk coincide con el texto original")
+    
+    ubicados[0]["start"] = inicio
+    for actual, siguiente in zip(ubicados, ubicados[1:]):
+        actual["end"] = siguiente["start"]
+    ubicados[-1]["end"] = fin
+    return ubicados
+
+
+def verificar_cobertura(texto: str, chunks: List[Dict[str, Any]]) -> None:
+    """
+    Verifica en O(n) que los rangos "start"/"end" de los chunks, en orden,
+    no se solapen y cubran todo el texto salvo espacios en blanco.
+    
+    Raises:
+        ModelError: Si queda texto sin cubrir o hay rangos solapados
+    """
+    cursor = 0
+    for chunk in chunks:
+        if chunk["start"] < cursor:
+            raise ModelError(f"Chunks solapados en el offset {chunk['start']}")
+        if texto[cursor:chunk["start"]].strip():
+            raise ModelError(f"Texto sin cubrir entre los offsets {cursor} y {chunk['start']}")
+        cursor = chunk["end"]
+    if texto[cursor:].strip():
+        raise ModelError(f"Texto sin cubrir desde el offset {cursor}")
+
+
+def coser_ventanas(
+    texto: str,
+    ventanas: List[Tuple[int, int]],
+    resultados: List[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Une los chunks de ventanas solapadas en una sola secuencia sin duplicados.
+    
+    La zona solapada la decide la ventana siguiente (que tiene contexto
+    posterior): de cada ventana se conservan los chunks que empiezan antes
+    que la siguiente ventana; de la siguiente se descartan los ya cubiertos
+    y se recorta el que cruza el límite (si el resto queda demasiado corto,
+    se fusiona con el chunk anterior).
+    """
+    cosidos: List[Dict[str, Any]] = []
+    
+    for k, ((v_inicio, v_fin), chunks) in enumerate(zip(ventanas, resultados)):
+        inicio_siguiente = ventanas[k + 1][0] if k + 1 < len(ventanas) else None
+        cubierto = cosidos[-1]["end"] if cosidos else 0
+        
+        for chunk in ubicar_chunks(texto, chunks, v_inicio, v_fin):
+            if inicio_siguiente is not None and chunk["start"] >= inicio_siguiente:
+                break
+            if chunk["end"] <= cubierto:
+                continue
+            if chunk["start"] < cubierto:
+                chunk["start"] = cubierto
+                if cosidos and len(texto[chunk["start"]:chunk["end"]].split()) < MIN_PALABRAS_CHUNK:
+                    cosidos[-1]["end"] = chunk["end"]
+                    cubierto = chunk["end"]
+                    continue
+            cosidos.append(chunk)
+            cubierto = chunk["end"]
+    
+    return cosidos
+
+
+def chunkear_con_llm_por_ventanas(
+    texto: str,
+    modelo: str = "qwen/qwen3-32b",
+    usar_cache: bool = True,
+    max_palabras: int = CHUNKING_WINDOW_WORDS,
+    solape: int = CHUNKING_WINDOW_OVERLAP,
+    workers: int = CHUNKING_WINDOW_WORKERS
+) -> List[Dict[str, Any]]:
+    """
+    chunkear_con_llm para textos de cualquier largo.
+    
+    Los textos que entran en una ventana se envían tal cual. Los más largos
+    se dividen en ventanas de párrafos solapadas que se chunkean en paralelo
+    (bajo el mismo limitador de tasa), así la latencia depende del tamaño
+    de la ventana y no del de la entrada. Los resultados se cosen, se
+    renumeran y se verifica que cubran todo el texto.
+    
+    Returns:
+        Lista de chunks con el mismo formato que chunkear_con_llm; el texto
+        de cada chunk es el fragmento literal del original
+    """
+    ventanas = dividir_en_ventanas(texto, max_palabras, solape)
+    if len(ventanas) == 1:
+        return chunkear_con_llm(texto, modelo, usar_cache)
+    
+    # Los tiempos de las ventanas cuentan para la entrada que las pidió
+    traza = metrics.traza_actual()
+    
+    def chunkear_ventana(ventana: Tuple[int, int]) -> List[Dict[str, Any]]:
+        # Los offsets vuelven relativos a la ventana: se pasan a absolutos
+        desplazamiento = ventana[0]
+        with metrics.usar_traza(traza):
+            chunks = chunkear_con_llm(texto[ventana[0]:ventana[1]], modelo, usar_cache)
+        return [
+            {**c, "start": c["start"] + desplazamiento, "end": c["end"] + desplazamiento}
+            for c in chunks
+        ]
+    
+    logger.info(f"Entrada larga: chunking en {len(ventanas)} ventanas solapadas")
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(ventanas)))) as pool:
+        resultados = list(pool.map(chunkear_ventana, ventanas))
+    
+    cosidos = coser_ventanas(texto, ventanas, resultados)
+    verificar_cobertura(texto, cosidos)
+    
+    return [
+        {**chunk, "index": i, "text": texto_de_rango(texto, chunk["start"], chunk["end"])}
+        for i, chunk in enumerate(cosidos)
+    ]
+
+
+@metrics.span("analyzer.llm_combined")
+def analizar_y_chunkear_con_llm(
+    texto: str,
+    modelo: str = "qwen/qwen3-32b",
+    usar_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Obtiene en una sola llamada el análisis de la entrada y sus chunks.
+    Envía el texto (y el contexto del perfil) una vez en lugar de dos.
+    Si usar_cache es False, no se consulta la caché de respuestas.
+
+    Returns:
+        Diccionario con las claves:
+        {
+            "analysis": {summary, emotions, topics, people, intensity},
+            "chunks": [{index, type, text, start, end, metadata}, ...]
+        }
+        (los chunks llegan como rangos de segmentos, ver chunkear_con_llm)
+
+    Raises:
+        ModelError: Si falla la llamada o la respuesta no tiene la estructura esperada
+    """
+    segmentos = segmentar_texto(texto)
+    if not segmentos:
+        raise ModelError("Texto vacío, no hay nada que analizar")
+
+    profile_context = get_profile_context()
+    profile_note = ""
+    if profile_context:
+        profile_note = f"""
+
+CONTEXTO DEL USUARIO (para mejor comprensión):
+{profile_context}
+
+Usa esta información solo para contextualizar mejor el contenido, NO la menciones
+ni en el análisis ni en los chunks.
+"""
+
+    prompt = f"""
+Eres un modelo de lenguaje encargado de procesar entradas de un diario personal.{profile_note}
+
+Tu tarea tiene DOS partes:
+
+PARTE 1 — ANÁLISIS DE LA ENTRADA COMPLETA
+- No hagas juicios, no des consejos, no interpretes más allá del texto.
+- No inventes información que no esté explícita o claramente inferida.
+- Si algo no está presente, devuélvelo como null.
+- Claves:
+    summary: resumen neutral en máximo 3 líneas
+    emotions: lista de emociones explícitas o claramente inferidas
+    topics: lista de temas principales
+    people: lista de personas mencionadas (o null)
+    intensity: "baja", "media" o "alta"
+
+PARTE 2 — CHUNKS SEMÁNTICOS
+Divide TODO el texto en chunks coherentes, completos y autosuficientes,
+con metadatos SOLO si están explícitamente justificados por el texto del chunk.
+
+{REGLAS_CHUNKING}
+────────────────────────
+SALIDA OBLIGATORIA (FORMATO EXACTO)
+────────────────────────
+
+Devuelve SOLO un JSON válido con esta estructura exacta:
+
+{{
+  "analysis": {{
+    "summary": "...",
+    "emotions": [],
+    "topics": [],
+    "people": null,
+    "intensity": "baja | media | alta"
+  }},
+  "chunks": [
+    {{
+      "index": 0,
+      "type": "emociones | reflexion | hechos | mixto",
+      "start_segment": 0,
+      "end_segment": 3,
+      "metadata": {{
+        "people": []
+      }}
+    }}
+  ]
+}}
+
+NO agregues texto fuera del JSON.
+NO agregues campos adicionales.
+
+────────────────────────
+TEXTO A PROCESAR ({len(segmentos)} segmentos, del 0 al {len(segmentos) - 1}):
+<<<
+{renderizar_segmentos(texto, segmentos)}
+>>>
+"""
+
+    payload = {
+        "model": modelo,
+        "messages": [
+            {"role": "system", "content": "Eres un analizador de diarios personales y un modelo de chunking semántico estricto."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.2
+    }
+
+    try:
+        raw, clave = solicitar_completado(payload, PROMPT_VERSION_COMBINADO, usar_cache)
+        logger.debug("Respuesta cruda extracción combinada:\n" + raw)
+
+        data = json.loads(extraer_json_de_respuesta(raw))
+
+        if not isinstance(data.get("analysis"), dict):
+            raise JSONParseError("Respuesta sin análisis")
+
+        chunks = data.get("chunks")
+        if not isinstance(chunks, list) or not chunks:
+            raise JSONParseError("Respuesta sin chunks")
+
+        data["chunks"] = chunks_desde_segmentos(texto, segmentos, chunks)
+
+        if clave is not None:
+            cache_llm.guardar(clave, raw)
+
+        return data
+
+    except Exception as e:
+        raise ModelError(f"Extracción combinada vía API falló: {e}")
+
 EMOTIONS_WHITELIST = {
     "alegría", "tristeza", "miedo", "enojo",
     "ansiedad", "frustración", "calma", "confusión"
@@ -868,6 +1582,7 @@ def sanitizar_chunk(chunk: Dict[str, Any], texto_chunk: str) -> Dict[str, Any]:
     #     raise
 
 
+@metrics.span("analyzer.parse_json")
 def extraer_json_de_respuesta(texto: str) -> str:
     """
     Extrae el bloque JSON de la respuesta del modelo.
@@ -893,6 +1608,7 @@ def extraer_json_de_respuesta(texto: str) -> str:
     raise JSONParseError("No se encontró un bloque JSON válido en la respuesta del modelo")
 
 
+@metrics.span("analyzer.parse_json")
 def parsear_analisis(json_texto: str, fecha: str) -> Dict[str, Any]:
     """
     Parsea el JSON y valida su estructura.
@@ -930,6 +1646,9 @@ def cargar_historial_diario(ruta_json: Path) -> list:
     """
     Carga el historial existente del diario.
     
+    El historial vive en el log append-only asociado a `ruta_json`
+    (ver analysis_log); se devuelve la última versión de cada fecha.
+    
     Args:
         ruta_json: Ruta al archivo JSON del historial
         
@@ -937,97 +1656,45 @@ def cargar_historial_diario(ruta_json: Path) -> list:
         Lista con las entradas previas
         
     Raises:
-        JSONParseError: Si el archivo existe pero no es JSON válido
+        FileReadError: Si el log no se puede leer
     """
-    archivo = Path(ruta_json)
-    
-    if not archivo.exists():
-        logger.info(f"Creando nuevo archivo de historial: {ruta_json}")
-        return []
-    
     try:
-        contenido = archivo.read_text(encoding='utf-8')
-        if not contenido.strip():
-            logger.warning(f"El archivo {ruta_json} está vacío, iniciando lista nueva")
-            return []
-        
-        datos = json.loads(contenido)
-        
-        if not isinstance(datos, list):
-            raise JSONParseError(f"El archivo {ruta_json} no contiene una lista")
-        
-        return datos
-        
-    except json.JSONDecodeError as e:
-        raise JSONParseError(f"Error al parsear {ruta_json}: {e}")
+        return obtener_log_analisis(ruta_json).todos()
     except Exception as e:
         raise FileReadError(f"Error al leer {ruta_json}: {e}")
 
 
-def guardar_analisis(analisis: Dict[str, Any], ruta_json: Path) -> None:
+def guardar_analisis(
+    analisis: Dict[str, Any],
+    ruta_json: Path,
+    sincronizar_db: bool = True
+) -> None:
     """
-    Guarda el análisis en el archivo JSON del historial.
+    Guarda el análisis en el historial.
+    
+    Se agrega al log append-only asociado a `ruta_json` (upsert por fecha):
+    guardar una entrada ya no reescribe todo el historial. La vista JSON
+    legacy se genera con `python -m ...analysis_log exportar`.
     
     Args:
         analisis: Diccionario con el análisis a guardar
         ruta_json: Ruta al archivo JSON del historial
+        sincronizar_db: Si False, no se escribe en la DB (quien llama
+            sincroniza en lote con db_sync.sincronizar_lote)
         
     Raises:
         FileReadError: Si no se puede escribir el archivo
     """
     try:
-        historial = cargar_historial_diario(ruta_json)
-        historial.append(analisis)
-        
-        archivo = Path(ruta_json)
-        archivo.write_text(
-            json.dumps(historial, indent=2, ensure_ascii=False),
-            encoding='utf-8'
-        )
+        obtener_log_analisis(ruta_json).upsert(analisis)
         
         logger.info(f"Análisis guardado exitosamente en {ruta_json}")
         
-        # --- DATABASE SYNC ---
-        try:
-            fecha_str = analisis.get("fecha")
-            if fecha_str:
-                try:
-                    query_date = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-                except ValueError:
-                    query_date = datetime.strptime(fecha_str, "%d-%m-%Y").date()
-                
-                with Session(engine) as session:
-                    entry = session.exec(select(JournalEntry).where(JournalEntry.date == query_date)).first()
-                    if not entry:
-                        # Create entry if missing (should not happen in service, but possible in batch)
-                        raw_text = analisis.get("raw_text", "")
-                        entry = JournalEntry(
-                            date=query_date,
-                            raw_text=raw_text,
-                            word_count=len(raw_text.split()) if raw_text else 0,
-                            char_count=len(raw_text) if raw_text else 0
-                        )
-                        session.add(entry)
-                        session.commit()
-                        session.refresh(entry)
-                    
-                    existing_analysis = session.exec(select(EntryAnalysis).where(EntryAnalysis.entry_id == entry.id)).first()
-                    if existing_analysis:
-                        session.delete(existing_analysis)
-                    
-                    db_analysis = EntryAnalysis(
-                        entry_id=entry.id,
-                        summary=analisis.get("summary", ""),
-                        intensity=analisis.get("intensity", "media"),
-                        emotions=analisis.get("emotions", []),
-                        topics=analisis.get("topics", []),
-                        people=analisis.get("people", [])
-                    )
-                    session.add(db_analysis)
-                    session.commit()
-                    logger.info(f"Análisis sincronizado en DB para {fecha_str}")
-        except Exception as e:
-            logger.error(f"Error al sincronizar análisis con DB: {e}")
+        if sincronizar_db:
+            try:
+                sincronizar_lote([analisis], [])
+            except Exception as e:
+                logger.error(f"Error al sincronizar análisis con DB: {e}")
         
     except PermissionError:
         raise FileReadError(f"Sin permisos para escribir en {ruta_json}")
@@ -1035,79 +1702,42 @@ def guardar_analisis(analisis: Dict[str, Any], ruta_json: Path) -> None:
         raise FileReadError(f"Error al guardar el análisis: {e}")
 
 
-def guardar_chunks(chunks: List[Dict[str, Any]], ruta_json: Path) -> None:
+def guardar_chunks(
+    chunks: List[Dict[str, Any]],
+    ruta_json: Path,
+    sincronizar_db: bool = True
+) -> None:
     """
-    Guarda los chunks en un archivo JSON separado.
+    Guarda los chunks en el almacén asociado a `ruta_json` (ver chunk_store).
+    
+    Es un upsert por chunk_id: los chunks anteriores de cada entrada
+    incluida se reemplazan y los que ya no existen se eliminan, así
+    reprocesar una entrada no duplica sus chunks.
     
     Args:
         chunks: Lista de chunks a guardar
         ruta_json: Ruta al archivo JSON de chunks
+        sincronizar_db: Si False, no se escribe en la DB (quien llama
+            sincroniza en lote con db_sync.sincronizar_lote)
         
     Raises:
         FileReadError: Si no se puede escribir el archivo
     """
     try:
-        archivo = Path(ruta_json)
+        chunks_por_entrada: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk in chunks:
+            chunks_por_entrada.setdefault(chunk["entry_id"], []).append(chunk)
         
-        # Cargar chunks existentes si el archivo existe
-        chunks_existentes = []
-        if archivo.exists():
-            try:
-                contenido = archivo.read_text(encoding='utf-8')
-                if contenido.strip():
-                    chunks_existentes = json.loads(contenido)
-            except:
-                logger.warning(f"No se pudieron cargar chunks existentes, creando nuevo archivo")
-        
-        # Agregar nuevos chunks
-        chunks_existentes.extend(chunks)
-        
-        # Guardar
-        archivo.write_text(
-            json.dumps(chunks_existentes, indent=2, ensure_ascii=False),
-            encoding='utf-8'
-        )
+        store = obtener_chunk_store(ruta_json)
+        store.reemplazar_entradas(chunks_por_entrada)
         
-        logger.info(f"Chunks guardados exitosamente en {ruta_json} (total: {len(chunks_existentes)})")
+        logger.info(f"Chunks guardados exitosamente en {ruta_json} (total: {store.contar()})")
         
-        # --- DATABASE SYNC ---
-        try:
-            if chunks:
-                # Group by entry
-                entry_ids = set(c.get("entry_id") for c in chunks)
-                with Session(engine) as session:
-                    for eid in entry_ids:
-                        # Find entry by ID (e.g. entry_2025_01_07)
-                        parts = eid.split("_")
-                        if len(parts) >= 4:
-                            date_str = f"{parts[1]}-{parts[2]}-{parts[3]}"
-                            query_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                            entry = session.exec(select(JournalEntry).where(JournalEntry.date == query_date)).first()
-                            
-                            if entry:
-                                # Delete old chunks for this entry that are in the new batch
-                                # (Or just delete all and re-add for this entry if we are batching)
-                                old_chunks = session.exec(select(EntryChunk).where(EntryChunk.entry_id == entry.id)).all()
-                                for oc in old_chunks:
-                                    session.delete(oc)
-                                
-                                # Add new batches
-                                for c_data in chunks:
-                                    if c_data.get("entry_id") == eid:
-                                        db_chunk = EntryChunk(
-                                            entry_id=entry.id,
-                                            index=c_data.get("index", 0),
-                                            chunk_type=c_data.get("type", "mixto"),
-                                            text=c_data.get("text", ""),
-                                            word_count=c_data.get("word_count", 0),
-                                            char_count=c_data.get("char_count", 0),
-                                            metadata_json=c_data.get("metadata", {})
-                                        )
-                                        session.add(db_chunk)
-                    session.commit()
-                    logger.info(f"Chunks sincronizados en DB")
-        except Exception as e:
-            logger.error(f"Error al sincronizar chunks con DB: {e}")
+        if sincronizar_db and chunks:
+            try:
+                sincronizar_lote([], chunks)
+            except Exception as e:
+                logger.error(f"Error al sincronizar chunks con DB: {e}")
         
     except PermissionError:
         raise FileReadError(f"Sin permisos para escribir en {ruta_json}")
@@ -1115,25 +1745,114 @@ def guardar_chunks(chunks: List[Dict[str, Any]], ruta_json: Path) -> None:
         raise FileReadError(f"Error al guardar chunks: {e}")
 
 
-def analizar_diario_individual(
+def extraer_analisis_y_chunks(
+    contenido: str,
+    fecha: str,
+    entry_id: str,
+    modelo: str = "qwen/qwen3-32b",
+    generar_chunks: bool = True,
+    combinado: bool = LLM_COMBINED_EXTRACTION,
+    usar_cache: bool = True,
+    analisis_previo: Optional[Dict[str, Any]] = None,
+    al_analizar: Optional[Callable[[Dict[str, Any]], None]] = None,
+    modo_chunking: str = CHUNKING_MODE
+) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+    """
+    Obtiene el análisis enriquecido y los chunks de una entrada.
+    
+    En modo combinado usa una sola llamada al LLM; si esa llamada o su
+    validación fallan, vuelve al camino clásico de dos llamadas
+    (analizar_con_llm + chunkear_con_llm). Con chunking heurístico solo
+    se pide el análisis al LLM.
+    
+    Args:
+        contenido: Texto de la entrada
+        fecha: Fecha que se guardará en el análisis
+        entry_id: ID de la entrada
+        modelo: Modelo a usar
+        generar_chunks: Si True, genera también los chunks semánticos
+        combinado: Si True, intenta primero la extracción combinada
+        usar_cache: Si False, ignora la caché de respuestas del LLM
+        analisis_previo: Análisis ya obtenido (al reanudar una corrida);
+            si se pasa, solo se generan los chunks
+        al_analizar: Se llama con el análisis enriquecido apenas está
+            listo, antes del chunking (checkpoint de la corrida)
+        modo_chunking: "llm", "heuristico" o "auto" (ver crear_chunks_enriquecidos)
+        
+    Returns:
+        Tupla (análisis, chunks). chunks es None si generar_chunks es False.
+        
+    Raises:
+        DiaryAnalyzerError: Si falla también el camino de dos llamadas
+    """
+    analisis = dict(analisis_previo) if analisis_previo else None
+    chunks_llm = None
+    
+    # Las entradas largas se chunkean por ventanas: la llamada combinada
+    # tendría que devolver el texto completo en una sola respuesta
+    entrada_larga = len(contenido.split()) > CHUNKING_WINDOW_WORDS
+    
+    if analisis is None and combinado and generar_chunks and modo_chunking != "heuristico" and not entrada_larga:
+        try:
+            data = analizar_y_chunkear_con_llm(contenido, modelo, usar_cache)
+            analisis = parsear_analisis(json.dumps(data["analysis"], ensure_ascii=False), fecha)
+            chunks_llm = data["chunks"]
+        except DiaryAnalyzerError as e:
+            logger.warning(f"Extracción combinada falló para {entry_id}, usando dos llamadas: {e}")
+            analisis = None
+            chunks_llm = None
+    
+    if analisis is None:
+        respuesta = analizar_con_llm(contenido, modelo, usar_cache)
+        analisis = parsear_analisis(extraer_json_de_respuesta(respuesta), fecha)
+    
+    analisis['id'] = entry_id
+    analisis['raw_text'] = contenido
+    analisis['word_count'] = len(contenido.split())
+    analisis['char_count'] = len(contenido)
+    
+    if al_analizar is not None and analisis_previo is None:
+        al_analizar(analisis)
+    
+    chunks = None
+    if generar_chunks:
+        chunks = crear_chunks_enriquecidos(
+            contenido,
+            analisis,
+            entry_id,
+            modelo,
+            chunks_llm=chunks_llm,
+            usar_cache=usar_cache,
+            modo=modo_chunking
+        )
+        analisis['chunk_count'] = len(chunks)
+    
+    return analisis, chunks
+
+
+@metrics.span("analyzer.prepare")
+def preparar_diario(
     ruta_archivo: Path,
-    ruta_salida: Path,
-    ruta_chunks: Path,
     modelo: str = "liquidai/lfm2-2.6b-exp@f16",
-    generar_chunks: bool = True
-) -> Optional[Dict[str, Any]]:
+    generar_chunks: bool = True,
+    run_id: Optional[int] = None,
+    previo: Optional[Any] = None
+) -> Optional[Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]]:
     """
-    Analiza un archivo individual de diario.
+    Ejecuta las etapas con LLM (análisis y chunking) de un archivo,
+    sin escribir nada en disco. Es seguro llamarla desde varios hilos.
     
     Args:
         ruta_archivo: Path al archivo de diario
-        ruta_salida: Ruta al archivo JSON de salida
-        ruta_chunks: Ruta al archivo JSON de chunks
-        modelo: Modelo de LM Studio a usar
-        generar_chunks: Si True, genera y guarda chunks semánticos
+        modelo: Modelo a usar
+        generar_chunks: Si True, genera también los chunks semánticos
+        run_id: Corrida en la que se registran las etapas completadas
+        previo: Fila de la corrida (ProcessingRunEntry) al reanudar; sus
+            resultados se reutilizan si el archivo no cambió desde entonces
         
     Returns:
-        Diccionario con el análisis si fue exitoso, None si hubo error
+        Tupla (análisis, chunks) si fue exitoso, None si hubo error.
+        chunks es None cuando generar_chunks es False.
     """
     try:
         fecha = extraer_fecha_de_nombre(ruta_archivo.name)
@@ -1147,47 +1866,119 @@ def analizar_diario_individual(
         # 1. Leer archivo
         contenido = leer_archivo_diario(str(ruta_archivo))
         
-        # 2. Analizar con LLM
-        respuesta = analizar_con_llm(contenido, modelo)
+        # 1b. Reanudar desde la primera etapa incompleta
+        analisis_previo = None
+        if previo is not None and previo.analysis_json:
+            if previo.analysis_json.get("raw_text") != contenido:
+                logger.info(f"{ruta_archivo.name} cambió desde la corrida anterior, se reanaliza")
+            elif previo.stage == "chunked" and (previo.chunks_json is not None or not generar_chunks):
+                logger.info(f"↺ {entry_id}: análisis y chunks recuperados de la corrida")
+                return previo.analysis_json, previo.chunks_json if generar_chunks else None
+            else:
+                logger.info(f"↺ {entry_id}: análisis recuperado de la corrida, falta chunking")
+                analisis_previo = previo.analysis_json
+        
+        def al_analizar(analisis: Dict[str, Any]) -> None:
+            if run_id is not None:
+                run_journal.registrar_etapa(run_id, ruta_archivo, "analyzed", analisis=analisis)
+        
+        # 2. Analizar y generar chunks con LLM (extraer, parsear y validar JSON)
+        analisis, chunks = extraer_analisis_y_chunks(
+            contenido,
+            fecha,
+            entry_id,
+            modelo,
+            generar_chunks,
+            analisis_previo=analisis_previo,
+            al_analizar=al_analizar
+        )
+        if chunks is not None:
+            logger.info(f"✓ Generados {len(chunks)} chunks para {entry_id}")
         
-        # 3. Extraer JSON
-        json_texto = extraer_json_de_respuesta(respuesta)
+        if run_id is not None:
+            run_journal.registrar_etapa(run_id, ruta_archivo, "chunked", analisis=analisis, chunks=chunks)
         
-        # 4. Parsear y validar
-        analisis = parsear_analisis(json_texto, fecha)
+        return analisis, chunks
         
-        # 5. Agregar información adicional
-        analisis['id'] = entry_id
-        analisis['raw_text'] = contenido
-        analisis['word_count'] = len(contenido.split())
-        analisis['char_count'] = len(contenido)
+    except DiaryAnalyzerError as e:
+        logger.error(f"✗ Error al analizar {ruta_archivo.name}: {e}")
+        if run_id is not None:
+            run_journal.registrar_error(run_id, ruta_archivo, str(e))
+        return None
+    except Exception as e:
+        logger.error(f"✗ Error inesperado en {ruta_archivo.name}: {e}", exc_info=True)
+        if run_id is not None:
+            run_journal.registrar_error(run_id, ruta_archivo, str(e))
+        return None
 
-        time.sleep(0.5)
 
-        # 6. Generar chunks si está habilitado
-        if generar_chunks:
-            chunks = crear_chunks_enriquecidos(
-                contenido,
-                analisis,
-                entry_id,
-                modelo
-            )
-            guardar_chunks(chunks, ruta_chunks)
-            analisis['chunk_count'] = len(chunks)
-            logger.info(f"✓ Generados {len(chunks)} chunks para {entry_id}")
+@metrics.span("analyzer.persist")
+def persistir_diario(
+    analisis: Dict[str, Any],
+    chunks: Optional[List[Dict[str, Any]]],
+    ruta_salida: Path,
+    ruta_chunks: Path,
+    sincronizar_db: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Guarda los chunks y el análisis de una entrada ya preparada.
+    
+    Args:
+        sincronizar_db: Si True, escribe análisis y chunks en la DB en una
+            sola transacción; si False, lo hace quien llama (por lotes)
+    
+    Returns:
+        El análisis si se guardó correctamente, None si hubo error
+    """
+    try:
+        if chunks is not None:
+            guardar_chunks(chunks, ruta_chunks, sincronizar_db=False)
+        
+        guardar_analisis(analisis, ruta_salida, sincronizar_db=False)
         
-        # 7. Guardar análisis principal
-        guardar_analisis(analisis, ruta_salida)
+        if sincronizar_db:
+            try:
+                sincronizar_lote([analisis], chunks or [])
+            except Exception as e:
+                logger.error(f"Error al sincronizar {analisis.get('id')} con DB: {e}")
         
-        logger.info(f"✓ {ruta_archivo.name} procesado exitosamente")
+        logger.info(f"✓ {analisis.get('id')} procesado exitosamente")
         return analisis
         
     except DiaryAnalyzerError as e:
-        logger.error(f"✗ Error al analizar {ruta_archivo.name}: {e}")
+        logger.error(f"✗ Error al guardar {analisis.get('id')}: {e}")
         return None
     except Exception as e:
-        logger.error(f"✗ Error inesperado en {ruta_archivo.name}: {e}", exc_info=True)
+        logger.error(f"✗ Error inesperado al guardar {analisis.get('id')}: {e}", exc_info=True)
+        return None
+
+
+def analizar_diario_individual(
+    ruta_archivo: Path,
+    ruta_salida: Path,
+    ruta_chunks: Path,
+    modelo: str = "liquidai/lfm2-2.6b-exp@f16",
+    generar_chunks: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Analiza un archivo individual de diario.
+    
+    Args:
+        ruta_archivo: Path al archivo de diario
+        ruta_salida: Ruta al archivo JSON de salida
+        ruta_chunks: Ruta al archivo JSON de chunks
+        modelo: Modelo de LM Studio a usar
+        generar_chunks: Si True, genera y guarda chunks semánticos
+        
+    Returns:
+        Diccionario con el análisis si fue exitoso, None si hubo error
+    """
+    preparado = preparar_diario(ruta_archivo, modelo, generar_chunks)
+    if preparado is None:
         return None
+    
+    analisis, chunks = preparado
+    return persistir_diario(analisis, chunks, ruta_salida, ruta_chunks)
 
 
 def procesar_carpeta_diarios(
@@ -1196,11 +1987,29 @@ def procesar_carpeta_diarios(
     ruta_chunks: Path,
     modelo: str = "liquidai/lfm2-2.6b-exp@f16",
     forzar_reprocesar: bool = False,
-    generar_chunks: bool = True
+    generar_chunks: bool = True,
+    workers: int = 1,
+    reanudar: bool = False,
+    indexar: bool = False
 ) -> Dict[str, int]:
     """
     Procesa todos los archivos de diario en una carpeta.
     
+    Las llamadas al LLM se reparten entre `workers` hilos, regulados por
+    el limitador de tasa compartido. Los resultados se guardan siempre
+    desde el hilo principal y en el orden de los archivos, de modo que
+    si el proceso se interrumpe lo guardado es un prefijo consistente.
+    La DB se sincroniza por lotes de DB_SYNC_BATCH_SIZE entradas, con una
+    transacción por lote (ver db_sync).
+    
+    Cada corrida queda registrada en la bitácora (ver run_journal) con la
+    etapa alcanzada por cada archivo. Con `reanudar`, se retoma la última
+    corrida incompleta desde la primera etapa pendiente de cada archivo,
+    reutilizando los análisis y chunks ya obtenidos.
+    
+    Los tiempos por etapa y por entrada, los tokens y el throughput se
+    guardan al final en un reporte JSON (ver run_report).
+    
     Args:
         carpeta: Carpeta con los archivos de diario
         ruta_salida: Archivo JSON donde guardar los análisis
@@ -1208,6 +2017,9 @@ def procesar_carpeta_diarios(
         modelo: Modelo de LM Studio a usar
         forzar_reprocesar: Si True, reprocesa todos los archivos
         generar_chunks: Si True, genera chunks semánticos
+        workers: Cantidad de archivos analizados en paralelo
+        reanudar: Si True, retoma la última corrida incompleta (si hay)
+        indexar: Si True, al final actualiza el índice FAISS (etapa embedded)
         
     Returns:
         Diccionario con estadísticas del procesamiento
@@ -1227,44 +2039,169 @@ def procesar_carpeta_diarios(
     }
     
     try:
-        if forzar_reprocesar:
-            archivos = obtener_archivos_diario(carpeta)
-            logger.info("Modo: REPROCESAR TODO")
+        corrida = run_journal.ultima_corrida_incompleta() if reanudar else None
+        
+        if corrida is not None:
+            run_id = corrida.id
+            indexar = indexar or corrida.target_stage == "embedded"
+            previos = run_journal.entradas_de_corrida(run_id)
+            archivos = [Path(ruta) for ruta in previos]
+            logger.info(f"Modo: REANUDAR CORRIDA {run_id} (iniciada {corrida.started_at:%Y-%m-%d %H:%M})")
         else:
-            archivos = obtener_archivos_pendientes(carpeta, ruta_salida)
-            logger.info("Modo: SOLO NUEVOS")
+            if reanudar:
+                logger.info("No hay corridas incompletas para reanudar")
+            if forzar_reprocesar:
+                archivos = obtener_archivos_diario(carpeta)
+                logger.info("Modo: REPROCESAR TODO")
+            else:
+                archivos = obtener_archivos_pendientes(carpeta, ruta_salida)
+                logger.info("Modo: SOLO NUEVOS")
+            previos = {}
+            run_id = None
         
         estadisticas['total'] = len(archivos)
         
         if not archivos:
             logger.info("No hay archivos para procesar")
+            if run_id is not None:
+                run_journal.finalizar_corrida(run_id)
             return estadisticas
         
-        logger.info(f"Archivos a procesar: {estadisticas['total']}")
+        etapa_objetivo = "embedded" if indexar else "persisted"
+        if run_id is None:
+            run_id = run_journal.iniciar_corrida(archivos, etapa_objetivo)
+        
+        # Los ya persistidos en la corrida anterior no vuelven a pasar por el LLM
+        persistidos = []
+        a_preparar = []
+        for archivo in archivos:
+            previo = previos.get(os.path.abspath(archivo))
+            if previo is not None and run_journal.etapa_alcanzada(previo.stage, "persisted"):
+                estadisticas['omitidos'] += 1
+                if previo.stage == "persisted":
+                    persistidos.append(archivo)
+            else:
+                a_preparar.append(archivo)
+        
+        workers = max(1, workers)
+        logger.info(f"Archivos a procesar: {len(a_preparar)} de {estadisticas['total']} (workers: {workers})")
         logger.info("-"*60)
         
-        for i, archivo in enumerate(archivos, 1):
-            logger.info(f"\n[{i}/{estadisticas['total']}] Procesando...")
-            
-            resultado = analizar_diario_individual(
-                archivo, 
-                ruta_salida, 
-                ruta_chunks,
-                modelo,
-                generar_chunks
-            )
+        # stat antes de leer: es la versión que quedará en el manifiesto
+        stats = {}
+        for archivo in a_preparar:
+            try:
+                stats[archivo] = os.stat(archivo)
+            except OSError:
+                stats[archivo] = None
+        
+        reporte = ReporteCorrida(run_id, workers)
+        lote_db = []
+        
+        def preparar_con_traza(archivo: Path, previo: Optional[Any]):
+            traza = reporte.nueva_traza(archivo.name)
+            with metrics.usar_traza(traza):
+                return preparar_diario(archivo, modelo, generar_chunks, run_id, previo), traza
+        
+        def volcar_lote_db() -> None:
+            """
+            Escribe el lote en la DB con un solo commit. Recién entonces
+            las entradas cuentan como persistidas: si falla, conservan
+            sus resultados en la bitácora y se pueden reanudar.
+            """
+            if not lote_db:
+                return
+            archivos_lote = [archivo for archivo, _, _ in lote_db]
+            try:
+                with metrics.usar_traza(reporte.traza_corrida), metrics.span("analyzer.db_sync"):
+                    sincronizar_lote(
+                        [resultado for _, resultado, _ in lote_db],
+                        [c for _, _, chunks in lote_db for c in (chunks or [])]
+                    )
+            except Exception as e:
+                logger.error(f"Error al sincronizar {len(lote_db)} entradas con DB: {e}", exc_info=True)
+                for archivo in archivos_lote:
+                    run_journal.registrar_error(run_id, archivo, f"Error al sincronizar con DB: {e}")
+                estadisticas['fallidos'] += len(lote_db)
+                lote_db.clear()
+                return
             
-            if resultado:
+            run_journal.registrar_etapas(run_id, archivos_lote, "persisted")
+            for archivo, resultado, _ in lote_db:
+                persistidos.append(archivo)
+                if stats[archivo] is not None:
+                    registrar_procesado(archivo, resultado['raw_text'], stats[archivo])
                 estadisticas['exitosos'] += 1
                 if generar_chunks and 'chunk_count' in resultado:
                     estadisticas['chunks_generados'] += resultado['chunk_count']
-            else:
-                estadisticas['fallidos'] += 1
+            lote_db.clear()
+        
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futuros = {
+                pool.submit(
+                    preparar_con_traza,
+                    archivo,
+                    previos.get(os.path.abspath(archivo))
+                ): i
+                for i, archivo in enumerate(a_preparar)
+            }
             
-            if i < len(archivos):
-                logger.info("Esperando 1 segundo antes del siguiente archivo...")
-                import time
-                time.sleep(1)
+            # Los resultados llegan en cualquier orden; se guardan en orden
+            listos = {}
+            siguiente = 0
+            
+            for futuro in as_completed(futuros):
+                listos[futuros[futuro]] = futuro.result()
+                
+                while siguiente in listos:
+                    preparado, traza = listos.pop(siguiente)
+                    archivo = a_preparar[siguiente]
+                    siguiente += 1
+                    logger.info(f"[{siguiente}/{len(a_preparar)}] Guardando {archivo.name}")
+                    
+                    resultado = None
+                    if preparado is not None:
+                        with metrics.usar_traza(traza):
+                            resultado = persistir_diario(
+                                *preparado, ruta_salida, ruta_chunks, sincronizar_db=False
+                            )
+                    reporte.cerrar_traza(traza, exitosa=resultado is not None)
+                    
+                    if resultado:
+                        lote_db.append((archivo, resultado, preparado[1]))
+                        if len(lote_db) >= DB_SYNC_BATCH_SIZE:
+                            volcar_lote_db()
+                    else:
+                        if preparado is not None:
+                            run_journal.registrar_error(run_id, archivo, "Error al guardar")
+                        estadisticas['fallidos'] += 1
+        finally:
+            # Ante Ctrl-C o error, no lanzar los archivos que aún no empezaron
+            pool.shutdown(wait=False, cancel_futures=True)
+            # y dejar en la DB lo que ya se guardó en el log y el almacén
+            volcar_lote_db()
+        
+        # Etapa final: embeddings de los chunks nuevos o modificados
+        if indexar and persistidos:
+            from backend.app.config import FAISS_INDEX_FILE, METADATA_FILE
+            from backend.app.modules.journal.core.embedding_generator import DiarioVectorIndexer
+            
+            logger.info("Actualizando índice FAISS...")
+            try:
+                with metrics.usar_traza(reporte.traza_corrida):
+                    DiarioVectorIndexer().indexar_delta(
+                        obtener_chunk_store(ruta_chunks),
+                        FAISS_INDEX_FILE,
+                        METADATA_FILE
+                    )
+                run_journal.registrar_etapas(run_id, persistidos, "embedded")
+            except Exception as e:
+                logger.error(f"Error al actualizar el índice FAISS: {e}", exc_info=True)
+        
+        estado = run_journal.finalizar_corrida(run_id)
+        informe = reporte.finalizar()
+        reporte.guardar(informe)
         
         # Resumen final
         logger.info("\n" + "="*60)
@@ -1276,11 +2213,13 @@ def procesar_carpeta_diarios(
         logger.info(f"⊘ Omitidos: {estadisticas['omitidos']}")
         if generar_chunks:
             logger.info(f"📦 Chunks generados: {estadisticas['chunks_generados']}")
+        for linea in resumen_para_log(informe):
+            logger.info(linea)
         
-        if estadisticas['exitosos'] == estadisticas['total']:
+        if estado == "completed":
             logger.info("\n🎉 ¡Todos los archivos procesados exitosamente!")
-        elif estadisticas['fallidos'] > 0:
-            logger.warning(f"\n⚠️  {estadisticas['fallidos']} archivo(s) con errores")
+        else:
+            logger.warning(f"\n⚠️  Corrida {run_id} incompleta: se puede retomar con --reanudar")
         
         return estadisticas
         
@@ -1293,14 +2232,23 @@ def procesar_carpeta_diarios(
 
 
 if __name__ == "__main__":
+    import sys
+    from backend.app.core.database import init_db
+    
+    # Tablas y columnas nuevas (la API lo hace al arrancar; el CLI puede correr solo)
+    init_db()
+    
     # Configuración
     from backend.app.config import DIARY_ENTRIES_DIR as CARPETA_DIARIOS # == CARPETA_DIARIOS = "diarios"              # Carpeta con los archivos .md
     from backend.app.config import RAW_DIARY_JSON as ARCHIVO_SALIDA # == ARCHIVO_SALIDA = "data/diario.json"  ## Archivo JSON de análisis
     from backend.app.config import CHUNKS_FILE as ARCHIVO_CHUNKS # == ARCHIVO_CHUNKS = "data/diario_chunks.json" ## Archivo JSON de chunks
+    from backend.app.config import ANALYZER_WORKERS as WORKERS # Archivos analizados en paralelo
     MODELO_LLM = "qwen/qwen3-32b"
     MODELO_LLM_local = "lmstudio-community/Qwen2.5-7B-Instruct-1M-GGUF" # Recomendaci'on
     FORZAR_REPROCESAR = False                # True para reprocesar todo
     GENERAR_CHUNKS = True                    # True para generar chunks semánticos
+    REANUDAR = "--reanudar" in sys.argv      # Retomar la última corrida interrumpida
+    INDEXAR = "--indexar" in sys.argv        # Actualizar el índice FAISS al final
     
     # Ejecutar procesamiento batch
     estadisticas = procesar_carpeta_diarios(
@@ -1309,7 +2257,10 @@ if __name__ == "__main__":
         ruta_chunks=ARCHIVO_CHUNKS,
         modelo=MODELO_LLM,
         forzar_reprocesar=FORZAR_REPROCESAR,
-        generar_chunks=GENERAR_CHUNKS
+        generar_chunks=GENERAR_CHUNKS,
+        workers=WORKERS,
+        reanudar=REANUDAR,
+        indexar=INDEXAR
     )
     
     # Mensaje final
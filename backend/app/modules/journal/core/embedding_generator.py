@@ -8,10 +8,17 @@ Responsabilidades:
 - Generar embeddings semánticos
 - Crear índice FAISS
 - Guardar índice + metadata textual
+- Aplicar solo el delta del almacén de chunks (nuevos, modificados, eliminados)
+
+La API, el modo vigilancia y los scripts batch pueden indexar a la vez:
+cada actualización (leer índice → aplicar delta → guardar) corre bajo un
+bloqueo de archivo entre procesos, y los archivos se reemplazan de forma
+atómica para que quien solo lee nunca vea uno a medio escribir.
 """
 
 import json
 import logging
+import os
 from typing import List, Dict, Any
 
 import numpy as np
@@ -20,6 +27,10 @@ from sentence_transformers import SentenceTransformer
 
 from pathlib import Path
 
+from backend.app.core import metrics
+from backend.app.modules.journal.core.chunk_store import ChunkStore, sin_texto
+from backend.app.modules.journal.core.file_lock import bloqueo_de_archivo
+
 
 # ============================================================
 # CONFIGURACIÓN DE LOGGING
@@ -46,21 +57,41 @@ class DiarioVectorIndexer:
 
     def __init__(
         self,
-        model_name: str = "intfloat/multilingual-e5-small"
+        model_name: str = "intfloat/multilingual-e5-small",
+        model: SentenceTransformer | None = None
     ):
-        logger.info(f"Cargando modelo de embeddings: {model_name}")
-        self.model = SentenceTransformer(
-            model_name,
-            device="cpu"
-        )
-        self.dimension = self.model.get_sentence_embedding_dimension()
-        logger.info(f"Modelo cargado | Dimensión: {self.dimension}")
+        """
+        Args:
+            model_name: Modelo de sentence-transformers a cargar al primer uso
+            model: Modelo ya cargado (o un doble con la misma interfaz); si
+                se pasa, no se carga ninguno
+        """
+        self.model_name = model_name
+        self._model: SentenceTransformer | None = model
 
         self.index: faiss.Index | None = None
         self.metadata: List[Dict[str, Any]] = []
 
     # --------------------------------------------------------
 
+    @property
+    def model(self) -> SentenceTransformer:
+        """Se carga al primer uso: un delta sin chunks nuevos no lo necesita."""
+        if self._model is None:
+            logger.info(f"Cargando modelo de embeddings: {self.model_name}")
+            self._model = SentenceTransformer(
+                self.model_name,
+                device="cpu"
+            )
+            logger.info(f"Modelo cargado | Dimensión: {self.dimension}")
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    # --------------------------------------------------------
+
     def cargar_chunks(self, archivo_chunks: Path) -> List[Dict[str, Any]]:
         logger.info(f"Cargando chunks desde: {archivo_chunks}")
         with open(archivo_chunks, "r", encoding="utf-8") as f:
@@ -71,6 +102,7 @@ class DiarioVectorIndexer:
 
     # --------------------------------------------------------
 
+    @metrics.span("index.embedding")
     def generar_embeddings(self, textos: List[str]) -> np.ndarray:
         logger.info("Generando embeddings...")
         embeddings = self.model.encode(
@@ -85,28 +117,44 @@ class DiarioVectorIndexer:
 
     # --------------------------------------------------------
 
-    def crear_indice(self, embeddings: np.ndarray) -> None:
-        logger.info("Creando índice FAISS (IndexFlatIP)")
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.index.add(embeddings)
+    def crear_indice(self, embeddings: np.ndarray, ids: List[int] = None) -> None:
+        """
+        Crea un IndexFlatIP envuelto en IndexIDMap2, para poder
+        quitar y reemplazar vectores por ID sin reconstruir todo.
+        """
+        logger.info("Creando índice FAISS (IndexFlatIP con IDs)")
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        if ids is None:
+            ids = list(range(len(embeddings)))
+        if len(embeddings):
+            self.index.add_with_ids(embeddings, np.asarray(ids, dtype="int64"))
 
         logger.info(f"Índice FAISS creado | Vectores: {self.index.ntotal}")
 
     # --------------------------------------------------------
 
+    @metrics.span("index.write")
     def guardar(self, ruta_index: Path, ruta_metadata: Path) -> None:
         if self.index is None:
             raise RuntimeError("No hay índice para guardar")
 
         logger.info(f"Guardando índice FAISS en: {ruta_index}")
-        faiss.write_index(self.index, str(ruta_index))
+        temporal = Path(str(ruta_index) + ".tmp")
+        faiss.write_index(self.index, str(temporal))
+        os.replace(temporal, ruta_index)
 
-        logger.info(f"Guardando metadata en: {ruta_metadata}")
-        with open(ruta_metadata, "w", encoding="utf-8") as f:
-            json.dump(self.metadata, f, indent=2, ensure_ascii=False)
+        self.guardar_metadata(ruta_metadata)
 
         logger.info("Persistencia completada")
 
+    def guardar_metadata(self, ruta_metadata: Path) -> None:
+        # Los chunks con offsets se guardan sin texto (se recorta al cargar)
+        logger.info(f"Guardando metadata en: {ruta_metadata}")
+        temporal = Path(str(ruta_metadata) + ".tmp")
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump([sin_texto(c) for c in self.metadata], f, indent=2, ensure_ascii=False)
+        os.replace(temporal, ruta_metadata)
+
     # --------------------------------------------------------
 
     def indexar_desde_chunks(
@@ -120,6 +168,8 @@ class DiarioVectorIndexer:
         chunks → embeddings → FAISS → guardado
         """
         chunks = self.cargar_chunks(archivo_chunks)
+        for i, chunk in enumerate(chunks):
+            chunk["vector_id"] = i
 
         textos = [chunk["text"] for chunk in chunks]
         self.metadata = chunks  # solo texto + info, sin embeddings
@@ -128,20 +178,131 @@ class DiarioVectorIndexer:
         self.crear_indice(embeddings)
         self.guardar(ruta_index, ruta_metadata)
 
+    # --------------------------------------------------------
+
+    def indexar_desde_store(
+        self,
+        store: ChunkStore,
+        ruta_index: Path,
+        ruta_metadata: Path
+    ) -> None:
+        """
+        Reconstrucción completa desde el almacén de chunks.
+        Los IDs de los vectores son los `vector_id` del almacén.
+        """
+        with bloqueo_de_archivo(ruta_index):
+            self._reconstruir_desde_store(store, ruta_index, ruta_metadata)
+
+    def _reconstruir_desde_store(
+        self,
+        store: ChunkStore,
+        ruta_index: Path,
+        ruta_metadata: Path
+    ) -> None:
+        _, eliminados = store.delta()
+        self.metadata = store.todos()
+        # Sin su texto analizado no hay qué embeber: quedan pendientes
+        chunks = [c for c in self.metadata if not c.get("stale")]
+
+        embeddings = self.generar_embeddings([c["text"] for c in chunks]) if chunks else np.zeros((0, self.dimension), dtype="float32")
+        self.crear_indice(embeddings, [c["vector_id"] for c in chunks])
+        self.guardar(ruta_index, ruta_metadata)
+
+        store.confirmar_indexado(chunks, eliminados)
+
+    # --------------------------------------------------------
+
+    def indexar_delta(
+        self,
+        store: ChunkStore,
+        ruta_index: Path,
+        ruta_metadata: Path,
+        actualizar_metadata: bool = False
+    ) -> None:
+        """
+        Aplica al índice existente solo los cambios pendientes del almacén:
+        quita los vectores eliminados o modificados y agrega los nuevos.
+        Si no hay índice (o es uno legacy sin IDs) reconstruye todo.
+        
+        Con `actualizar_metadata`, la metadata se reescribe aunque no haya
+        vectores que cambiar (p. ej. chunks conservados con offsets nuevos).
+
+        Lee el delta y el índice bajo el bloqueo: otro proceso que indexa
+        al mismo tiempo espera y después aplica solo lo que quede.
+        """
+        ruta_index = Path(ruta_index)
+        with bloqueo_de_archivo(ruta_index):
+            self._aplicar_delta(store, ruta_index, ruta_metadata, actualizar_metadata)
+
+    def _aplicar_delta(
+        self,
+        store: ChunkStore,
+        ruta_index: Path,
+        ruta_metadata: Path,
+        actualizar_metadata: bool
+    ) -> None:
+        if not ruta_index.exists():
+            logger.info("No hay índice previo, reconstruyendo completo")
+            store.marcar_todo_pendiente()
+            return self._reconstruir_desde_store(store, ruta_index, ruta_metadata)
+
+        with metrics.span("index.read"):
+            self.index = faiss.read_index(str(ruta_index))
+        if not isinstance(self.index, faiss.IndexIDMap2):
+            logger.info("Índice legacy sin IDs, reconstruyendo completo")
+            store.marcar_todo_pendiente()
+            return self._reconstruir_desde_store(store, ruta_index, ruta_metadata)
+
+        pendientes, eliminados = store.delta()
+        # Chunks sin su texto analizado (entrada editada sin reprocesar): se
+        # dejan pendientes, sin embeber el recorte de otra versión
+        pendientes = [c for c in pendientes if not c.get("stale")]
+        if not pendientes and not eliminados:
+            logger.info("Índice al día, nada que indexar")
+            if actualizar_metadata:
+                self.metadata = store.todos()
+                with metrics.span("index.write"):
+                    self.guardar_metadata(ruta_metadata)
+            return
+
+        logger.info(f"Delta: {len(pendientes)} chunks a (re)indexar, {len(eliminados)} a eliminar")
+
+        a_quitar = eliminados + [c["vector_id"] for c in pendientes]
+        self.index.remove_ids(np.asarray(a_quitar, dtype="int64"))
+
+        if pendientes:
+            embeddings = self.generar_embeddings([c["text"] for c in pendientes])
+            self.index.add_with_ids(
+                embeddings,
+                np.asarray([c["vector_id"] for c in pendientes], dtype="int64")
+            )
+
+        self.metadata = store.todos()
+        self.guardar(ruta_index, ruta_metadata)
+
+        store.confirmar_indexado(pendientes, eliminados)
+
 
 # ============================================================
 # EJECUCIÓN DIRECTA
 # ============================================================
 
 if __name__ == "__main__":
+    import sys
     indexer = DiarioVectorIndexer()
     
     from backend.app.config import CHUNKS_FILE, FAISS_INDEX_FILE, METADATA_FILE
+    from backend.app.modules.journal.core.chunk_store import obtener_chunk_store
 
-    indexer.indexar_desde_chunks(
-        CHUNKS_FILE, # == archivo_chunks="data/diario_chunks.json",
-        FAISS_INDEX_FILE, # == ruta_index="data/diario_index.faiss",
-        METADATA_FILE # == ruta_metadata="data/diario_metadata.json"
-    )
+    store = obtener_chunk_store(CHUNKS_FILE) # == chunks.db al lado de chunks.json
+
+    if "--full" in sys.argv:
+        indexer.indexar_desde_store(store, FAISS_INDEX_FILE, METADATA_FILE)
+    else:
+        indexer.indexar_delta(
+            store,
+            FAISS_INDEX_FILE, # == ruta_index="data/diario_index.faiss",
+            METADATA_FILE # == ruta_metadata="data/diario_metadata.json"
+        )
 
     logger.info("✓ Indexación del diario completada con éxito")
@@ -0,0 +1,227 @@
+"""
+Agregados de Emociones
+----------------------
+Mantiene en SQLite las menciones de cada emoción normalizada por día
+(DailyEmotionCount) y su total histórico (EmotionTotal), para que las
+estadísticas no tengan que recorrer todos los análisis:
+
+- Al escribir análisis (db_sync.sincronizar_lote) se reemplazan las filas
+  de esos días y se ajustan los totales en la misma transacción. Cada día
+  tiene un solo análisis, así que sus filas se recalculan sin leer nada más.
+  Los totales se suman en SQL (upsert), seguro con varios escritores.
+- Al arrancar la app, si las tablas están vacías y ya hay análisis (una
+  base anterior a estos agregados) o los totales no cuadran con los
+  conteos diarios, se reconstruyen desde EntryAnalysis.
+
+Las consultas cuestan según el rango de días pedido, no según el tamaño
+del diario. Devuelven las emociones en orden de primera mención (como un
+Counter sobre los análisis en orden de escritura): cada fila diaria guarda
+en `first_mention` el ID del análisis y la posición de la emoción en su
+lista, y los empates se resuelven igual que antes.
+"""
+
+import logging
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from backend.app.core.database import engine
+from backend.app.modules.journal.models import (
+    DailyEmotionCount,
+    EmotionTotal,
+    EntryAnalysis,
+    JournalEntry,
+)
+from backend.app.modules.journal.core.emotions import normalizar_emociones
+
+
+logger = logging.getLogger(__name__)
+
+# Límite prudente de parámetros por consulta en SQLite
+_LOTE_IN = 500
+
+# Filas por inserción al reconstruir
+_LOTE_RECONSTRUCCION = 5000
+
+# Posiciones por análisis en first_mention (ID * _POSICIONES + posición)
+_POSICIONES = 1000
+
+
+def _en_lotes(valores: List[Any], tamano: int = _LOTE_IN) -> Iterable[List[Any]]:
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+def _menciones(analysis_id: int, emociones: Any) -> Dict[str, Tuple[int, int]]:
+    """{emoción normalizada: (menciones, first_mention)}, en orden de aparición."""
+    menciones: Dict[str, Tuple[int, int]] = {}
+    for posicion, emocion in enumerate(normalizar_emociones(emociones)):
+        cantidad, primera = menciones.get(emocion, (0, analysis_id * _POSICIONES + min(posicion, _POSICIONES - 1)))
+        menciones[emocion] = (cantidad + 1, primera)
+    return menciones
+
+
+# ============================================================
+# ESCRITURA
+# ============================================================
+
+def actualizar_conteos(session: Session, analisis_por_fecha: Dict[date, EntryAnalysis]) -> None:
+    """
+    Reemplaza los conteos de los días dados y ajusta los totales.
+    No hace commit: va en la transacción de quien escribe los análisis.
+
+    Args:
+        analisis_por_fecha: {fecha: EntryAnalysis de ese día, ya con ID (flush)}
+    """
+    if not analisis_por_fecha:
+        return
+
+    # Hay varios escritores (workers de la cola, CLI, watcher): nada se lee
+    # antes de tener el lock de escritura ni se actualiza leyendo y
+    # reescribiendo en Python. DELETE ... RETURNING lee las filas viejas en
+    # la misma sentencia que las borra.
+    delta: Counter = Counter()
+    fechas = list(analisis_por_fecha)
+    tabla_dias = DailyEmotionCount.__table__
+    for lote in _en_lotes(fechas):
+        for emocion, cantidad in session.connection().execute(
+            delete(tabla_dias).where(tabla_dias.c.date.in_(lote))
+            .returning(tabla_dias.c.emotion, tabla_dias.c.count)
+        ):
+            delta[emocion] -= cantidad
+
+    filas = []
+    for fecha, analisis in analisis_por_fecha.items():
+        for emocion, (cantidad, primera) in _menciones(analisis.id, analisis.emotions).items():
+            filas.append(DailyEmotionCount(date=fecha, emotion=emocion, count=cantidad, first_mention=primera))
+            delta[emocion] += cantidad
+    session.add_all(filas)
+
+    cambios = [{"emotion": emocion, "count": d} for emocion, d in delta.items() if d]
+    if not cambios:
+        return
+    # Suma atómica: INSERT ... ON CONFLICT(emotion) DO UPDATE SET count = count + excluded.count
+    tabla_totales = EmotionTotal.__table__
+    for lote in _en_lotes(cambios):
+        insercion = sqlite_insert(tabla_totales).values(lote)
+        session.connection().execute(insercion.on_conflict_do_update(
+            index_elements=[tabla_totales.c.emotion],
+            set_={"count": tabla_totales.c.count + insercion.excluded.count}
+        ))
+    for lote in _en_lotes([c["emotion"] for c in cambios]):
+        session.connection().execute(
+            delete(tabla_totales).where(tabla_totales.c.emotion.in_(lote), tabla_totales.c.count <= 0)
+        )
+
+
+def reconstruir_conteos() -> int:
+    """
+    Recalcula ambas tablas desde EntryAnalysis (en una transacción).
+
+    Returns:
+        Cantidad de análisis leídos
+    """
+    por_dia: List[Dict[str, Any]] = []
+    totales: Counter = Counter()
+    leidos = 0
+
+    with Session(engine) as session:
+        filas = session.exec(
+            select(JournalEntry.date, EntryAnalysis.id, EntryAnalysis.emotions)
+            .join(EntryAnalysis, EntryAnalysis.entry_id == JournalEntry.id)
+        )
+        for fecha, analysis_id, emociones in filas:
+            leidos += 1
+            for emocion, (cantidad, primera) in _menciones(analysis_id, emociones).items():
+                por_dia.append({"date": fecha, "emotion": emocion, "count": cantidad, "first_mention": primera})
+                totales[emocion] += cantidad
+
+    with engine.begin() as conn:
+        conn.execute(delete(DailyEmotionCount))
+        conn.execute(delete(EmotionTotal))
+        for lote in _en_lotes(por_dia, _LOTE_RECONSTRUCCION):
+            conn.execute(DailyEmotionCount.__table__.insert(), lote)
+        if totales:
+            conn.execute(
+                EmotionTotal.__table__.insert(),
+                [{"emotion": e, "count": n} for e, n in totales.items()]
+            )
+
+    logger.info(f"Conteos de emociones reconstruidos: {leidos} análisis, {len(por_dia)} filas diarias")
+    return leidos
+
+
+def asegurar_conteos() -> None:
+    """
+    Chequeo al arrancar: reconstruye si hay análisis y los agregados están
+    vacíos, o si los totales no coinciden con la suma de los conteos
+    diarios (una base escrita antes de que la suma fuera atómica).
+    """
+    with Session(engine) as session:
+        hay_conteos = session.exec(select(DailyEmotionCount.id).limit(1)).first() is not None
+        hay_analisis = session.exec(select(EntryAnalysis.id).limit(1)).first() is not None
+        sumas_diarias = dict(session.exec(
+            select(DailyEmotionCount.emotion, func.sum(DailyEmotionCount.count))
+            .group_by(DailyEmotionCount.emotion)
+        ).all())
+        guardados = dict(session.exec(select(EmotionTotal.emotion, EmotionTotal.count)).all())
+    if hay_analisis and not hay_conteos:
+        logger.info("Agregados de emociones vacíos: reconstruyendo desde los análisis")
+        reconstruir_conteos()
+    elif sumas_diarias != guardados:
+        logger.warning("Totales de emociones desfasados de los conteos diarios: reconstruyendo")
+        reconstruir_conteos()
+
+
+# ============================================================
+# CONSULTAS
+# ============================================================
+
+def contar_entradas_analizadas(session: Session) -> int:
+    return session.exec(
+        select(func.count(EntryAnalysis.id))
+        .join(JournalEntry, EntryAnalysis.entry_id == JournalEntry.id)
+    ).one()
+
+
+def totales(session: Session) -> Dict[str, int]:
+    """{emoción: menciones en todo el diario}, en orden de primera mención."""
+    # Un MIN por emoción sobre el índice (emotion, first_mention)
+    primera = (
+        select(func.min(DailyEmotionCount.first_mention))
+        .where(DailyEmotionCount.emotion == EmotionTotal.emotion)
+        .scalar_subquery()
+    )
+    filas = session.exec(
+        select(EmotionTotal.emotion, EmotionTotal.count).order_by(primera, EmotionTotal.emotion)
+    ).all()
+    return dict(filas)
+
+
+def conteos_en_rango(session: Session, desde: date, hasta: date) -> Dict[str, int]:
+    """{emoción: menciones} entre dos fechas (inclusive), en orden de primera mención."""
+    filas = session.exec(
+        select(DailyEmotionCount.emotion, func.sum(DailyEmotionCount.count))
+        .where(DailyEmotionCount.date >= desde, DailyEmotionCount.date <= hasta)
+        .group_by(DailyEmotionCount.emotion)
+        .order_by(func.min(DailyEmotionCount.first_mention), DailyEmotionCount.emotion)
+    ).all()
+    return dict(filas)
+
+
+def mas_frecuentes(conteos: Dict[str, int], n: int) -> List[Tuple[str, int]]:
+    """Como Counter.most_common: de mayor a menor, empates en el orden del dict."""
+    return sorted(conteos.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+def conteos_por_dia(session: Session, desde: date, hasta: date) -> List[Tuple[date, str, int]]:
+    """Filas (fecha, emoción, menciones) entre dos fechas (inclusive), por fecha."""
+    return session.exec(
+        select(DailyEmotionCount.date, DailyEmotionCount.emotion, DailyEmotionCount.count)
+        .where(DailyEmotionCount.date >= desde, DailyEmotionCount.date <= hasta)
+        .order_by(DailyEmotionCount.date)
+    ).all()
@@ -0,0 +1,191 @@
+"""
+Tendencias Emocionales
+----------------------
+Evolución de las emociones en rangos arbitrarios (meses, años) a partir
+de los conteos diarios de emotion_stats:
+
+1. Carga las filas DailyEmotionCount del rango en una matriz
+   días × emociones (NumPy), con una fila por día aunque no haya entrada.
+2. Agrupa los días en buckets (día, semana ISO o mes) sumando filas.
+3. Calcula con operaciones vectorizadas la proporción de cada emoción
+   por bucket, la media móvil sobre `ventana` buckets y el top-k de cada
+   bucket.
+
+Todo el trabajo después de la consulta es sobre arrays: un rango de
+varios años son unos miles de filas y se responde en milisegundos.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List
+
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from backend.app.modules.journal.models import DailyEmotionCount
+
+
+GRANULARIDADES = ("day", "week", "month")
+
+# Un lunes: las semanas se cuentan desde acá (semanas ISO)
+_LUNES_REFERENCIA = np.datetime64("1970-01-05", "D")
+
+
+@dataclass
+class MatrizDiaria:
+    """Conteos de menciones por día (filas) y emoción (columnas)."""
+    dias: np.ndarray  # datetime64[D], todos los días del rango
+    emociones: List[str]
+    conteos: np.ndarray  # float64, len(dias) × len(emociones)
+
+
+# ============================================================
+# CARGA
+# ============================================================
+
+def matriz_diaria(session: Session, desde: date, hasta: date) -> MatrizDiaria:
+    """
+    Lee los conteos del rango (inclusive) y arma la matriz días × emociones.
+    Los días sin entrada quedan en cero.
+    """
+    # SQLite devuelve directamente el índice de fila (días desde `desde`):
+    # sin convertir cada fecha a objeto date ni pasar por la carga del ORM
+    desplazamiento = func.julianday(DailyEmotionCount.date) - func.julianday(desde.isoformat())
+    filas = session.connection().execute(
+        select(desplazamiento, DailyEmotionCount.emotion, DailyEmotionCount.count)
+        .where(DailyEmotionCount.date >= desde, DailyEmotionCount.date <= hasta)
+    ).all()
+
+    dias = np.arange(np.datetime64(desde, "D"), np.datetime64(hasta, "D") + 1)
+    if not filas:
+        return MatrizDiaria(dias=dias, emociones=[], conteos=np.zeros((len(dias), 0)))
+
+    desplazamientos, nombres, cantidades = zip(*filas)
+    filas_idx = np.rint(desplazamientos).astype(np.int64)
+    emociones, columnas_idx = np.unique(np.array(nombres), return_inverse=True)
+
+    conteos = np.zeros((len(dias), len(emociones)))
+    # (fecha, emoción) es única en la tabla: asignación directa
+    conteos[filas_idx, columnas_idx] = cantidades
+    return MatrizDiaria(dias=dias, emociones=emociones.tolist(), conteos=conteos)
+
+
+# ============================================================
+# CÁLCULO
+# ============================================================
+
+def _claves_de_bucket(dias: np.ndarray, granularidad: str) -> np.ndarray:
+    if granularidad == "day":
+        return dias
+    if granularidad == "week":
+        # Lunes de la semana de cada día
+        return dias - (dias - _LUNES_REFERENCIA).astype(np.int64) % 7
+    return dias.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def agrupar(matriz: MatrizDiaria, granularidad: str):
+    """
+    Suma las filas de la matriz por bucket.
+
+    Returns:
+        (inicio de cada bucket como datetime64[D], conteos buckets × emociones)
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad inválida: {granularidad}")
+
+    claves = _claves_de_bucket(matriz.dias, granularidad)
+    # Los días están ordenados: cada bucket es un tramo contiguo de filas
+    inicios = np.flatnonzero(np.r_[True, claves[1:] != claves[:-1]])
+    if matriz.conteos.shape[1] == 0:
+        return claves[inicios], np.zeros((len(inicios), 0))
+    return claves[inicios], np.add.reduceat(matriz.conteos, inicios, axis=0)
+
+
+def _proporciones(conteos: np.ndarray) -> np.ndarray:
+    """Cada fila dividida por su total (filas sin menciones quedan en cero)."""
+    totales = conteos.sum(axis=1, keepdims=True)
+    return np.divide(conteos, totales, out=np.zeros_like(conteos), where=totales > 0)
+
+
+def suma_movil(conteos: np.ndarray, ventana: int) -> np.ndarray:
+    """
+    Suma de cada fila con las `ventana - 1` anteriores (las primeras usan
+    las que haya), con una suma acumulada en vez de un bucle.
+    """
+    acumulado = np.cumsum(np.vstack([np.zeros((1, conteos.shape[1])), conteos]), axis=0)
+    fin = np.arange(1, len(conteos) + 1)
+    inicio = np.maximum(fin - ventana, 0)
+    return acumulado[fin] - acumulado[inicio]
+
+
+def tendencias(
+    session: Session,
+    desde: date,
+    hasta: date,
+    granularidad: str = "week",
+    ventana: int = 1,
+    top_k: int = 3
+) -> Dict[str, Any]:
+    """
+    Proporción de cada emoción por bucket, suavizada y con su top-k.
+
+    La media móvil se toma sobre las menciones de la ventana (suma de
+    conteos / suma de totales): los buckets sin entradas no arrastran la
+    curva a cero y los buckets con más menciones pesan más.
+
+    Args:
+        desde, hasta: Rango de fechas (inclusive)
+        granularidad: "day", "week" (lunes a domingo) o "month"
+        ventana: Buckets de la media móvil (1 = sin suavizar)
+        top_k: Emociones del top de cada bucket y series devueltas
+
+    Returns:
+        Dict con buckets, totales, series (las top_k del rango) y top por bucket
+    """
+    if hasta < desde:
+        raise ValueError("El rango termina antes de empezar")
+    if ventana < 1 or top_k < 1:
+        raise ValueError("ventana y top_k deben ser positivos")
+
+    matriz = matriz_diaria(session, desde, hasta)
+    buckets, conteos = agrupar(matriz, granularidad)
+
+    proporciones = _proporciones(conteos)
+    movil = _proporciones(suma_movil(conteos, ventana)) if ventana > 1 else proporciones
+
+    # Top-k por bucket sobre la proporción suavizada (sin contar ceros)
+    k = min(top_k, len(matriz.emociones))
+    orden = np.argsort(-movil, axis=1, kind="stable")[:, :k]
+    valores_top = np.take_along_axis(movil, orden, axis=1)
+    nombres_top = np.array(matriz.emociones, dtype=object)[orden] if k else np.empty((len(movil), 0), dtype=object)
+
+    # Series: las top_k emociones del rango completo
+    totales_emocion = conteos.sum(axis=0)
+    principales = np.argsort(-totales_emocion, kind="stable")[:k]
+
+    proporciones = np.round(proporciones, 4)
+    movil = np.round(movil, 4)
+    valores_top = np.round(valores_top, 4)
+
+    return {
+        "start": desde.isoformat(),
+        "end": hasta.isoformat(),
+        "granularity": granularidad,
+        "window": ventana,
+        "buckets": np.datetime_as_string(buckets, unit="D").tolist(),
+        "totals": conteos.sum(axis=1).astype(int).tolist(),
+        "series": [
+            {
+                "name": matriz.emociones[j],
+                "total": int(totales_emocion[j]),
+                "share": proporciones[:, j].tolist(),
+                "rolling": movil[:, j].tolist(),
+            }
+            for j in principales
+        ],
+        "top": [
+            [{"name": n, "share": v} for n, v in zip(fila_nombres, fila_valores) if v > 0]
+            for fila_nombres, fila_valores in zip(nombres_top.tolist(), valores_top.tolist())
+        ],
+    }
@@ -0,0 +1,50 @@
+"""
+Normalización de Emociones
+--------------------------
+El LLM nombra la misma emoción de varias formas ("felicidad", "feliz",
+"estrés"...). Este mapeo las lleva a un nombre canónico una sola vez, al
+escribir los agregados, en lugar de en cada consulta.
+"""
+
+from typing import Any, List
+
+
+# Variante (en minúsculas) → emoción canónica
+MAPA_NORMALIZACION = {
+    "felicidad": "alegría",
+    "feliz": "alegría",
+    "emocionado": "alegría",
+    "emocionante": "alegría",
+    "tranquilidad": "calma",
+    "paz": "calma",
+    "estrés": "ansiedad",
+    "nervios": "ansiedad",
+    "tristeza": "tristeza",
+    "miedo": "miedo",
+    "inseguridad": "miedo",
+    "frustración": "frustración",
+    "enojo": "enojo",
+    "aburrimiento": "aburrimiento",
+    "aburrido": "aburrimiento",
+}
+
+
+def normalizar_emocion(emocion: str) -> str:
+    emocion = emocion.lower().strip()
+    return MAPA_NORMALIZACION.get(emocion, emocion)
+
+
+def normalizar_emociones(emociones: Any) -> List[str]:
+    """
+    Normaliza la lista de emociones de un análisis.
+
+    Acepta un string suelto (análisis viejos) y descarta los valores que no
+    son texto o quedan vacíos. Las repeticiones se conservan: cada mención
+    cuenta.
+    """
+    if not emociones:
+        return []
+    if isinstance(emociones, str):
+        emociones = [emociones]
+    normalizadas = (normalizar_emocion(e) for e in emociones if isinstance(e, str))
+    return [e for e in normalizadas if e]
@@ -0,0 +1,222 @@
+"""
+Etiquetas de Entradas
+---------------------
+Versión normalizada e indexada de las listas JSON de EntryAnalysis
+(emotions, topics, people): una fila EntryTag por mención, con el valor
+tal como lo escribió el LLM y el valor canónico.
+
+- Se escriben en db_sync.sincronizar_lote, en la misma transacción que
+  los análisis, así la normalización se aplica una sola vez.
+- Al arrancar la app, si hay análisis y la tabla está vacía (una base
+  anterior a las etiquetas), se reconstruye desde EntryAnalysis.
+
+Las columnas JSON siguen existiendo; las consultas por etiqueta
+("qué días mencionan X", "cuántas entradas por tema") usan el índice
+(tag_kind, normalized_value, entry_id) en vez de deserializar cada fila.
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from backend.app.core.database import engine
+from backend.app.modules.journal.models import EntryAnalysis, EntryTag, JournalEntry
+from backend.app.modules.journal.core.emotions import normalizar_emocion
+
+
+logger = logging.getLogger(__name__)
+
+# Tipo de etiqueta → campo de EntryAnalysis
+TIPOS_TAG = {
+    "emotion": "emotions",
+    "topic": "topics",
+    "person": "people",
+}
+
+# Límite prudente de parámetros por consulta en SQLite
+_LOTE_IN = 500
+
+# Filas por inserción al reconstruir
+_LOTE_RECONSTRUCCION = 5000
+
+
+def _en_lotes(valores: List[Any], tamano: int = _LOTE_IN) -> Iterable[List[Any]]:
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+# ============================================================
+# NORMALIZACIÓN
+# ============================================================
+
+def normalizar_tag(tipo: str, valor: str) -> str:
+    """
+    Valor canónico de una etiqueta: las emociones pasan por el mapeo de
+    core/emotions.py; temas y personas solo se llevan a minúsculas y
+    espacios simples.
+    """
+    if tipo == "emotion":
+        return normalizar_emocion(valor)
+    return " ".join(valor.lower().split())
+
+
+def tags_de_analisis(analisis: Dict[str, Any]) -> Iterator[Tuple[str, str, str]]:
+    """
+    Etiquetas de un análisis como (tipo, valor normalizado, valor original).
+    Acepta strings sueltos (análisis viejos) y descarta valores vacíos o
+    que no son texto. Las repeticiones se conservan.
+    """
+    for tipo, campo in TIPOS_TAG.items():
+        valores = analisis.get(campo) or []
+        if isinstance(valores, str):
+            valores = [valores]
+        for valor in valores:
+            if not isinstance(valor, str):
+                continue
+            normalizado = normalizar_tag(tipo, valor)
+            if normalizado:
+                yield tipo, normalizado, valor.strip()
+
+
+# ============================================================
+# ESCRITURA
+# ============================================================
+
+def actualizar_tags(session: Session, analisis_por_entrada: Dict[int, Dict[str, Any]]) -> None:
+    """
+    Reemplaza las etiquetas de las entradas dadas.
+    No hace commit: va en la transacción de quien escribe los análisis.
+
+    Args:
+        analisis_por_entrada: {entry_id: análisis con emotions/topics/people}
+    """
+    if not analisis_por_entrada:
+        return
+
+    for lote in _en_lotes(list(analisis_por_entrada)):
+        session.execute(delete(EntryTag).where(EntryTag.entry_id.in_(lote)))
+
+    session.add_all([
+        EntryTag(entry_id=entry_id, tag_kind=tipo, normalized_value=normalizado, raw_value=original)
+        for entry_id, analisis in analisis_por_entrada.items()
+        for tipo, normalizado, original in tags_de_analisis(analisis)
+    ])
+
+
+def reconstruir_tags() -> int:
+    """
+    Recalcula la tabla desde EntryAnalysis (en una transacción).
+
+    Returns:
+        Cantidad de análisis leídos
+    """
+    filas_tags: List[Dict[str, Any]] = []
+    leidos = 0
+
+    with Session(engine) as session:
+        filas = session.exec(
+            select(EntryAnalysis.entry_id, EntryAnalysis.emotions, EntryAnalysis.topics, EntryAnalysis.people)
+        )
+        for entry_id, emociones, temas, personas in filas:
+            leidos += 1
+            analisis = {"emotions": emociones, "topics": temas, "people": personas}
+            filas_tags.extend(
+                {"entry_id": entry_id, "tag_kind": tipo, "normalized_value": normalizado, "raw_value": original}
+                for tipo, normalizado, original in tags_de_analisis(analisis)
+            )
+
+    with engine.begin() as conn:
+        conn.execute(delete(EntryTag))
+        for lote in _en_lotes(filas_tags, _LOTE_RECONSTRUCCION):
+            conn.execute(EntryTag.__table__.insert(), lote)
+
+    logger.info(f"Etiquetas reconstruidas: {leidos} análisis, {len(filas_tags)} etiquetas")
+    return leidos
+
+
+def asegurar_tags() -> None:
+    """Backfill al arrancar: solo si hay análisis y la tabla de etiquetas está vacía."""
+    with Session(engine) as session:
+        hay_tags = session.exec(select(EntryTag.id).limit(1)).first() is not None
+        hay_analisis = session.exec(select(EntryAnalysis.id).limit(1)).first() is not None
+    if hay_analisis and not hay_tags:
+        logger.info("Etiquetas vacías: reconstruyendo desde los análisis")
+        reconstruir_tags()
+
+
+# ============================================================
+# CONSULTAS
+# ============================================================
+
+def _ids_en_rango(desde: Optional[date], hasta: Optional[date]):
+    """Subconsulta con los IDs de las entradas del rango (por el índice de fecha)."""
+    consulta = select(JournalEntry.id)
+    if desde is not None:
+        consulta = consulta.where(JournalEntry.date >= desde)
+    if hasta is not None:
+        consulta = consulta.where(JournalEntry.date <= hasta)
+    return consulta
+
+
+def fechas_con_tag(
+    session: Session,
+    tipo: str,
+    valor: str,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None
+) -> List[date]:
+    """
+    Fechas de las entradas que mencionan una etiqueta, en orden.
+    El valor se normaliza igual que al escribir ("Feliz" encuentra "alegría").
+    """
+    consulta = (
+        select(JournalEntry.date)
+        .join(EntryTag, EntryTag.entry_id == JournalEntry.id)
+        .where(EntryTag.tag_kind == tipo, EntryTag.normalized_value == normalizar_tag(tipo, valor))
+        .distinct()
+        .order_by(JournalEntry.date)
+    )
+    if desde is not None:
+        consulta = consulta.where(JournalEntry.date >= desde)
+    if hasta is not None:
+        consulta = consulta.where(JournalEntry.date <= hasta)
+    return session.exec(consulta).all()
+
+
+def entradas_por_valor(
+    session: Session,
+    tipo: str,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    limite: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    {valor normalizado: entradas que lo mencionan}, de mayor a menor.
+    Se resuelve con el índice de EntryTag; el rango se filtra con los IDs
+    del índice de fecha en lugar de un join (que visita cada etiqueta).
+    """
+    entradas = func.count(EntryTag.entry_id.distinct())
+    consulta = (
+        select(EntryTag.normalized_value, entradas)
+        .where(EntryTag.tag_kind == tipo)
+        .group_by(EntryTag.normalized_value)
+        .order_by(entradas.desc(), EntryTag.normalized_value)
+    )
+    if desde is not None or hasta is not None:
+        consulta = consulta.where(EntryTag.entry_id.in_(_ids_en_rango(desde, hasta)))
+    if limite is not None:
+        consulta = consulta.limit(limite)
+    return dict(session.exec(consulta).all())
+
+
+def variantes(session: Session, tipo: str, valor: str) -> Dict[str, int]:
+    """{valor original: menciones} que se normalizan a `valor`."""
+    filas = session.exec(
+        select(EntryTag.raw_value, func.count(EntryTag.id))
+        .where(EntryTag.tag_kind == tipo, EntryTag.normalized_value == normalizar_tag(tipo, valor))
+        .group_by(EntryTag.raw_value)
+    ).all()
+    return dict(sorted(filas, key=lambda fila: (-fila[1], fila[0])))
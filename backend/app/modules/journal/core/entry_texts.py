@@ -0,0 +1,97 @@
+"""
+Textos de Entradas
+------------------
+Carga en lote el texto completo de las entradas (JournalEntry.raw_text)
+a partir de sus IDs `entry_yyyy_mm_dd`, para materializar los chunks
+guardados solo con offsets.
+
+Los offsets valen sobre el texto que se analizó. Guardar una entrada
+reescribe JournalEntry.raw_text enseguida, pero el reprocesamiento corre
+después (o falla): mientras tanto el texto analizado es el `raw_text` del
+log de análisis, que se usa cuando el de la base no coincide con el
+`source_hash` de los chunks (o no está en la base).
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, Mapping, Optional, Union
+
+from sqlmodel import Session, select
+
+from backend.app.config import RAW_DIARY_JSON
+from backend.app.core.database import engine
+from backend.app.modules.journal.models import JournalEntry
+from backend.app.modules.journal.core.analysis_log import obtener_log_analisis
+from backend.app.modules.journal.core.chunk_store import hash_texto
+
+
+logger = logging.getLogger(__name__)
+
+# Límite prudente de parámetros por consulta en SQLite
+_LOTE = 500
+
+
+def fecha_de_entry_id(entry_id: str) -> Optional[date]:
+    """entry_yyyy_mm_dd → date (None si el ID no tiene ese formato)."""
+    partes = entry_id.split("_")
+    if len(partes) < 4:
+        return None
+    try:
+        return datetime.strptime(f"{partes[1]}-{partes[2]}-{partes[3]}", "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def cargar_textos_de_entradas(
+    pedidos: Union[Mapping[str, Optional[str]], Iterable[str]]
+) -> Dict[str, str]:
+    """
+    Devuelve {entry_id: texto} para los IDs pedidos que existan.
+
+    Args:
+        pedidos: {entry_id: hash del texto analizado} (o solo los IDs).
+            Si el texto de la base no tiene ese hash se usa el del log de
+            análisis; sin hash (chunks anteriores al hash) se prefiere el
+            del log, que es el que se chunkeó.
+    """
+    hashes = pedidos if isinstance(pedidos, Mapping) else dict.fromkeys(pedidos)
+    por_fecha = {}
+    for entry_id in hashes:
+        fecha = fecha_de_entry_id(entry_id)
+        if fecha is not None:
+            por_fecha[fecha] = entry_id
+
+    textos: Dict[str, str] = {}
+    fechas = list(por_fecha)
+
+    try:
+        with Session(engine) as session:
+            for i in range(0, len(fechas), _LOTE):
+                lote = fechas[i:i + _LOTE]
+                filas = session.exec(
+                    select(JournalEntry.date, JournalEntry.raw_text).where(JournalEntry.date.in_(lote))
+                ).all()
+                for fecha, raw_text in filas:
+                    textos[por_fecha[fecha]] = raw_text
+    except Exception as e:
+        logger.warning(f"No se pudieron leer los textos de las entradas de la DB: {e}")
+
+    def _vigente(entry_id: str) -> bool:
+        esperado = hashes.get(entry_id)
+        return entry_id in textos and esperado is not None and hash_texto(textos[entry_id]) == esperado
+
+    # Entradas editadas sin reprocesar, ausentes de la base o con chunks sin hash
+    a_revisar = [fecha for fecha in fechas if not _vigente(por_fecha[fecha])]
+    if a_revisar:
+        log = obtener_log_analisis(RAW_DIARY_JSON)
+        for fecha in a_revisar:
+            entry_id = por_fecha[fecha]
+            analisis = log.obtener(fecha.isoformat())
+            analizado = analisis.get("raw_text") if analisis else None
+            if analizado is None:
+                continue
+            esperado = hashes.get(entry_id)
+            if esperado is None or hash_texto(analizado) == esperado:
+                textos[entry_id] = analizado
+
+    return textos
@@ -0,0 +1,92 @@
+"""
+Bloqueo de Archivos entre Procesos
+----------------------------------
+Exclusión mutua para archivos que se reescriben enteros (índice FAISS y
+su metadata) cuando pueden escribirlos varios procesos a la vez: la API,
+el modo vigilancia y los scripts batch.
+
+El bloqueo es un archivo `<ruta>.lock` bloqueado con flock (POSIX) o
+msvcrt.locking (Windows): el sistema operativo lo libera si el proceso
+muere, así que no quedan bloqueos huérfanos. Dentro de un proceso es
+reentrante por hilo, para que un método bloqueado pueda llamar a otro.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class _Estado:
+    """Bloqueo de un archivo dentro del proceso (hilo dueño y profundidad)."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.profundidad = 0
+        self.fd = None
+
+
+_estados: Dict[Path, _Estado] = {}
+_estados_lock = threading.Lock()
+
+
+def _bloquear_fd(fd: int) -> None:
+    if os.name == "nt":
+        # LK_LOCK reintenta 10 veces por segundo antes de fallar: se repite hasta obtenerlo
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _liberar_fd(fd: int) -> None:
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def bloqueo_de_archivo(ruta: Path) -> Iterator[None]:
+    """
+    Bloqueo exclusivo asociado a `ruta` (espera si lo tiene otro proceso
+    u otro hilo).
+
+    Args:
+        ruta: Archivo a proteger; el bloqueo vive en `<ruta>.lock`
+    """
+    ruta_lock = Path(ruta).resolve().with_name(Path(ruta).name + ".lock")
+    with _estados_lock:
+        estado = _estados.setdefault(ruta_lock, _Estado())
+
+    with estado.lock:
+        if estado.profundidad == 0:
+            ruta_lock.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(str(ruta_lock), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                _bloquear_fd(fd)
+            except BaseException:
+                os.close(fd)
+                raise
+            estado.fd = fd
+        estado.profundidad += 1
+        try:
+            yield
+        finally:
+            estado.profundidad -= 1
+            if estado.profundidad == 0:
+                fd, estado.fd = estado.fd, None
+                try:
+                    _liberar_fd(fd)
+                finally:
+                    os.close(fd)
@@ -0,0 +1,179 @@
+"""
+Manifiesto de Archivos del Diario
+---------------------------------
+Registra, por cada archivo .md procesado, su ruta, mtime, tamaño y hash
+del contenido (tabla EntryFileManifest).
+
+Para decidir qué procesar se hace un escaneo "stat primero":
+- Si mtime y tamaño coinciden con el manifiesto, el archivo no cambió
+  (no se lee).
+- Si cambiaron, se hashea el contenido: si el hash es el mismo (p. ej. un
+  `touch`) solo se actualiza el manifiesto; si no, el archivo está pendiente.
+- Los archivos sin fila en el manifiesto son nuevos.
+
+Así las ediciones de un .md se detectan sin `forzar_reprocesar`.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from backend.app.core.database import engine
+from backend.app.modules.journal.models import EntryFileManifest
+
+
+logger = logging.getLogger(__name__)
+
+_tabla_lista = False
+_tabla_lock = threading.Lock()
+
+
+def _asegurar_tabla() -> None:
+    """El CLI batch puede correr sin que la API haya ejecutado init_db."""
+    global _tabla_lista
+    with _tabla_lock:
+        if not _tabla_lista:
+            EntryFileManifest.__table__.create(engine, checkfirst=True)
+            _tabla_lista = True
+
+
+def clave_archivo(archivo: Path) -> str:
+    """Ruta absoluta usada como clave (sin resolver symlinks: no cuesta syscalls)."""
+    return os.path.abspath(archivo)
+
+
+def hash_contenido(texto: str) -> str:
+    """
+    Hash del texto tal como lo lee el analizador (read_text), para que
+    coincida con el del contenido efectivamente procesado.
+    """
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def hash_archivo(archivo: Path) -> Optional[str]:
+    try:
+        return hash_contenido(Path(archivo).read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning(f"No se pudo hashear '{archivo}': {e}")
+        return None
+
+
+# ============================================================
+# ESCANEO
+# ============================================================
+
+def escanear_pendientes(
+    archivos: List[Path],
+    ya_procesado: Optional[Callable[[Path], bool]] = None
+) -> List[Path]:
+    """
+    Devuelve los archivos nuevos o modificados desde su último procesamiento.
+
+    Args:
+        archivos: Archivos de diario a revisar (en el orden deseado)
+        ya_procesado: Para archivos sin fila en el manifiesto (instalaciones
+            previas al manifiesto), indica si ya fueron procesados. En ese
+            caso se registran tal como están en vez de reprocesarlos.
+
+    Returns:
+        Lista de archivos pendientes, en el mismo orden que `archivos`
+    """
+    _asegurar_tabla()
+    pendientes = []
+    hasheados = 0
+    registrados = 0
+
+    with Session(engine) as session:
+        manifiesto = {fila.path: fila for fila in session.exec(select(EntryFileManifest)).all()}
+
+        for archivo in archivos:
+            try:
+                stat = os.stat(archivo)
+            except OSError as e:
+                logger.warning(f"No se pudo leer '{archivo}': {e}")
+                continue
+
+            clave = clave_archivo(archivo)
+            fila = manifiesto.get(clave)
+
+            if fila is None:
+                if ya_procesado is not None and ya_procesado(archivo):
+                    content_hash = hash_archivo(archivo)
+                    hasheados += 1
+                    if content_hash is not None:
+                        session.add(EntryFileManifest(
+                            path=clave,
+                            mtime_ns=stat.st_mtime_ns,
+                            size=stat.st_size,
+                            content_hash=content_hash
+                        ))
+                        registrados += 1
+                        continue
+                pendientes.append(archivo)
+                continue
+
+            if fila.mtime_ns == stat.st_mtime_ns and fila.size == stat.st_size:
+                continue
+
+            content_hash = hash_archivo(archivo)
+            hasheados += 1
+            if content_hash is not None and content_hash == fila.content_hash:
+                # Solo cambió la metadata del archivo, no su contenido
+                fila.mtime_ns = stat.st_mtime_ns
+                fila.size = stat.st_size
+                session.add(fila)
+            else:
+                pendientes.append(archivo)
+
+        session.commit()
+
+    logger.info(
+        f"Manifiesto: {len(archivos)} archivos revisados, {hasheados} hasheados, "
+        f"{registrados} registrados como ya procesados, {len(pendientes)} pendientes"
+    )
+    return pendientes
+
+
+# ============================================================
+# REGISTRO
+# ============================================================
+
+def registrar_procesado(
+    archivo: Path,
+    contenido: str,
+    stat: Optional[os.stat_result] = None
+) -> None:
+    """
+    Registra la versión de un archivo que acaba de procesarse.
+
+    Args:
+        archivo: Archivo de diario
+        contenido: Texto efectivamente analizado (se hashea este, no el archivo)
+        stat: Resultado de os.stat tomado ANTES de leer el archivo. Si el
+            archivo se edita después, su mtime ya no coincidirá y el
+            próximo escaneo lo volverá a revisar.
+    """
+    _asegurar_tabla()
+    if stat is None:
+        stat = os.stat(archivo)
+
+    clave = clave_archivo(archivo)
+    with Session(engine) as session:
+        fila = session.exec(
+            select(EntryFileManifest).where(EntryFileManifest.path == clave)
+        ).first()
+        if fila is None:
+            fila = EntryFileManifest(path=clave, mtime_ns=0, size=0, content_hash="")
+
+        fila.mtime_ns = stat.st_mtime_ns
+        fila.size = stat.st_size
+        fila.content_hash = hash_contenido(contenido)
+        fila.processed_at = datetime.now()
+        session.add(fila)
+        session.commit()
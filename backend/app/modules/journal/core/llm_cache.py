@@ -0,0 +1,244 @@
+"""
+Caché Persistente de Respuestas del LLM
+---------------------------------------
+Guarda en SQLite las respuestas del proveedor para no volver a pagar
+prompts idénticos (reprocesar entradas sin cambios, re-guardar el mismo texto).
+
+La clave combina proveedor, modelo, versión de la plantilla del prompt,
+temperatura y un hash de los mensajes renderizados. Al superar el tamaño
+máximo se expulsan las entradas usadas hace más tiempo (LRU).
+
+El tamaño total se lleva en una tabla de una fila (llm_cache_meta) que
+mantienen triggers en la misma transacción de cada escritura: vale para
+todos los procesos que comparten el archivo y chequear el límite no
+recorre la tabla.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.app.config import LLM_CACHE_FILE, LLM_CACHE_MAX_MB, LLM_CACHE_DISABLED
+from backend.app.core import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# CLASE PRINCIPAL
+# ============================================================
+
+class CacheLLM:
+    """
+    Caché clave → respuesta respaldada por un archivo SQLite.
+    Una misma instancia puede usarse desde varios hilos.
+    """
+
+    def __init__(
+        self,
+        ruta_db: Path,
+        max_bytes: int,
+        habilitado: bool = True
+    ):
+        self.ruta_db = Path(ruta_db)
+        self.max_bytes = max_bytes
+        self.habilitado = habilitado
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # --------------------------------------------------------
+
+    def _conexion(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                str(self.ruta_db),
+                timeout=30,
+                check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Esquema, total inicial y triggers juntos: ningún otro proceso
+            # escribe entre el cálculo del total y la creación de los triggers
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    template_version TEXT NOT NULL,
+                    temperature REAL,
+                    prompt_hash TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)"
+            )
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_size INTEGER NOT NULL
+                )
+            """)
+            # Cachés anteriores a la tabla: se suman una sola vez
+            self._conn.execute("""
+                INSERT OR IGNORE INTO llm_cache_meta (id, total_size)
+                SELECT 1, COALESCE(SUM(size), 0) FROM llm_cache
+            """)
+            for trigger in (
+                """CREATE TRIGGER IF NOT EXISTS llm_cache_total_insert AFTER INSERT ON llm_cache
+                   BEGIN UPDATE llm_cache_meta SET total_size = total_size + NEW.size WHERE id = 1; END""",
+                """CREATE TRIGGER IF NOT EXISTS llm_cache_total_delete AFTER DELETE ON llm_cache
+                   BEGIN UPDATE llm_cache_meta SET total_size = total_size - OLD.size WHERE id = 1; END""",
+                """CREATE TRIGGER IF NOT EXISTS llm_cache_total_update AFTER UPDATE OF size ON llm_cache
+                   BEGIN UPDATE llm_cache_meta SET total_size = total_size - OLD.size + NEW.size WHERE id = 1; END""",
+            ):
+                self._conn.execute(trigger)
+            self._conn.commit()
+        return self._conn
+
+    # --------------------------------------------------------
+
+    @staticmethod
+    def clave(
+        proveedor: str,
+        modelo: str,
+        version_plantilla: str,
+        temperatura: Optional[float],
+        mensajes: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Construye la clave de caché de una solicitud.
+        """
+        prompt_hash = hashlib.sha256(
+            json.dumps(mensajes, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        key = hashlib.sha256(
+            f"{proveedor}|{modelo}|{version_plantilla}|{temperatura}|{prompt_hash}".encode("utf-8")
+        ).hexdigest()
+        return {
+            "key": key,
+            "provider": proveedor,
+            "model": modelo,
+            "template_version": version_plantilla,
+            "temperature": temperatura,
+            "prompt_hash": prompt_hash,
+        }
+
+    # --------------------------------------------------------
+
+    def obtener(self, clave: Dict[str, Any]) -> Optional[str]:
+        if not self.habilitado:
+            return None
+
+        try:
+            with self._lock:
+                conn = self._conexion()
+                fila = conn.execute(
+                    "SELECT response FROM llm_cache WHERE key = ?",
+                    (clave["key"],)
+                ).fetchone()
+                if fila is not None:
+                    conn.execute(
+                        "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                        (time.time(), clave["key"])
+                    )
+                    conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo leer la caché LLM: {e}")
+            return None
+
+        if fila is None:
+            metrics.increment("llm.cache.miss")
+            return None
+
+        metrics.increment("llm.cache.hit")
+        logger.debug(f"Caché LLM: hit ({clave['template_version']})")
+        return fila[0]
+
+    # --------------------------------------------------------
+
+    def guardar(self, clave: Dict[str, Any], respuesta: str) -> None:
+        if not self.habilitado:
+            return
+
+        ahora = time.time()
+        try:
+            with self._lock:
+                conn = self._conexion()
+                # Upsert en lugar de INSERT OR REPLACE: el reemplazo no dispara
+                # el trigger de borrado y el total contaría dos veces la clave
+                conn.execute(
+                    """
+                    INSERT INTO llm_cache
+                        (key, provider, model, template_version, temperature,
+                         prompt_hash, response, size, created_at, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        provider = excluded.provider,
+                        model = excluded.model,
+                        template_version = excluded.template_version,
+                        temperature = excluded.temperature,
+                        prompt_hash = excluded.prompt_hash,
+                        response = excluded.response,
+                        size = excluded.size,
+                        created_at = excluded.created_at,
+                        last_access = excluded.last_access
+                    """,
+                    (
+                        clave["key"], clave["provider"], clave["model"],
+                        clave["template_version"], clave["temperature"],
+                        clave["prompt_hash"], respuesta,
+                        len(respuesta.encode("utf-8")), ahora, ahora
+                    )
+                )
+                self._expulsar(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo escribir la caché LLM: {e}")
+
+    # --------------------------------------------------------
+
+    def _expulsar(self, conn: sqlite3.Connection) -> None:
+        """Elimina las entradas menos usadas hasta quedar bajo el límite."""
+        total = conn.execute("SELECT total_size FROM llm_cache_meta WHERE id = 1").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        a_liberar = total - self.max_bytes
+        claves = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY last_access"
+        ):
+            claves.append((key,))
+            a_liberar -= size
+            if a_liberar <= 0:
+                break
+
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", claves)
+        logger.info(f"Caché LLM: expulsadas {len(claves)} entradas (LRU)")
+
+    # --------------------------------------------------------
+
+    def limpiar(self) -> None:
+        with self._lock:
+            conn = self._conexion()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+
+# Instancia compartida por todo el proceso
+cache_llm = CacheLLM(
+    LLM_CACHE_FILE,
+    max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+    habilitado=not LLM_CACHE_DISABLED
+)
@@ -0,0 +1,249 @@
+"""
+Registro de Llamadas al LLM
+---------------------------
+Guarda en SQLite una fila por cada llamada al proveedor (o acierto de la
+caché): quién la hizo, modelo, tokens de prompt y de respuesta, latencia
+total, reintentos, tiempo esperado por 429 y si vino de la caché.
+
+Las escrituras no bloquean a quien llama: las filas van a una cola en
+memoria y un hilo de fondo las inserta por lotes (una transacción por
+lote). Si la cola se llena, las filas se descartan y se cuentan en
+llm.ledger.dropped.
+
+Sirve para ver qué funcionalidad consume la cuota del proveedor y cuánto
+inflan la latencia los reintentos (ver /api/metrics/llm).
+"""
+
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.app.config import LLM_LEDGER_FILE, LLM_LEDGER_DISABLED, LLM_LEDGER_RETENTION_DAYS
+from backend.app.core import metrics
+from backend.app.modules.journal.core.run_report import percentil
+
+
+logger = logging.getLogger(__name__)
+
+# Filas por transacción y espera máxima antes de escribir un lote incompleto
+TAMANO_LOTE = 200
+INTERVALO_ESCRITURA = 2.0
+MAX_PENDIENTES = 10_000
+
+_COLUMNAS = (
+    "ts", "caller", "provider", "model", "status", "cache_hit",
+    "prompt_tokens", "completion_tokens", "latency_s", "retries", "wait_429_s"
+)
+
+
+# ============================================================
+# CLASE PRINCIPAL
+# ============================================================
+
+class LedgerLLM:
+    """
+    Registro de llamadas respaldado por un archivo SQLite.
+    Una misma instancia puede usarse desde varios hilos.
+    """
+
+    def __init__(
+        self,
+        ruta_db: Path,
+        retencion_dias: int = 30,
+        habilitado: bool = True
+    ):
+        self.ruta_db = Path(ruta_db)
+        self.retencion_dias = retencion_dias
+        self.habilitado = habilitado
+        self._cola: "queue.Queue[tuple]" = queue.Queue(maxsize=MAX_PENDIENTES)
+        self._lock = threading.Lock()
+        self._escritor: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # --------------------------------------------------------
+
+    def _conexion(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                str(self.ruta_db),
+                timeout=30,
+                check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    id INTEGER PRIMARY KEY,
+                    ts REAL NOT NULL,
+                    caller TEXT NOT NULL,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    cache_hit INTEGER NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    latency_s REAL NOT NULL,
+                    retries INTEGER NOT NULL,
+                    wait_429_s REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_calls_ts ON llm_calls (ts)")
+            # Al abrir (una vez por proceso) se descarta lo que superó la retención
+            self._conn.execute(
+                "DELETE FROM llm_calls WHERE ts < ?",
+                (time.time() - self.retencion_dias * 86400,)
+            )
+            self._conn.commit()
+        return self._conn
+
+    # --------------------------------------------------------
+
+    def registrar(
+        self,
+        caller: str,
+        provider: str,
+        model: str,
+        latency_s: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        retries: int = 0,
+        wait_429_s: float = 0.0,
+        cache_hit: bool = False,
+        status: str = "ok"
+    ) -> None:
+        """
+        Encola una llamada (no escribe en disco: lo hace el hilo de fondo).
+
+        Args:
+            caller: Funcionalidad que hizo la llamada (p. ej. "analyzer.analysis", "chat")
+            status: "ok", "error" o "cancelled"
+        """
+        if not self.habilitado:
+            return
+        self._iniciar_escritor()
+        fila = (
+            time.time(), caller, provider, model, status, int(cache_hit),
+            int(prompt_tokens or 0), int(completion_tokens or 0),
+            float(latency_s), int(retries), float(wait_429_s)
+        )
+        try:
+            self._cola.put_nowait(fila)
+        except queue.Full:
+            metrics.increment("llm.ledger.dropped")
+
+    def _iniciar_escritor(self) -> None:
+        if self._escritor is not None:
+            return
+        with self._lock:
+            if self._escritor is None:
+                self._escritor = threading.Thread(target=self._escribir_en_bucle, name="llm-ledger", daemon=True)
+                self._escritor.start()
+                atexit.register(self.vaciar)
+
+    def _escribir_en_bucle(self) -> None:
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + INTERVALO_ESCRITURA
+            while len(lote) < TAMANO_LOTE:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._insertar(lote)
+
+    def _insertar(self, lote: List[tuple]) -> None:
+        try:
+            with self._lock:
+                conn = self._conexion()
+                conn.executemany(
+                    f"INSERT INTO llm_calls ({', '.join(_COLUMNAS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNAS)})",
+                    lote
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            metrics.increment("llm.ledger.dropped", len(lote))
+            logger.warning(f"No se pudo escribir el registro de llamadas LLM: {e}")
+
+    def vaciar(self) -> None:
+        """Escribe ya lo que esté en la cola (al salir o antes de consultar)."""
+        lote = []
+        while True:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        if lote:
+            self._insertar(lote)
+
+    # --------------------------------------------------------
+
+    def agregados(self, ventana_s: float = 3600) -> Dict[str, Any]:
+        """
+        Totales de las llamadas de los últimos `ventana_s` segundos, en
+        conjunto y agrupados por llamador y por modelo.
+        """
+        if not self.habilitado:
+            return {"window_s": ventana_s, "enabled": False}
+
+        self.vaciar()
+        try:
+            with self._lock:
+                filas = self._conexion().execute(
+                    f"SELECT {', '.join(_COLUMNAS)} FROM llm_calls WHERE ts >= ?",
+                    (time.time() - ventana_s,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo leer el registro de llamadas LLM: {e}")
+            filas = []
+
+        llamadas = [dict(zip(_COLUMNAS, fila)) for fila in filas]
+        por_llamador = defaultdict(list)
+        por_modelo = defaultdict(list)
+        for llamada in llamadas:
+            por_llamador[llamada["caller"]].append(llamada)
+            por_modelo[llamada["model"]].append(llamada)
+
+        return {
+            "window_s": ventana_s,
+            "enabled": True,
+            "totals": _resumir(llamadas),
+            "by_caller": {nombre: _resumir(grupo) for nombre, grupo in sorted(por_llamador.items())},
+            "by_model": {nombre: _resumir(grupo) for nombre, grupo in sorted(por_modelo.items())},
+        }
+
+
+def _resumir(llamadas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Los aciertos de caché no tocan al proveedor: no cuentan en la latencia
+    remotas = [l for l in llamadas if not l["cache_hit"]]
+    latencias = [l["latency_s"] for l in remotas]
+    return {
+        "calls": len(llamadas),
+        "cache_hits": len(llamadas) - len(remotas),
+        "errors": sum(1 for l in llamadas if l["status"] == "error"),
+        "prompt_tokens": sum(l["prompt_tokens"] for l in llamadas),
+        "completion_tokens": sum(l["completion_tokens"] for l in llamadas),
+        "retries": sum(l["retries"] for l in remotas),
+        "calls_with_retries": sum(1 for l in remotas if l["retries"]),
+        "wait_429_s": round(sum(l["wait_429_s"] for l in remotas), 3),
+        "latency_p50_s": round(percentil(latencias, 50), 3),
+        "latency_p95_s": round(percentil(latencias, 95), 3),
+        "latency_max_s": round(max(latencias), 3) if latencias else 0.0,
+    }
+
+
+# Instancia compartida por todo el proceso
+ledger_llm = LedgerLLM(
+    LLM_LEDGER_FILE,
+    retencion_dias=LLM_LEDGER_RETENTION_DAYS,
+    habilitado=not LLM_LEDGER_DISABLED
+)
@@ -7,13 +7,16 @@ para un modelo de lenguaje reflexivo.
 
 import json
 import logging
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import List, Dict, Any, Optional
 
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from backend.app.config import FAISS_INDEX_FILE, METADATA_FILE
+from backend.app.modules.journal.core.chunk_store import materializar_textos
+from backend.app.modules.journal.core.entry_texts import cargar_textos_de_entradas
 
 
 # ============================================================
@@ -40,23 +43,48 @@ class DiarioQueryEngine:
 
     def __init__(
         self,
-        model_name: str = "intfloat/multilingual-e5-small"
+        model_name: str = "intfloat/multilingual-e5-small",
+        model: Optional[SentenceTransformer] = None,
+        ruta_index: Path = FAISS_INDEX_FILE,
+        ruta_metadata: Path = METADATA_FILE
     ):
+        """
+        Args:
+            model_name: Modelo de sentence-transformers para las consultas
+            model: Modelo ya cargado (o un doble con la misma interfaz)
+            ruta_index: Índice FAISS a cargar
+            ruta_metadata: Metadata de los chunks del índice
+        """
         logger.info("Inicializando motor de consulta")
 
-        logger.info(f"Cargando modelo de embeddings: {model_name}")
-        self.model = SentenceTransformer(
-            model_name,
-            device="cpu"
-        )
+        if model is None:
+            logger.info(f"Cargando modelo de embeddings: {model_name}")
+            model = SentenceTransformer(
+                model_name,
+                device="cpu"
+            )
+        self.model = model
 
-        logger.info(f"Cargando índice FAISS: {FAISS_INDEX_FILE}")
-        self.index = faiss.read_index(str(FAISS_INDEX_FILE))
+        logger.info(f"Cargando índice FAISS: {ruta_index}")
+        self.index = faiss.read_index(str(ruta_index))
 
-        logger.info(f"Cargando metadata: {METADATA_FILE}")
-        with open(METADATA_FILE, "r", encoding="utf-8") as f:
+        logger.info(f"Cargando metadata: {ruta_metadata}")
+        with open(ruta_metadata, "r", encoding="utf-8") as f:
             self.metadata = json.load(f)
 
+        # Texto de los chunks guardados como offsets sobre su entrada
+        materializar_textos(self.metadata, cargar_textos_de_entradas)
+
+        # Los índices con IDs devuelven el vector_id del chunk;
+        # la metadata legacy (sin vector_id) es posicional. Los chunks sin
+        # su texto analizado (`stale`) no se devuelven: mejor menos
+        # contexto que el recorte de otra versión de la entrada.
+        self.metadata_por_id = {
+            chunk.get("vector_id", i): chunk
+            for i, chunk in enumerate(self.metadata)
+            if not chunk.get("stale")
+        }
+
         logger.info("Motor listo")
 
 
@@ -84,8 +112,11 @@ class DiarioQueryEngine:
 
         resultados = []
         for rank, idx in enumerate(indices[0]):
-            chunk = self.metadata[idx].copy()
-            chunk["rank"] = rank + 1
+            # FAISS devuelve -1 cuando hay menos de k vectores
+            if idx < 0 or int(idx) not in self.metadata_por_id:
+                continue
+            chunk = self.metadata_por_id[int(idx)].copy()
+            chunk["rank"] = len(resultados) + 1
             chunk["score"] = float(scores[0][rank])
             resultados.append(chunk)
 
@@ -1,8 +1,22 @@
 import requests
 import logging
 import os
+import json
+import threading
+import time
+from typing import Optional
 from dotenv import load_dotenv
 
+from backend.app.config import GROQ_API_URL
+from backend.app.core import metrics
+from backend.app.modules.journal.core.llm_ledger import ledger_llm
+from backend.app.modules.journal.core.rate_limiter import (
+    EsperaCancelada,
+    limitador_llm,
+    cuota_compartida,
+    estimar_tokens,
+    parsear_retry_after
+)
 from backend.app.modules.journal.core.query_engine import DiarioQueryEngine
 
 # ============================================================
@@ -18,7 +32,6 @@ print("API key cargada:", bool(GROQ_API_KEY))
 if not GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY no está definida en el .env")
 
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 MODEL_NAME = "openai/gpt-oss-120b"  # Modelo Llama 3 en Groq
 
 # ============================================================
@@ -130,6 +143,11 @@ Nivel de profundidad deseado: Medio."""
 # CLASE RAG
 # ============================================================
 
+class ChatCancelledError(Exception):
+    """La consulta fue cancelada (p. ej. el cliente cerró la conexión)."""
+    pass
+
+
 class DiarioRAGChat:
     def __init__(self):
         from backend.app.modules.profile.service import ProfileService
@@ -185,8 +203,124 @@ Pregunta del usuario:
         })
         return mensajes
 
-    def preguntar(self, pregunta: str) -> str:
+    def _verificar_cancelacion(self, cancel_event: Optional[threading.Event], etapa: str) -> None:
+        if cancel_event is not None and cancel_event.is_set():
+            metrics.increment(f"journal.chat.cancelled.{etapa}")
+            raise ChatCancelledError(f"Consulta cancelada antes de: {etapa}")
+
+    @staticmethod
+    def _actualizar_cuota(proveedor: str, response: requests.Response) -> None:
+        """
+        Pasa a la cuota compartida lo que informó el proveedor. Un 429 no
+        se reintenta (el usuario está esperando), pero su Retry-After
+        frena también al analizador y a los otros procesos.
+        """
+        bloquear_por = None
+        if response.status_code == 429:
+            bloquear_por = parsear_retry_after(response.headers.get("retry-after"))
+        cuota_compartida.actualizar(proveedor, response.headers, bloquear_por=bloquear_por)
+
+    def _completar(
+        self,
+        payload: dict,
+        headers: dict,
+        cancel_event: Optional[threading.Event] = None
+    ) -> str:
+        inicio = time.perf_counter()
+        usage = {}
+        estado = "error"
+        # Misma cuota que el analizador: se reservan los tokens estimados
+        # antes de enviar y se corrige con los headers y el uso real
+        tokens_estimados = estimar_tokens(payload)
+        proveedor = f"groq:{payload['model']}"
+        reservado = enviado = False
+        try:
+            # La espera se corta si el cliente se va: no retiene el worker
+            try:
+                with metrics.span("llm.rate_limit_wait", espera_llm=True):
+                    limitador_llm.adquirir(tokens_estimados, cancel_event)
+                    reservado = True
+                    cuota_compartida.esperar_turno(proveedor, tokens_estimados, cancel_event)
+            except EsperaCancelada:
+                pass
+            self._verificar_cancelacion(cancel_event, "llm")
+
+            enviado = True
+            if cancel_event is None:
+                response = requests.post(
+                    GROQ_API_URL,
+                    json=payload,
+                    headers=headers,
+                    timeout=30
+                )
+                self._actualizar_cuota(proveedor, response)
+                response.raise_for_status()
+                data = response.json()
+                usage = data.get("usage") or {}
+                estado = "ok"
+                return data["choices"][0]["message"]["content"]
+
+            # En modo streaming podemos cortar la conexión en cuanto se pide
+            # cancelar: el proveedor deja de generar y no se consumen más tokens.
+            partes = []
+            with requests.post(
+                GROQ_API_URL,
+                json={**payload, "stream": True},
+                headers=headers,
+                timeout=30,
+                stream=True
+            ) as response:
+                # Los headers de cuota llegan antes que el cuerpo
+                self._actualizar_cuota(proveedor, response)
+                response.raise_for_status()
+                for linea in response.iter_lines(decode_unicode=True):
+                    self._verificar_cancelacion(cancel_event, "llm")
+                    if not linea or not linea.startswith("data:"):
+                        continue
+                    dato = linea[len("data:"):].strip()
+                    if dato == "[DONE]":
+                        break
+                    fragmento = json.loads(dato)
+                    # El último fragmento trae el uso (Groq lo pone en x_groq)
+                    usage = fragmento.get("usage") or (fragmento.get("x_groq") or {}).get("usage") or usage
+                    if fragmento.get("choices"):
+                        delta = fragmento["choices"][0].get("delta") or {}
+                        partes.append(delta.get("content") or "")
+            estado = "ok"
+            return "".join(partes)
+        except ChatCancelledError:
+            estado = "cancelled"
+            raise
+        finally:
+            if "total_tokens" in usage:
+                limitador_llm.ajustar(tokens_estimados, usage["total_tokens"])
+            elif reservado and not enviado:
+                # Cancelada antes de enviar: se devuelve la reserva
+                limitador_llm.ajustar(tokens_estimados, 0)
+            ledger_llm.registrar(
+                "chat",
+                "groq",
+                payload["model"],
+                latency_s=time.perf_counter() - inicio,
+                prompt_tokens=usage.get("prompt_tokens") or 0,
+                completion_tokens=usage.get("completion_tokens") or 0,
+                status=estado
+            )
+
+    def preguntar(
+        self,
+        pregunta: str,
+        cancel_event: Optional[threading.Event] = None
+    ) -> str:
+        """
+        Responde una pregunta usando el contexto del diario.
+
+        Si se pasa `cancel_event` y se activa, se abandona la recuperación
+        pendiente o la respuesta del LLM en curso con ChatCancelledError.
+        """
+        self._verificar_cancelacion(cancel_event, "retrieval")
         mensajes = self.construir_prompt(pregunta)
+        self._verificar_cancelacion(cancel_event, "llm")
 
         payload = {
             "model": MODEL_NAME,
@@ -199,16 +333,7 @@ Pregunta del usuario:
             "Content-Type": "application/json"
         }
 
-        response = requests.post(
-            GROQ_API_URL,
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-
-        response.raise_for_status()
-        data = response.json()
-        respuesta = data["choices"][0]["message"]["content"]
+        respuesta = self._completar(payload, headers, cancel_event)
 
         # Guardar en memoria para la próxima interacción
         self.historial.append({"role": "user", "content": pregunta})
@@ -216,7 +341,6 @@ Pregunta del usuario:
 
         return respuesta
 
-
 if __name__ == "__main__":
     chat = DiarioRAGChat()
 
@@ -0,0 +1,394 @@
+"""
+Limitador de Tasa para Llamadas al LLM
+-------------------------------------
+Token buckets compartidos entre hilos para respetar los límites
+del proveedor (solicitudes/minuto y tokens/minuto).
+
+Responsabilidades:
+- Estimar los tokens de una solicitud
+- Bloquear al llamador hasta que haya cupo (con una espera que se puede
+  cancelar, para solicitudes cuyo cliente ya se fue)
+- Corregir la estimación con el uso real informado por la API
+- Compartir entre procesos la cuota restante que informa el proveedor
+  (headers Retry-After y x-ratelimit-*) mediante un registro SQLite
+"""
+
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+from backend.app.config import (
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_RATE_LIMIT_FILE
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class EsperaCancelada(Exception):
+    """Se canceló la espera por cupo antes de obtenerlo."""
+    pass
+
+
+def _esperar(segundos: float, cancelar: Optional[threading.Event]) -> None:
+    """Duerme `segundos`, o hasta que se active `cancelar` (EsperaCancelada)."""
+    if cancelar is None:
+        time.sleep(segundos)
+    elif cancelar.wait(segundos):
+        raise EsperaCancelada("Espera por cupo cancelada")
+
+
+# ============================================================
+# TOKEN BUCKET
+# ============================================================
+
+class TokenBucket:
+    """
+    Cubeta que se rellena de forma continua hasta `capacidad`
+    a razón de `capacidad / periodo` unidades por segundo.
+    No es thread-safe por sí sola: la protege LimitadorTasa.
+    """
+
+    def __init__(self, capacidad: float, periodo: float = 60.0):
+        self.capacidad = float(capacidad)
+        self.tasa = self.capacidad / periodo
+        self.disponible = self.capacidad
+        self._ultimo = time.monotonic()
+
+    def _rellenar(self) -> None:
+        ahora = time.monotonic()
+        self.disponible = min(
+            self.capacidad,
+            self.disponible + (ahora - self._ultimo) * self.tasa
+        )
+        self._ultimo = ahora
+
+    def espera_necesaria(self, cantidad: float) -> float:
+        """Segundos hasta que haya `cantidad` unidades disponibles."""
+        self._rellenar()
+        faltante = cantidad - self.disponible
+        return max(0.0, faltante / self.tasa)
+
+    def consumir(self, cantidad: float) -> None:
+        self._rellenar()
+        self.disponible -= cantidad
+
+    def devolver(self, cantidad: float) -> None:
+        self._rellenar()
+        self.disponible = min(self.capacidad, self.disponible + cantidad)
+
+
+# ============================================================
+# LIMITADOR COMBINADO
+# ============================================================
+
+class LimitadorTasa:
+    """
+    Combina un bucket de solicitudes y uno de tokens.
+    Todas las llamadas al proveedor desde un mismo proceso
+    deben pasar por la misma instancia.
+    """
+
+    def __init__(self, requests_por_minuto: int, tokens_por_minuto: int):
+        self._lock = threading.Lock()
+        self.requests = TokenBucket(requests_por_minuto)
+        self.tokens = TokenBucket(tokens_por_minuto)
+
+    def adquirir(self, tokens_estimados: int, cancelar: Optional[threading.Event] = None) -> float:
+        """
+        Bloquea hasta poder enviar una solicitud de `tokens_estimados`.
+
+        Args:
+            tokens_estimados: Tokens a reservar
+            cancelar: Si se activa antes de obtener cupo, se abandona la
+                espera con EsperaCancelada (sin reservar nada)
+
+        Returns:
+            Segundos esperados
+        """
+        # Una solicitud más grande que el límite por minuto nunca cabría
+        tokens_estimados = min(tokens_estimados, self.tokens.capacidad)
+        esperado = 0.0
+
+        while True:
+            if cancelar is not None and cancelar.is_set():
+                raise EsperaCancelada("Espera por cupo cancelada")
+            with self._lock:
+                espera = max(
+                    self.requests.espera_necesaria(1),
+                    self.tokens.espera_necesaria(tokens_estimados)
+                )
+                if espera <= 0:
+                    self.requests.consumir(1)
+                    self.tokens.consumir(tokens_estimados)
+                    return esperado
+
+            logger.debug(f"Rate limit local: esperando {espera:.2f}s")
+            _esperar(espera, cancelar)
+            esperado += espera
+
+    def ajustar(self, tokens_estimados: int, tokens_reales: int) -> None:
+        """Corrige el bucket de tokens con el uso real de la respuesta."""
+        diferencia = min(tokens_estimados, self.tokens.capacidad) - tokens_reales
+        with self._lock:
+            if diferencia > 0:
+                self.tokens.devolver(diferencia)
+            elif diferencia < 0:
+                self.tokens.consumir(-diferencia)
+
+
+def estimar_tokens(payload: Dict[str, Any]) -> int:
+    """
+    Estimación gruesa (~4 caracteres por token) de los tokens de entrada
+    más los de salida. Si no hay `max_tokens` se asume una salida del
+    mismo tamaño que la entrada, que es el caso del chunking.
+    """
+    caracteres = sum(
+        len(m.get("content") or "") for m in payload.get("messages", [])
+    )
+    tokens_entrada = caracteres // 4 + 1
+    return tokens_entrada + payload.get("max_tokens", tokens_entrada)
+
+
+# ============================================================
+# CUOTA COMPARTIDA ENTRE PROCESOS
+# ============================================================
+
+def parsear_duracion(valor: Optional[str]) -> Optional[float]:
+    """
+    Convierte duraciones de headers de rate limit a segundos.
+    Acepta segundos ("7", "7.66") y el formato de Groq/OpenAI ("2m59.56s", "120ms").
+    """
+    if not valor:
+        return None
+    valor = valor.strip()
+    try:
+        return float(valor)
+    except ValueError:
+        pass
+
+    partes = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", valor)
+    if not partes:
+        return None
+    factores = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(n) * factores[u] for n, u in partes)
+
+
+def parsear_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Retry-After puede venir en segundos o como fecha HTTP."""
+    segundos = parsear_duracion(valor)
+    if segundos is not None:
+        return segundos
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _entero(valor: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(valor)) if valor is not None else None
+    except ValueError:
+        return None
+
+
+class CuotaCompartida:
+    """
+    Registro en SQLite de la cuota restante por proveedor/modelo.
+    
+    Cada proceso (CLI batch, servidor API) reserva su solicitud dentro de
+    una transacción BEGIN IMMEDIATE, que toma el lock de escritura del
+    archivo: así dos procesos no gastan el mismo cupo ni ignoran un 429
+    que recibió el otro.
+    """
+
+    def __init__(self, ruta_db: Path):
+        self.ruta_db = Path(ruta_db)
+        self._inicializada = False
+
+    # --------------------------------------------------------
+
+    def _conexion(self) -> sqlite3.Connection:
+        if not self._inicializada:
+            self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.ruta_db), timeout=30, isolation_level=None)
+        if not self._inicializada:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_state (
+                    provider TEXT PRIMARY KEY,
+                    blocked_until REAL NOT NULL DEFAULT 0,
+                    remaining_requests INTEGER,
+                    reset_requests_at REAL,
+                    remaining_tokens INTEGER,
+                    reset_tokens_at REAL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._inicializada = True
+        return conn
+
+    # --------------------------------------------------------
+
+    def reservar(self, proveedor: str, tokens_estimados: int) -> float:
+        """
+        Intenta reservar cupo para una solicitud.
+        
+        Returns:
+            0 si se reservó; si no, los segundos a esperar antes de reintentar
+        """
+        ahora = time.time()
+        conn = self._conexion()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            fila = conn.execute(
+                """
+                SELECT blocked_until, remaining_requests, reset_requests_at,
+                       remaining_tokens, reset_tokens_at
+                FROM rate_limit_state WHERE provider = ?
+                """,
+                (proveedor,)
+            ).fetchone()
+
+            if fila is None:
+                conn.execute("COMMIT")
+                return 0.0
+
+            bloqueado, req_rest, req_reset, tok_rest, tok_reset = fila
+            espera = max(0.0, bloqueado - ahora)
+
+            # Los contadores solo valen hasta su reinicio
+            if req_reset is None or req_reset <= ahora:
+                req_rest = None
+            if tok_reset is None or tok_reset <= ahora:
+                tok_rest = None
+
+            if req_rest is not None and req_rest < 1:
+                espera = max(espera, req_reset - ahora)
+            if tok_rest is not None and tok_rest < tokens_estimados:
+                espera = max(espera, tok_reset - ahora)
+
+            if espera > 0:
+                conn.execute("COMMIT")
+                return espera
+
+            conn.execute(
+                """
+                UPDATE rate_limit_state
+                SET remaining_requests = ?, remaining_tokens = ?, updated_at = ?
+                WHERE provider = ?
+                """,
+                (
+                    None if req_rest is None else req_rest - 1,
+                    None if tok_rest is None else tok_rest - tokens_estimados,
+                    ahora,
+                    proveedor
+                )
+            )
+            conn.execute("COMMIT")
+            return 0.0
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo leer el estado de cuota compartido: {e}")
+            return 0.0
+        finally:
+            conn.close()
+
+    # --------------------------------------------------------
+
+    def esperar_turno(
+        self,
+        proveedor: str,
+        tokens_estimados: int,
+        cancelar: Optional[threading.Event] = None
+    ) -> float:
+        """
+        Bloquea hasta poder reservar cupo. Agrega jitter para que los
+        procesos que esperan el mismo reinicio no salgan todos juntos.
+        
+        Args:
+            proveedor: Clave del proveedor/modelo
+            tokens_estimados: Tokens a reservar
+            cancelar: Si se activa antes de obtener cupo, se abandona la
+                espera con EsperaCancelada (sin reservar nada)
+        
+        Returns:
+            Segundos esperados
+        """
+        esperado = 0.0
+        while True:
+            if cancelar is not None and cancelar.is_set():
+                raise EsperaCancelada("Espera por cupo cancelada")
+            espera = self.reservar(proveedor, tokens_estimados)
+            if espera <= 0:
+                return esperado
+            espera += random.uniform(0, 0.5)
+            logger.info(f"Cuota del proveedor agotada, esperando {espera:.2f}s")
+            _esperar(espera, cancelar)
+            esperado += espera
+
+    # --------------------------------------------------------
+
+    def actualizar(
+        self,
+        proveedor: str,
+        headers: Mapping[str, str],
+        bloquear_por: Optional[float] = None
+    ) -> None:
+        """
+        Guarda la cuota restante informada en los headers de una respuesta.
+        
+        Args:
+            proveedor: Clave del proveedor/modelo
+            headers: Headers de la respuesta HTTP
+            bloquear_por: Si se indica, nadie envía solicitudes durante ese tiempo
+        """
+        ahora = time.time()
+        req_rest = _entero(headers.get("x-ratelimit-remaining-requests"))
+        tok_rest = _entero(headers.get("x-ratelimit-remaining-tokens"))
+        req_reset = parsear_duracion(headers.get("x-ratelimit-reset-requests"))
+        tok_reset = parsear_duracion(headers.get("x-ratelimit-reset-tokens"))
+
+        conn = self._conexion()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                INSERT INTO rate_limit_state
+                    (provider, blocked_until, remaining_requests, reset_requests_at,
+                     remaining_tokens, reset_tokens_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(provider) DO UPDATE SET
+                    blocked_until = MAX(blocked_until, excluded.blocked_until),
+                    remaining_requests = COALESCE(excluded.remaining_requests, remaining_requests),
+                    reset_requests_at = COALESCE(excluded.reset_requests_at, reset_requests_at),
+                    remaining_tokens = COALESCE(excluded.remaining_tokens, remaining_tokens),
+                    reset_tokens_at = COALESCE(excluded.reset_tokens_at, reset_tokens_at),
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    proveedor,
+                    ahora + bloquear_por if bloquear_por else 0.0,
+                    req_rest,
+                    ahora + req_reset if req_reset is not None else None,
+                    tok_rest,
+                    ahora + tok_reset if tok_reset is not None else None,
+                    ahora
+                )
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo guardar el estado de cuota compartido: {e}")
+        finally:
+            conn.close()
+
+
+# Instancias compartidas por todo el proceso
+limitador_llm = LimitadorTasa(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+cuota_compartida = CuotaCompartida(LLM_RATE_LIMIT_FILE)
@@ -0,0 +1,416 @@
+"""
+Reanálisis Incremental de Entradas Editadas
+-------------------------------------------
+Cuando una entrada ya analizada se vuelve a guardar con cambios, compara
+el texto nuevo con la versión analizada (el `raw_text` del log de
+análisis) párrafo por párrafo con difflib:
+
+- Párrafos iguales: sus chunks se conservan, solo se desplazan offsets.
+- Ediciones menores (párrafos reemplazados por otros casi iguales, p. ej.
+  una errata): los chunks se conservan y sus offsets se ajustan con un
+  diff por caracteres, sin llamar al LLM.
+- Cambios mayores (párrafos nuevos, borrados o reescritos): solo la
+  región afectada (más los chunks que la tocan) se vuelve a chunkear.
+
+Los chunks conservados mantienen su chunk_id, así el almacén de chunks
+no los marca para reindexar salvo que su texto haya cambiado. El
+análisis de la entrada (resumen, emociones...) se reutiliza si la
+proporción de texto cambiado es menor que INCREMENTAL_ANALYSIS_THRESHOLD.
+
+Si la versión previa no sirve de base (chunks sin offsets, cambios muy
+grandes) devuelve None y se procesa la entrada completa.
+"""
+
+import bisect
+import difflib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.app.config import CHUNKING_MODE, INCREMENTAL_ANALYSIS_THRESHOLD
+from backend.app.modules.journal.core.chunk_store import hash_texto, texto_de_rango, tiene_offsets
+from backend.app.modules.journal.core.diary_analyzer import (
+    rangos_de_parrafos,
+    chunkear_heuristico,
+    chunkear_con_llm_por_ventanas,
+    crear_chunks_enriquecidos,
+    extraer_analisis_y_chunks,
+    generar_id_chunk
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Párrafos reemplazados con al menos esta similitud son ediciones menores
+SIMILITUD_EDICION_MENOR = 0.85
+
+# Por encima de esta proporción de texto cambiado se procesa todo de nuevo
+MAX_CAMBIO_INCREMENTAL = 0.5
+
+
+# ============================================================
+# MAPA DE OFFSETS (TEXTO PREVIO → TEXTO NUEVO)
+# ============================================================
+
+def _inicio_tramo(parrafos: List[Tuple[int, int]], k: int, largo: int) -> int:
+    """
+    Inicio del tramo del párrafo k: el párrafo más el espacio que lo sigue
+    (el primero empieza en 0). Los tramos cubren todo el texto.
+    """
+    if k >= len(parrafos):
+        return largo
+    return 0 if k == 0 else parrafos[k][0]
+
+
+def _parrafos_recortados(texto: str) -> List[Tuple[int, int]]:
+    """Rangos de párrafos sin el espacio en blanco de sus bordes."""
+    rangos = []
+    for a, b in rangos_de_parrafos(texto):
+        parrafo = texto[a:b]
+        rangos.append((a + len(parrafo) - len(parrafo.lstrip()), b - len(parrafo) + len(parrafo.rstrip())))
+    return rangos
+
+
+def _mapear_en_parrafo(opcodes: List[Tuple[str, int, int, int, int]], r: int, lado: str) -> int:
+    """
+    Mapea un offset relativo dentro de un párrafo editado. Un inicio de
+    chunk incluye lo insertado justo en su posición; un fin de chunk
+    incluye lo reemplazado justo antes.
+    """
+    for tag, i1, i2, j1, j2 in opcodes:
+        if lado == "inicio":
+            if not (i1 <= r < i2 or i1 == i2 == r):
+                continue
+        elif not (i1 < r <= i2):
+            continue
+        if tag == "equal":
+            return j1 + (r - i1)
+        return j1 if lado == "inicio" else j2
+    return opcodes[-1][4] if r > 0 and opcodes else 0
+
+
+class _MapaOffsets:
+    """
+    Función por tramos de offsets del texto previo a offsets del nuevo.
+    Cada pieza cubre [inicio, fin] del texto previo; las piezas de cambios
+    mayores solo mapean sus extremos.
+    """
+
+    def __init__(self) -> None:
+        self._inicios: List[int] = []
+        self._piezas: List[Tuple[int, int, Any]] = []
+
+    def agregar(self, inicio: int, fin: int, mapear) -> None:
+        if fin <= inicio:
+            return  # inserciones puras: no hay offsets previos que mapear
+        self._inicios.append(inicio)
+        self._piezas.append((inicio, fin, mapear))
+
+    def __call__(self, p: int, lado: str) -> Optional[int]:
+        if lado == "inicio":
+            k = bisect.bisect_right(self._inicios, p) - 1
+            if k < 0 or not (self._piezas[k][0] <= p < self._piezas[k][1]):
+                k = len(self._piezas) - 1 if self._piezas and p == self._piezas[-1][1] else -1
+        else:
+            k = bisect.bisect_left(self._inicios, p) - 1
+            if k < 0 or not (self._piezas[k][0] < p <= self._piezas[k][1]):
+                k = 0 if self._piezas and p == self._piezas[0][0] else -1
+        if k < 0:
+            return None
+        return self._piezas[k][2](p, lado)
+
+
+def _pieza_igual(previo: Tuple[int, int], nuevo: Tuple[int, int], tramo_nuevo: Tuple[int, int]):
+    """Párrafo idéntico: desplazamiento fijo, acotado al tramo nuevo."""
+    def mapear(p: int, lado: str) -> int:
+        return min(max(nuevo[0] + (p - previo[0]), tramo_nuevo[0]), tramo_nuevo[1])
+    return mapear
+
+
+def _pieza_menor(
+    previo: Tuple[int, int],
+    nuevo: Tuple[int, int],
+    tramo_nuevo: Tuple[int, int],
+    opcodes: List[Tuple[str, int, int, int, int]]
+):
+    """Párrafo con una edición menor: diff por caracteres dentro del párrafo."""
+    def mapear(p: int, lado: str) -> int:
+        if p < previo[0]:
+            destino = nuevo[0] - (previo[0] - p)
+        elif p > previo[1]:
+            destino = nuevo[1] + (p - previo[1])
+        else:
+            destino = nuevo[0] + _mapear_en_parrafo(opcodes, p - previo[0], lado)
+        return min(max(destino, tramo_nuevo[0]), tramo_nuevo[1])
+    return mapear
+
+
+def _pieza_mayor(inicio: int, fin: int, nuevo_inicio: int, nuevo_fin: int):
+    """Región reescrita: solo sus extremos tienen equivalente en el texto nuevo."""
+    def mapear(p: int, lado: str) -> Optional[int]:
+        if p == inicio and lado == "inicio":
+            return nuevo_inicio
+        if p == fin and lado == "fin":
+            return nuevo_fin
+        return None
+    return mapear
+
+
+# ============================================================
+# DIFF POR PÁRRAFOS
+# ============================================================
+
+def comparar_por_parrafos(
+    previo: str,
+    nuevo: str
+) -> Tuple[_MapaOffsets, List[Tuple[int, int, int, int]], float]:
+    """
+    Compara dos versiones de una entrada.
+
+    Returns:
+        Tupla (mapa de offsets previo → nuevo,
+               regiones con cambios mayores como (inicio, fin) en el texto
+               previo y (inicio, fin) en el nuevo,
+               proporción de caracteres cambiados)
+    """
+    parrafos_previos = _parrafos_recortados(previo)
+    parrafos_nuevos = _parrafos_recortados(nuevo)
+    textos_previos = [previo[a:b] for a, b in parrafos_previos]
+    textos_nuevos = [nuevo[a:b] for a, b in parrafos_nuevos]
+
+    def tramo_previo(k: int) -> Tuple[int, int]:
+        return (_inicio_tramo(parrafos_previos, k, len(previo)),
+                _inicio_tramo(parrafos_previos, k + 1, len(previo)))
+
+    def tramo_nuevo(k: int) -> Tuple[int, int]:
+        return (_inicio_tramo(parrafos_nuevos, k, len(nuevo)),
+                _inicio_tramo(parrafos_nuevos, k + 1, len(nuevo)))
+
+    mapa = _MapaOffsets()
+    regiones_mayores = []
+    cambiados = 0
+
+    matcher = difflib.SequenceMatcher(None, textos_previos, textos_nuevos, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for k, j in zip(range(i1, i2), range(j1, j2)):
+                mapa.agregar(*tramo_previo(k), _pieza_igual(
+                    parrafos_previos[k], parrafos_nuevos[j], tramo_nuevo(j)
+                ))
+            continue
+
+        if tag == "replace" and i2 - i1 == j2 - j1:
+            pares = []
+            for k, j in zip(range(i1, i2), range(j1, j2)):
+                a, b = previo[slice(*parrafos_previos[k])], nuevo[slice(*parrafos_nuevos[j])]
+                comparador = difflib.SequenceMatcher(None, a, b, autojunk=False)
+                if comparador.real_quick_ratio() < SIMILITUD_EDICION_MENOR or \
+                        comparador.ratio() < SIMILITUD_EDICION_MENOR:
+                    break
+                pares.append((k, j, comparador.get_opcodes()))
+            else:
+                for k, j, opcodes in pares:
+                    cambiados += sum(max(o[2] - o[1], o[4] - o[3]) for o in opcodes if o[0] != "equal")
+                    mapa.agregar(*tramo_previo(k), _pieza_menor(
+                        parrafos_previos[k], parrafos_nuevos[j], tramo_nuevo(j), opcodes
+                    ))
+                continue
+
+        inicio = _inicio_tramo(parrafos_previos, i1, len(previo))
+        fin = _inicio_tramo(parrafos_previos, i2, len(previo))
+        nuevo_inicio = _inicio_tramo(parrafos_nuevos, j1, len(nuevo))
+        nuevo_fin = _inicio_tramo(parrafos_nuevos, j2, len(nuevo))
+        cambiados += max(fin - inicio, nuevo_fin - nuevo_inicio)
+        mapa.agregar(inicio, fin, _pieza_mayor(inicio, fin, nuevo_inicio, nuevo_fin))
+        regiones_mayores.append((inicio, fin, nuevo_inicio, nuevo_fin))
+
+    proporcion = cambiados / max(len(previo), len(nuevo), 1)
+    return mapa, regiones_mayores, proporcion
+
+
+def _toca_region(inicio: int, fin: int, region: Tuple[int, int, int, int]) -> bool:
+    r_inicio, r_fin = region[0], region[1]
+    if r_inicio == r_fin:
+        # Inserción pura: afecta solo al chunk que la contiene
+        return inicio < r_inicio < fin
+    return inicio < r_fin and fin > r_inicio
+
+
+def _sufijo_chunk(chunk_id: str) -> int:
+    try:
+        return int(chunk_id.rsplit("_chunk_", 1)[1])
+    except (IndexError, ValueError):
+        return -1
+
+
+# ============================================================
+# CHUNKING DE REGIONES
+# ============================================================
+
+def _chunkear_region(
+    texto: str,
+    analisis: Dict[str, Any],
+    modelo: str,
+    modo: str,
+    usar_cache: bool
+) -> Tuple[List[Dict[str, Any]], str]:
+    """Chunks crudos (con start/end relativos) de una región y su origen."""
+    if modo == "heuristico":
+        return chunkear_heuristico(texto, analisis), "heuristico"
+    try:
+        return chunkear_con_llm_por_ventanas(texto, modelo, usar_cache), "llm"
+    except Exception as e:
+        if modo != "auto":
+            raise
+        logger.warning(f"Chunking con LLM de la región falló ({e}), usando fallback heurístico")
+        return chunkear_heuristico(texto, analisis), "heuristico"
+
+
+# ============================================================
+# FUNCIÓN PRINCIPAL
+# ============================================================
+
+def reanalizar_incremental(
+    contenido: str,
+    fecha: str,
+    entry_id: str,
+    analisis_previo: Dict[str, Any],
+    chunks_previos: List[Dict[str, Any]],
+    modelo: str = "qwen/qwen3-32b",
+    usar_cache: bool = True,
+    modo_chunking: str = CHUNKING_MODE,
+    umbral_analisis: float = INCREMENTAL_ANALYSIS_THRESHOLD
+) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Actualiza el análisis y los chunks de una entrada editada a partir de
+    su versión previa.
+
+    Args:
+        contenido: Texto nuevo de la entrada
+        fecha: Fecha que se guardará en el análisis
+        entry_id: ID de la entrada
+        analisis_previo: Análisis guardado (con el `raw_text` analizado)
+        chunks_previos: Chunks guardados de la entrada (con offsets)
+        modelo: Modelo a usar para lo que haya que rehacer
+        usar_cache: Si False, ignora la caché de respuestas del LLM
+        modo_chunking: "llm", "heuristico" o "auto"
+        umbral_analisis: Proporción de texto cambiado desde la cual se
+            rehace también el análisis de la entrada
+
+    Returns:
+        Tupla (análisis, chunks), o None si hay que procesar la entrada completa
+    """
+    previo = analisis_previo.get("raw_text")
+    if previo is None or not chunks_previos:
+        return None
+    if not all(tiene_offsets(c) and 0 <= c["start_offset"] <= c["end_offset"] <= len(previo)
+               for c in chunks_previos):
+        return None
+
+    if previo == contenido:
+        return analisis_previo, [{k: v for k, v in c.items() if k != "vector_id"} for c in chunks_previos]
+
+    mapa, regiones, proporcion = comparar_por_parrafos(previo, contenido)
+    if proporcion > MAX_CAMBIO_INCREMENTAL:
+        logger.info(f"{entry_id}: {proporcion:.0%} del texto cambió, se reprocesa completa")
+        return None
+
+    # 1. Análisis de la entrada: se reutiliza si el cambio es chico
+    if proporcion < umbral_analisis:
+        analisis = dict(analisis_previo)
+        analisis_reutilizado = True
+    else:
+        analisis, _ = extraer_analisis_y_chunks(
+            contenido, fecha, entry_id, modelo,
+            generar_chunks=False, usar_cache=usar_cache
+        )
+        analisis_reutilizado = False
+    analisis['id'] = entry_id
+    analisis['raw_text'] = contenido
+    analisis['word_count'] = len(contenido.split())
+    analisis['char_count'] = len(contenido)
+
+    # 2. Chunks que tocan un cambio mayor se agrupan con él en regiones
+    ordenados = sorted(chunks_previos, key=lambda c: c["start_offset"])
+    conservados = []
+    grupos: List[Dict[str, Any]] = []
+    eventos = [(r[0], r[1], "region", r) for r in regiones]
+    for chunk in ordenados:
+        inicio, fin = chunk["start_offset"], chunk["end_offset"]
+        if any(_toca_region(inicio, fin, r) for r in regiones):
+            eventos.append((inicio, fin, "chunk", chunk))
+        else:
+            conservados.append(chunk)
+
+    for inicio, fin, tipo, dato in sorted(eventos, key=lambda e: (e[0], e[1])):
+        if grupos and inicio <= grupos[-1]["fin"]:
+            grupo = grupos[-1]
+            grupo["fin"] = max(grupo["fin"], fin)
+        else:
+            grupo = {"fin": fin, "regiones": [], "chunks": []}
+            grupos.append(grupo)
+        grupo["regiones" if tipo == "region" else "chunks"].append(dato)
+
+    # 3. Los conservados solo se desplazan
+    nuevos_chunks = []
+    hash_contenido = hash_texto(contenido)
+    for chunk in conservados:
+        inicio = mapa(chunk["start_offset"], "inicio")
+        fin = mapa(chunk["end_offset"], "fin")
+        if inicio is None or fin is None or fin <= inicio:
+            logger.warning(f"{entry_id}: no se pudo ubicar {chunk.get('chunk_id')}, se reprocesa completa")
+            return None
+        texto = texto_de_rango(contenido, inicio, fin)
+        actualizado = {k: v for k, v in chunk.items() if k != "vector_id"}
+        actualizado.update({
+            "start_offset": inicio,
+            "end_offset": fin,
+            "source_hash": hash_contenido,
+            "text": texto,
+            "word_count": len(texto.split()),
+            "char_count": len(texto)
+        })
+        nuevos_chunks.append(actualizado)
+
+    # 4. Cada región afectada se vuelve a chunkear por separado
+    siguiente_id = max((_sufijo_chunk(c.get("chunk_id", "")) for c in chunks_previos), default=-1) + 1
+    rechunkeadas = 0
+    for grupo in grupos:
+        extremos = [(r[2], r[3]) for r in grupo["regiones"]]
+        for chunk in grupo["chunks"]:
+            inicio = mapa(chunk["start_offset"], "inicio")
+            fin = mapa(chunk["end_offset"], "fin")
+            extremos.append((inicio, fin))  # None si cae dentro de un cambio mayor
+        inicio = min(a for a, _ in extremos if a is not None)
+        fin = max(b for _, b in extremos if b is not None)
+
+        region = contenido[inicio:fin]
+        if not region.strip():
+            continue  # solo se borró texto
+
+        crudos, origen = _chunkear_region(region, analisis, modelo, modo_chunking, usar_cache)
+        for crudo in crudos:
+            crudo["start"] = crudo.get("start", 0) + inicio
+            crudo["end"] = crudo.get("end", len(region)) + inicio
+
+        enriquecidos = crear_chunks_enriquecidos(
+            contenido, analisis, entry_id, modelo,
+            chunks_llm=crudos, usar_cache=usar_cache, modo=modo_chunking
+        )
+        for chunk in enriquecidos:
+            chunk["chunk_id"] = generar_id_chunk(entry_id, siguiente_id)
+            chunk["metadata"]["source"] = origen
+            siguiente_id += 1
+        nuevos_chunks.extend(enriquecidos)
+        rechunkeadas += 1
+
+    nuevos_chunks.sort(key=lambda c: c["start_offset"])
+    for i, chunk in enumerate(nuevos_chunks):
+        chunk["index"] = i
+    analisis['chunk_count'] = len(nuevos_chunks)
+
+    logger.info(
+        f"{entry_id}: reanálisis incremental ({proporcion:.1%} cambiado): "
+        f"{len(conservados)} chunks conservados, {rechunkeadas} regiones rechunkeadas, "
+        f"análisis {'reutilizado' if analisis_reutilizado else 'regenerado'}"
+    )
+    return analisis, nuevos_chunks
@@ -0,0 +1,208 @@
+"""
+Bitácora de Corridas Batch
+--------------------------
+Registra, por cada archivo de una corrida de procesar_carpeta_diarios,
+la última etapa completada:
+
+    pending → analyzed → chunked → persisted → embedded
+
+Los resultados intermedios del LLM (análisis y chunks) se guardan junto a
+la etapa hasta que la entrada se persiste. Si la corrida se interrumpe
+(crash, Ctrl-C, reintentos agotados), el modo reanudar retoma cada entrada
+desde su primera etapa incompleta sin volver a pagar llamadas al LLM.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from backend.app.core.database import engine
+from backend.app.modules.journal.models import ProcessingRun, ProcessingRunEntry
+
+
+logger = logging.getLogger(__name__)
+
+ETAPAS = ["pending", "analyzed", "chunked", "persisted", "embedded"]
+
+_tablas_listas = False
+_lock = threading.Lock()
+
+
+def _asegurar_tablas() -> None:
+    """El CLI batch puede correr sin que la API haya ejecutado init_db."""
+    global _tablas_listas
+    with _lock:
+        if not _tablas_listas:
+            ProcessingRun.__table__.create(engine, checkfirst=True)
+            ProcessingRunEntry.__table__.create(engine, checkfirst=True)
+            _tablas_listas = True
+
+
+def etapa_alcanzada(etapa: str, objetivo: str) -> bool:
+    """True si `etapa` es `objetivo` o una posterior."""
+    return ETAPAS.index(etapa) >= ETAPAS.index(objetivo)
+
+
+# ============================================================
+# CORRIDAS
+# ============================================================
+
+def iniciar_corrida(archivos: List[Path], etapa_objetivo: str = "persisted") -> int:
+    """
+    Crea una corrida con todos sus archivos en etapa `pending`.
+
+    Returns:
+        ID de la corrida
+    """
+    _asegurar_tablas()
+    with Session(engine) as session:
+        corrida = ProcessingRun(target_stage=etapa_objetivo)
+        session.add(corrida)
+        session.commit()
+        session.refresh(corrida)
+
+        session.add_all([
+            ProcessingRunEntry(run_id=corrida.id, path=os.path.abspath(archivo))
+            for archivo in archivos
+        ])
+        session.commit()
+
+        logger.info(f"Corrida {corrida.id} iniciada con {len(archivos)} archivos")
+        return corrida.id
+
+
+def ultima_corrida_incompleta() -> Optional[ProcessingRun]:
+    """La corrida más reciente que no terminó con todas sus entradas completas."""
+    _asegurar_tablas()
+    with Session(engine) as session:
+        return session.exec(
+            select(ProcessingRun)
+            .where(ProcessingRun.status != "completed")
+            .order_by(ProcessingRun.id.desc())
+        ).first()
+
+
+def entradas_de_corrida(run_id: int) -> Dict[str, ProcessingRunEntry]:
+    """Entradas de una corrida, por ruta absoluta, en el orden original."""
+    _asegurar_tablas()
+    with Session(engine) as session:
+        filas = session.exec(
+            select(ProcessingRunEntry)
+            .where(ProcessingRunEntry.run_id == run_id)
+            .order_by(ProcessingRunEntry.id)
+        ).all()
+        return {fila.path: fila for fila in filas}
+
+
+def finalizar_corrida(run_id: int) -> str:
+    """
+    Cierra la corrida: `completed` si todas las entradas llegaron a la
+    etapa objetivo, `incomplete` si no (se puede reanudar).
+
+    Returns:
+        Estado final
+    """
+    _asegurar_tablas()
+    with Session(engine) as session:
+        corrida = session.get(ProcessingRun, run_id)
+        filas = session.exec(
+            select(ProcessingRunEntry).where(ProcessingRunEntry.run_id == run_id)
+        ).all()
+        completa = all(etapa_alcanzada(f.stage, corrida.target_stage) for f in filas)
+
+        corrida.status = "completed" if completa else "incomplete"
+        corrida.finished_at = datetime.now()
+        session.add(corrida)
+        session.commit()
+
+        logger.info(f"Corrida {run_id} finalizada: {corrida.status}")
+        return corrida.status
+
+
+# ============================================================
+# ETAPAS POR ENTRADA
+# ============================================================
+
+def registrar_etapa(
+    run_id: int,
+    archivo: Path,
+    etapa: str,
+    analisis: Optional[Dict[str, Any]] = None,
+    chunks: Optional[List[Dict[str, Any]]] = None
+) -> None:
+    """
+    Marca una etapa como completada. Puede llamarse desde varios hilos.
+
+    Al llegar a `persisted` se descartan los resultados intermedios:
+    a partir de ahí la fuente de verdad son el log y el almacén de chunks.
+    """
+    _asegurar_tablas()
+    with _lock, Session(engine) as session:
+        fila = session.exec(
+            select(ProcessingRunEntry).where(
+                ProcessingRunEntry.run_id == run_id,
+                ProcessingRunEntry.path == os.path.abspath(archivo)
+            )
+        ).first()
+        if fila is None:
+            return
+
+        fila.stage = etapa
+        fila.error = None
+        fila.updated_at = datetime.now()
+        if analisis is not None:
+            fila.analysis_json = analisis
+        if chunks is not None:
+            fila.chunks_json = chunks
+        if etapa_alcanzada(etapa, "persisted"):
+            fila.analysis_json = None
+            fila.chunks_json = None
+
+        session.add(fila)
+        session.commit()
+
+
+def registrar_etapas(run_id: int, archivos: List[Path], etapa: str) -> None:
+    """
+    Marca la misma etapa para varios archivos con un solo commit (p. ej.
+    tras sincronizar un lote con la DB o tras indexar).
+    """
+    _asegurar_tablas()
+    rutas = {os.path.abspath(archivo) for archivo in archivos}
+    with _lock, Session(engine) as session:
+        filas = session.exec(
+            select(ProcessingRunEntry).where(ProcessingRunEntry.run_id == run_id)
+        ).all()
+        for fila in filas:
+            if fila.path in rutas:
+                fila.stage = etapa
+                fila.error = None
+                fila.updated_at = datetime.now()
+                if etapa_alcanzada(etapa, "persisted"):
+                    fila.analysis_json = None
+                    fila.chunks_json = None
+                session.add(fila)
+        session.commit()
+
+
+def registrar_error(run_id: int, archivo: Path, error: str) -> None:
+    """Guarda el error sin retroceder la etapa alcanzada."""
+    _asegurar_tablas()
+    with _lock, Session(engine) as session:
+        fila = session.exec(
+            select(ProcessingRunEntry).where(
+                ProcessingRunEntry.run_id == run_id,
+                ProcessingRunEntry.path == os.path.abspath(archivo)
+            )
+        ).first()
+        if fila is None:
+            return
+        fila.error = error
+        fila.updated_at = datetime.now()
+        session.add(fila)
+        session.commit()
@@ -0,0 +1,212 @@
+"""
+Reporte de Rendimiento de una Corrida
+-------------------------------------
+Agrega las trazas (ver metrics.span) de una corrida del analizador batch:
+
+- Por etapa: cantidad, total, p50, p95 y máximo. Para las etapas por
+  entrada (lectura, LLM, parseo, chunking, guardado) cada muestra es el
+  total de la etapa en una entrada; las etapas por lote (sincronización
+  con la DB, embeddings, escritura del índice) van en la traza de la
+  corrida y cada span es una muestra.
+- Throughput: entradas por minuto sobre el tiempo de pared.
+- Tiempo de pared vs CPU del proceso vs espera del LLM (solicitudes,
+  limitador de tasa y backoff, sumados entre entradas: con varios
+  workers puede superar al tiempo de pared).
+- Tokens de prompt y de respuesta, y los contadores llm.* de la corrida
+  (p. ej. aciertos de la caché).
+
+Las etapas se anidan (la llamada HTTP queda dentro del análisis), así que
+los totales por etapa no se suman entre sí.
+
+El reporte se guarda como JSON en PROCESSED_DIR/run_reports/ y se expone
+en /api/metrics/runs.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.app.config import PROCESSED_DIR
+from backend.app.core import metrics
+
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_REPORTES = PROCESSED_DIR / "run_reports"
+
+# Entradas más lentas que se listan en el reporte
+TOP_ENTRADAS_LENTAS = 5
+
+# Etapas de primer nivel de una entrada: su suma es el tiempo de la entrada
+ETAPAS_RAIZ = ("analyzer.prepare", "analyzer.persist")
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil `p` (0-100) con interpolación lineal; 0.0 si no hay valores."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def _resumen_etapa(muestras: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(muestras),
+        "total_s": round(sum(muestras), 4),
+        "p50_s": round(percentil(muestras, 50), 4),
+        "p95_s": round(percentil(muestras, 95), 4),
+        "max_s": round(max(muestras), 4) if muestras else 0.0,
+    }
+
+
+class ReporteCorrida:
+    """
+    Junta las trazas de una corrida. Uso:
+
+        reporte = ReporteCorrida(workers=4)
+        traza = reporte.nueva_traza(archivo.name)
+        with metrics.usar_traza(traza):
+            ...  # etapas de la entrada (en cualquier hilo)
+        reporte.cerrar_traza(traza, exitosa=True)
+        with metrics.usar_traza(reporte.traza_corrida):
+            ...  # etapas por lote
+        reporte.guardar(reporte.finalizar())
+    """
+
+    def __init__(
+        self,
+        run_id: Optional[int] = None,
+        workers: int = 1,
+        etapas_raiz: Tuple[str, ...] = ETAPAS_RAIZ
+    ):
+        self.run_id = run_id
+        self.workers = workers
+        self.etapas_raiz = etapas_raiz
+        self.traza_corrida = metrics.Traza("corrida")
+        self._inicio = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+        self._iniciado = datetime.now()
+        self._contadores_iniciales = metrics.snapshot()["counters"]
+        self._muestras: Dict[str, List[float]] = defaultdict(list)
+        self._entradas: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def nueva_traza(self, nombre: str) -> metrics.Traza:
+        return metrics.Traza(nombre)
+
+    def cerrar_traza(self, traza: metrics.Traza, exitosa: bool) -> None:
+        """Suma la traza de una entrada terminada (guardada o fallida)."""
+        datos = traza.copia()
+        totales = {etapa: sum(d) for etapa, d in datos["etapas"].items()}
+        entrada = {
+            "entry": traza.nombre,
+            "ok": exitosa,
+            "total_s": round(sum(totales.get(e, 0.0) for e in self.etapas_raiz), 4),
+            "llm_wait_s": round(datos["espera_llm"], 4),
+            "llm_calls": datos["llamadas_llm"],
+            "tokens": datos["tokens"],
+        }
+        with self._lock:
+            for etapa, total in totales.items():
+                self._muestras[etapa].append(total)
+            self._entradas.append(entrada)
+
+    def finalizar(self) -> Dict[str, Any]:
+        """Arma el reporte de la corrida hasta este momento."""
+        pared = time.perf_counter() - self._inicio
+        cpu = time.process_time() - self._inicio_cpu
+
+        corrida = self.traza_corrida.copia()
+        with self._lock:
+            muestras = {etapa: list(m) for etapa, m in self._muestras.items()}
+            entradas = list(self._entradas)
+        for etapa, duraciones in corrida["etapas"].items():
+            muestras.setdefault(etapa, []).extend(duraciones)
+
+        exitosas = sum(1 for e in entradas if e["ok"])
+        espera_llm = sum(e["llm_wait_s"] for e in entradas) + corrida["espera_llm"]
+        tokens_prompt = sum(e["tokens"]["prompt"] for e in entradas)
+        tokens_respuesta = sum(e["tokens"]["completion"] for e in entradas)
+
+        contadores = metrics.snapshot()["counters"]
+        contadores_llm = {
+            nombre: valor - self._contadores_iniciales.get(nombre, 0)
+            for nombre, valor in contadores.items()
+            if nombre.startswith("llm.") and valor != self._contadores_iniciales.get(nombre, 0)
+        }
+
+        return {
+            "run_id": self.run_id,
+            "started_at": self._iniciado.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "workers": self.workers,
+            "entries": {
+                "processed": len(entradas),
+                "ok": exitosas,
+                "failed": len(entradas) - exitosas,
+                "per_min": round(exitosas / (pared / 60), 2) if pared > 0 else 0.0,
+            },
+            "time": {
+                "wall_s": round(pared, 3),
+                "cpu_s": round(cpu, 3),
+                "llm_wait_s": round(espera_llm, 3),
+            },
+            "llm": {
+                "calls": sum(e["llm_calls"] for e in entradas),
+                "tokens_prompt": tokens_prompt,
+                "tokens_completion": tokens_respuesta,
+                "counters": contadores_llm,
+            },
+            "stages": {etapa: _resumen_etapa(m) for etapa, m in sorted(muestras.items())},
+            "slowest_entries": sorted(entradas, key=lambda e: e["total_s"], reverse=True)[:TOP_ENTRADAS_LENTAS],
+        }
+
+    def guardar(self, reporte: Dict[str, Any], directorio: Path = DIRECTORIO_REPORTES) -> Optional[Path]:
+        """Escribe el reporte como JSON; devuelve la ruta (None si falló)."""
+        try:
+            directorio.mkdir(parents=True, exist_ok=True)
+            ruta = directorio / f"run_{self._iniciado:%Y%m%d_%H%M%S}.json"
+            ruta.write_text(json.dumps(reporte, indent=2, ensure_ascii=False), encoding="utf-8")
+            logger.info(f"Reporte de rendimiento guardado en {ruta}")
+            return ruta
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el reporte de rendimiento: {e}")
+            return None
+
+
+def resumen_para_log(reporte: Dict[str, Any]) -> List[str]:
+    """Líneas legibles del reporte para el resumen final del CLI."""
+    lineas = [
+        f"Entradas/min: {reporte['entries']['per_min']} | "
+        f"pared {reporte['time']['wall_s']:.1f}s | CPU {reporte['time']['cpu_s']:.1f}s | "
+        f"espera LLM {reporte['time']['llm_wait_s']:.1f}s",
+        f"Tokens LLM: {reporte['llm']['tokens_prompt']} prompt / "
+        f"{reporte['llm']['tokens_completion']} respuesta en {reporte['llm']['calls']} llamadas",
+    ]
+    for etapa, datos in reporte["stages"].items():
+        lineas.append(
+            f"  {etapa:<28} n={datos['count']:<5} p50={datos['p50_s']:.3f}s "
+            f"p95={datos['p95_s']:.3f}s total={datos['total_s']:.1f}s"
+        )
+    return lineas
+
+
+def cargar_reportes(limite: int = 10, directorio: Path = DIRECTORIO_REPORTES) -> List[Dict[str, Any]]:
+    """Últimos reportes guardados, del más reciente al más antiguo."""
+    if not directorio.exists():
+        return []
+    reportes = []
+    for ruta in sorted(directorio.glob("run_*.json"), reverse=True)[:limite]:
+        try:
+            reportes.append(json.loads(ruta.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Reporte ilegible {ruta.name}: {e}")
+    return reportes
@@ -1,5 +1,6 @@
-from datetime import date as dt_date
+from datetime import date as dt_date, datetime
 from typing import Optional, List, Dict, Any
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship, JSON, Column
 
 class JournalEntry(SQLModel, table=True):
@@ -32,11 +33,107 @@ class EntryChunk(SQLModel, table=True):
     
     index: int
     chunk_type: str  # facts, emotions, reflection, mixed
-    text: str
+    text: str  # empty when the offsets below are set
     word_count: int
     char_count: int
     
+    # Chunk boundaries in JournalEntry.raw_text; the text is raw_text[start:end].strip()
+    start_offset: Optional[int] = None
+    end_offset: Optional[int] = None
+    
     # Store LLM metadata if any
     metadata_json: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
     
     entry: JournalEntry = Relationship(back_populates="chunks")
+
+class EntryTag(SQLModel, table=True):
+    """One normalized emotion/topic/person mention of an analysis (see core/entry_tags.py)."""
+    __table_args__ = (
+        # "which entries mention X" and counts per value, straight from the index
+        Index("ix_entrytag_kind_value_entry", "tag_kind", "normalized_value", "entry_id"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entry_id: int = Field(foreign_key="journalentry.id", index=True)
+    
+    tag_kind: str  # emotion, topic, person
+    normalized_value: str
+    raw_value: str  # as the LLM wrote it
+
+class DailyEmotionCount(SQLModel, table=True):
+    """Normalized emotion mentions per diary date (see core/emotion_stats.py)."""
+    __table_args__ = (
+        UniqueConstraint("date", "emotion"),
+        # first mention of each emotion without scanning its rows
+        Index("ix_dailyemotioncount_emotion_first", "emotion", "first_mention"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    date: dt_date = Field(index=True)
+    emotion: str
+    count: int
+    # Sort key of the first mention in write order: EntryAnalysis.id and position in its list
+    first_mention: int = 0
+
+class EmotionTotal(SQLModel, table=True):
+    """All-time sum of DailyEmotionCount per emotion, kept in step with it."""
+    emotion: str = Field(primary_key=True)
+    count: int
+
+class EntryFileManifest(SQLModel, table=True):
+    """Last processed version of each diary .md file (see core/file_manifest.py)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    path: str = Field(index=True, unique=True)
+    
+    mtime_ns: int
+    size: int
+    content_hash: str
+    processed_at: datetime = Field(default_factory=datetime.now)
+
+class ProcessingRun(SQLModel, table=True):
+    """A batch run of procesar_carpeta_diarios (see core/run_journal.py)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    started_at: datetime = Field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+    status: str = Field(default="running", index=True)  # running, completed, incomplete
+    target_stage: str  # persisted, embedded
+    
+    entries: List["ProcessingRunEntry"] = Relationship(back_populates="run")
+
+class ProcessingRunEntry(SQLModel, table=True):
+    """Last completed stage of one diary file within a run."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: int = Field(foreign_key="processingrun.id", index=True)
+    path: str
+    
+    stage: str = Field(default="pending")  # pending, analyzed, chunked, persisted, embedded
+    error: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.now)
+    
+    # Intermediate LLM results, kept until the entry is persisted
+    analysis_json: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    chunks_json: Optional[List[Dict[str, Any]]] = Field(default=None, sa_column=Column(JSON))
+    
+    run: ProcessingRun = Relationship(back_populates="entries")
+
+class ProcessingJob(SQLModel, table=True):
+    """
+    Background analysis of one diary date (see services/job_queue.py).
+    At most one queued job exists per date: new saves push its run_after.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entry_date: dt_date = Field(index=True)
+    
+    status: str = Field(default="queued", index=True)  # queued, running, done, failed, superseded
+    attempts: int = 0
+    run_after: datetime = Field(default_factory=datetime.now, index=True)
+    error: Optional[str] = None
+
+    # Process running the job and until when its claim holds (renewed while alive)
+    owner: Optional[str] = None
+    lease_until: Optional[datetime] = None
+    
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
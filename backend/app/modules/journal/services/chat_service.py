@@ -1,6 +1,9 @@
+import threading
+from typing import Optional
+
 from backend.app.modules.journal.core.rag_chat_engine_api import DiarioRAGChat
 
 _chat = DiarioRAGChat()
 
-def ask_chat(question: str) -> str:
-    return _chat.preguntar(question)
+def ask_chat(question: str, cancel_event: Optional[threading.Event] = None) -> str:
+    return _chat.preguntar(question, cancel_event)
@@ -1,34 +1,35 @@
-import json
 import logging
+import os
 from datetime import date as dt_date, datetime
 from pathlib import Path
 from typing import List, Optional
 
 from sqlmodel import Session, select
 from backend.app.core.database import engine
-from backend.app.modules.journal.models import JournalEntry, EntryAnalysis, EntryChunk
+from backend.app.modules.journal.models import JournalEntry
 from backend.app.config import CHUNKS_FILE, FAISS_INDEX_FILE, METADATA_FILE, RAW_DIARY_JSON, DIARY_ENTRIES_DIR
 from backend.app.modules.journal.core.diary_analyzer import (
-    analizar_con_llm, 
-    crear_chunks_enriquecidos, 
+    extraer_analisis_y_chunks,
+    extraer_fecha_de_nombre,
     generar_id_entrada,
-    extraer_json_de_respuesta,
     guardar_analisis
 )
+from backend.app.modules.journal.core.analysis_log import obtener_log_analisis
+from backend.app.modules.journal.core.chunk_store import obtener_chunk_store
+from backend.app.modules.journal.core.reanalisis_incremental import reanalizar_incremental
+from backend.app.modules.journal.core.db_sync import sincronizar_lote
 from backend.app.modules.journal.core.embedding_generator import DiarioVectorIndexer
+from backend.app.modules.journal.core.file_manifest import registrar_procesado
 
 logger = logging.getLogger(__name__)
 
-def save_entry(text: str, date_str: str = None) -> str:
-    if date_str:
-        save_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-    else:
-        save_date = dt_date.today()
-        
+def _upsert_entry(save_date: dt_date, text: str) -> None:
     with Session(engine) as session:
         # Check if entry already exists
         existing = session.exec(select(JournalEntry).where(JournalEntry.date == save_date)).first()
         if existing:
+            if existing.raw_text == text:
+                return
             existing.raw_text = text
             existing.word_count = len(text.split())
             existing.char_count = len(text)
@@ -43,121 +44,118 @@ def save_entry(text: str, date_str: str = None) -> str:
             session.add(entry)
         
         session.commit()
+
+def save_entry(text: str, date_str: str = None) -> str:
+    if date_str:
+        save_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    else:
+        save_date = dt_date.today()
         
-        # Keep Markdown file as backup for now (optional, but requested by user indirectly by saying "now use sqlite instead of json")
-        # I'll keep it for safety during migration phase
-        path = DIARY_ENTRIES_DIR / f"{save_date.isoformat()}.md"
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(text, encoding="utf-8")
+    _upsert_entry(save_date, text)
+    
+    # Keep Markdown file as backup for now (optional, but requested by user indirectly by saying "now use sqlite instead of json")
+    # I'll keep it for safety during migration phase
+    path = DIARY_ENTRIES_DIR / f"{save_date.isoformat()}.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
         
     return save_date.isoformat()
 
+def entry_date_of_file(path: Path) -> Optional[str]:
+    """Entry date (YYYY-MM-DD) of a diary file, or None if its name has no date."""
+    fecha = extraer_fecha_de_nombre(Path(path).name)
+    if not fecha:
+        return None
+    return datetime.strptime(fecha, "%d-%m-%Y").date().isoformat()
+
+def import_entry_file(path: Path, text: str) -> Optional[str]:
+    """
+    Stores the text of a diary file written outside the app (e.g. an
+    external editor) as its JournalEntry, without rewriting the file.
+    
+    Returns:
+        The entry date (YYYY-MM-DD), or None if the file name has no date
+    """
+    date_str = entry_date_of_file(path)
+    if date_str is None:
+        return None
+    _upsert_entry(datetime.strptime(date_str, "%Y-%m-%d").date(), text)
+    return date_str
+
+def _record_processed_files(date_str: str, text: str) -> None:
+    """
+    Records in the file manifest the entry files of `date_str` (either
+    name format) that still hold the processed text. Only done once the
+    entry is processed: a failed job leaves its file pending for the next
+    watcher or batch scan.
+    """
+    y, m, d = date_str.split("-")
+    for name in (f"{date_str}.md", f"{d}-{m}-{y}.md"):
+        path = DIARY_ENTRIES_DIR / name
+        try:
+            # stat before reading: an edit made meanwhile is seen as a change
+            stat = os.stat(path)
+            if path.read_text(encoding="utf-8") != text:
+                continue  # edited since: a later job covers it
+        except (OSError, UnicodeDecodeError):
+            continue
+        registrar_procesado(path, text, stat)
+
 def process_diary_entry(text: str, date_str: str):
     """
-    Background task to analyze, chunk, and index the new entry.
+    Analyzes, chunks, and indexes a saved entry (run by the job queue).
+    
+    Raises:
+        Exception: any failure, so the job queue can retry it
     """
     logger.info(f"Processing diary entry for {date_str}...")
     
     try:
-        # 1. Analyze
-        logger.info("Running LLM analysis...")
-        analisis_raw = analizar_con_llm(text)
-        
-        try:
-             analisis = json.loads(analisis_raw)
-        except json.JSONDecodeError:
-             from backend.app.modules.journal.core.diary_analyzer import extraer_json_de_respuesta
-             json_text = extraer_json_de_respuesta(analisis_raw)
-             analisis = json.loads(json_text)
-
-        # 2. Enrich Analysis
+        # 1-3. Analyze + chunk (single LLM call, two-call fallback)
+        logger.info("Running analysis and chunking...")
         y, m, d = date_str.split("-")
         date_formatted = f"{d}-{m}-{y}"
         entry_id = generar_id_entrada(date_formatted)
 
-        analisis["fecha"] = date_str
-        analisis['id'] = entry_id
-        analisis['raw_text'] = text
-        analisis['word_count'] = len(text.split())
-        analisis['char_count'] = len(text)
-        
-        # 3. Chunk
-        logger.info("Creating enriched chunks...")
-        new_chunks = crear_chunks_enriquecidos(text, analisis, entry_id)
-        analisis['chunk_count'] = len(new_chunks)
+        # Edited entry: diff against the analyzed version and redo only what changed
+        store = obtener_chunk_store(CHUNKS_FILE)
+        incremental = None
+        previous = obtener_log_analisis(RAW_DIARY_JSON).obtener(date_str)
+        if previous is not None:
+            incremental = reanalizar_incremental(text, date_str, entry_id, previous, store.de_entrada(entry_id))
 
-        # 4. Save to Database
-        with Session(engine) as session:
-            entry_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            entry = session.exec(select(JournalEntry).where(JournalEntry.date == entry_date)).first()
-            
-            if entry:
-                # Save Analysis
-                existing_analysis = session.exec(select(EntryAnalysis).where(EntryAnalysis.entry_id == entry.id)).first()
-                if existing_analysis:
-                    session.delete(existing_analysis)
-                
-                db_analysis = EntryAnalysis(
-                    entry_id=entry.id,
-                    summary=analisis.get("summary", ""),
-                    intensity=analisis.get("intensity", "media"),
-                    emotions=analisis.get("emotions", []),
-                    topics=analisis.get("topics", []),
-                    people=analisis.get("people", [])
-                )
-                session.add(db_analysis)
-                
-                # Save Chunks
-                # Delete old chunks first
-                old_chunks = session.exec(select(EntryChunk).where(EntryChunk.entry_id == entry.id)).all()
-                for c in old_chunks:
-                    session.delete(c)
-                
-                for c_data in new_chunks:
-                    db_chunk = EntryChunk(
-                        entry_id=entry.id,
-                        index=c_data.get("index", 0),
-                        chunk_type=c_data.get("type", "mixto"),
-                        text=c_data.get("text", ""),
-                        word_count=c_data.get("word_count", 0),
-                        char_count=c_data.get("char_count", 0),
-                        metadata_json=c_data.get("metadata", {})
-                    )
-                    session.add(db_chunk)
-                
-                session.commit()
-                logger.info(f"Database updated for {date_str}")
-            else:
-                logger.error(f"Entry not found in DB for {date_str} during processing")
+        if incremental is not None:
+            analisis, new_chunks = incremental
+        else:
+            analisis, new_chunks = extraer_analisis_y_chunks(text, date_str, entry_id)
+
+        # 4. Save analysis and chunks to the database (one transaction)
+        sincronizar_lote([analisis], new_chunks)
+        logger.info(f"Database updated for {date_str}")
 
         # 4b. Also save to legacy files for compatibility (Optional, but safer for RAG)
         logger.info(f"Saving analysis to {RAW_DIARY_JSON} for compatibility...")
-        guardar_analisis(analisis, RAW_DIARY_JSON)
+        guardar_analisis(analisis, RAW_DIARY_JSON, sincronizar_db=False)
         
-        # 5. Update Chunks File (Legacy)
-        logger.info("Updating legacy chunks file...")
-        all_chunks = []
-        if CHUNKS_FILE.exists():
-            try:
-                with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
-                    all_chunks = json.load(f)
-            except Exception as e:
-                logger.error(f"Error reading existing chunks: {e}")
-        
-        all_chunks.extend(new_chunks)
-        CHUNKS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(CHUNKS_FILE, "w", encoding="utf-8") as f:
-            json.dump(all_chunks, f, indent=2, ensure_ascii=False)
+        # 5. Upsert this entry's chunks (replaces any previous version)
+        logger.info("Updating chunk store...")
+        store.reemplazar_entrada(entry_id, new_chunks)
             
-        # 6. Re-Index
-        logger.info("Re-indexing FAISS...")
+        # 6. Re-Index (only new/changed chunks and removed vectors)
+        logger.info("Updating FAISS index with pending delta...")
+        # The indexer holds a file lock: safe alongside the watcher CLI and batch scripts
         indexer = DiarioVectorIndexer()
-        indexer.indexar_desde_chunks(CHUNKS_FILE, FAISS_INDEX_FILE, METADATA_FILE)
+        # Kept chunks may have moved: their offsets live in the metadata
+        indexer.indexar_delta(store, FAISS_INDEX_FILE, METADATA_FILE, actualizar_metadata=True)
+        
+        # 7. Record the processed version so the watcher and the batch analyzer skip it
+        _record_processed_files(date_str, text)
         
         logger.info(f"Successfully processed entry for {date_str}")
         
     except Exception as e:
         logger.error(f"Error processing diary entry: {e}", exc_info=True)
+        raise
 
 def list_entries():
     with Session(engine) as session:
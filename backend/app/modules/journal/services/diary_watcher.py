@@ -0,0 +1,255 @@
+"""
+Watch mode for the diary entries directory (DIARY_ENTRIES_DIR).
+
+Picks up .md files created or edited outside the app (e.g. in an external
+editor) and feeds them to the job queue, so they become searchable within
+seconds without a full pipeline pass:
+
+- File events come from watchdog (inotify on Linux) when it is installed;
+  otherwise the directory is polled every WATCH_POLL_SECONDS using the
+  stat-first file manifest scan (only files whose mtime/size changed are
+  read).
+- Events are debounced per file: a file is handled once it has been quiet
+  for WATCH_DEBOUNCE_SECONDS (editors often write in several steps).
+- Each changed file is stored as its JournalEntry and enqueued; the job
+  queue does the incremental analysis, chunking and delta indexing. The
+  file is recorded in the manifest only when its job succeeds, so a
+  failed job leaves it pending for the next scan.
+
+Runs inside the API (DIARY_WATCH_ENABLED=1) or standalone, with its own
+queue workers; the standalone process can run next to the API (job
+claims are leased per process, see job_queue):
+    python -m backend.app.modules.journal.services.diary_watcher
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional: falls back to polling
+    FileSystemEventHandler = object
+    Observer = None
+
+from backend.app.config import DIARY_ENTRIES_DIR, RAW_DIARY_JSON, WATCH_DEBOUNCE_SECONDS, WATCH_POLL_SECONDS
+from backend.app.core import metrics
+from backend.app.modules.journal.core.diary_analyzer import (
+    extraer_fecha_de_nombre,
+    obtener_archivos_diario,
+    obtener_fechas_procesadas
+)
+from backend.app.modules.journal.core.file_manifest import escanear_pendientes
+from backend.app.modules.journal.services.diary_service import entry_date_of_file, import_entry_file, read_entry
+from backend.app.modules.journal.services.job_queue import enqueue_entry, has_active_job
+
+logger = logging.getLogger(__name__)
+
+# With watchdog, a full manifest scan still runs this often in case an
+# event was missed (e.g. inotify queue overflow)
+RESCAN_INTERVAL = 300.0
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "DiaryWatcher"):
+        super().__init__()
+        self._watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._watcher.notify(Path(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._watcher.notify(Path(event.src_path))
+
+    def on_moved(self, event):
+        # Editors that save via a temp file + rename end up here
+        if not event.is_directory:
+            self._watcher.notify(Path(event.dest_path))
+
+
+class DiaryWatcher:
+    """Watches a directory of diary .md files and enqueues the changed ones."""
+
+    def __init__(
+        self,
+        directory: Path = DIARY_ENTRIES_DIR,
+        debounce: float = WATCH_DEBOUNCE_SECONDS,
+        poll_interval: float = WATCH_POLL_SECONDS
+    ):
+        self.directory = Path(directory)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+
+        self._pending: Dict[Path, float] = {}  # path -> time of its last event
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+
+    # --------------------------------------------------------
+
+    def notify(self, path: Path) -> None:
+        """Records a file event; the file is handled once it goes quiet."""
+        if path.suffix != ".md":
+            return
+        with self._lock:
+            self._pending[path] = time.monotonic()
+
+    def _due_files(self) -> List[Path]:
+        now = time.monotonic()
+        with self._lock:
+            due = [p for p, last in self._pending.items() if now - last >= self.debounce]
+            for path in due:
+                del self._pending[path]
+        return due
+
+    def _handle(self, files: List[Path]) -> int:
+        """
+        Enqueues the files whose content changed since they were last
+        processed (a `touch` or an unchanged save is filtered out by the
+        manifest). A file whose text is already stored and has a queued or
+        running job is skipped: that job records it when it succeeds.
+        Returns how many were enqueued.
+        """
+        existing = [f for f in files if f.exists()]
+        if not existing:
+            return 0
+
+        processed_dates = None
+
+        def already_processed(path: Path) -> bool:
+            # Files analyzed before the manifest existed are not re-queued
+            nonlocal processed_dates
+            if processed_dates is None:
+                processed_dates = obtener_fechas_procesadas(RAW_DIARY_JSON)
+            return extraer_fecha_de_nombre(path.name) in processed_dates
+
+        enqueued = 0
+        for path in escanear_pendientes(existing, already_processed):
+            try:
+                stat = os.stat(path)
+                if time.time() - stat.st_mtime < self.debounce:
+                    self.notify(path)  # still being written: retry later
+                    continue
+                text = path.read_text(encoding="utf-8")
+                date_str = entry_date_of_file(path)
+                if date_str is None:
+                    continue
+                if has_active_job(date_str) and (read_entry(date_str) or {}).get("text") == text:
+                    continue
+                import_entry_file(path, text)
+                # The file is already debounced: no extra quiet period in the queue
+                enqueue_entry(date_str, delay=0)
+                enqueued += 1
+                metrics.increment("journal.watcher.enqueued")
+                logger.info(f"Watcher: {path.name} changed, queued for processing")
+            except Exception as e:
+                logger.error(f"Watcher: error handling {path}: {e}", exc_info=True)
+        return enqueued
+
+    def scan(self) -> int:
+        """Full stat-first scan of the directory (startup and polling)."""
+        try:
+            files = obtener_archivos_diario(self.directory)
+        except Exception as e:
+            logger.warning(f"Watcher: cannot scan {self.directory}: {e}")
+            return 0
+        return self._handle(files)
+
+    # --------------------------------------------------------
+
+    def _loop(self) -> None:
+        interval = RESCAN_INTERVAL if self._observer is not None else self.poll_interval
+        next_scan = time.monotonic()
+
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= next_scan:
+                    self.scan()
+                    next_scan = time.monotonic() + interval
+                due = self._due_files()
+                if due:
+                    self._handle(due)
+            except Exception as e:
+                logger.error(f"Watcher loop error: {e}", exc_info=True)
+            self._stop.wait(max(0.1, min(0.5, self.debounce)))
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), str(self.directory), recursive=False)
+            self._observer.start()
+            logger.info(f"Watching {self.directory} (watchdog)")
+        else:
+            logger.info(f"Watching {self.directory} (polling every {self.poll_interval:.0f}s, watchdog not installed)")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="diary-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# ============================================================
+# API PROCESS
+# ============================================================
+
+_watcher: Optional[DiaryWatcher] = None
+
+
+def start_watcher() -> None:
+    global _watcher
+    if _watcher is None:
+        _watcher = DiaryWatcher()
+        _watcher.start()
+
+
+def stop_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+if __name__ == "__main__":
+    from backend.app.core.database import init_db
+    from backend.app.modules.journal.services.job_queue import start_workers, stop_workers
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    init_db()
+    start_workers()
+    watcher = DiaryWatcher()
+    watcher.start()
+    print(f"Watching {watcher.directory} for new or edited entries (Ctrl-C to stop)")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        stop_workers()
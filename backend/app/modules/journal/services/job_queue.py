@@ -0,0 +1,412 @@
+"""
+Persistent queue for diary processing jobs (ProcessingJob table).
+
+Saving an entry enqueues a job for its date instead of processing it
+inline, so the work survives restarts and never runs twice at once for
+the same date:
+
+- Coalescing: there is at most one queued job per date. Saving again
+  only pushes its run_after, so an autosave burst becomes a single run
+  once the date has been quiet for JOB_DEBOUNCE_SECONDS. The worker
+  reads the latest text from the database when the job starts.
+- A date with a running job is not claimed again until it finishes;
+  saves made meanwhile queue one follow-up job.
+- Failed jobs are retried with exponential backoff up to
+  JOB_MAX_ATTEMPTS.
+
+Several processes can run workers on the same database (the API and the
+standalone watcher):
+
+- A claim is a single UPDATE that picks the next due job whose date is
+  not running and records this process as its owner, with a lease of
+  JOB_LEASE_SECONDS. SQLite serializes writers, so two processes never
+  claim the same job or the same date.
+- Each process renews the leases of its running jobs. A job whose lease
+  expired (its process died) is queued again by whichever process sees
+  it first; jobs of live processes are never touched.
+- Finishing a job is conditional on still owning it.
+- Index writes take a file lock in the indexer (core/file_lock.py).
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import date as dt_date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import exists, func, or_, update
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from backend.app.config import (
+    JOB_WORKERS,
+    JOB_DEBOUNCE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_LEASE_SECONDS
+)
+from backend.app.core import metrics
+from backend.app.core.database import engine
+from backend.app.modules.journal.models import JournalEntry, ProcessingJob
+from backend.app.modules.journal.services.diary_service import process_diary_entry
+
+logger = logging.getLogger(__name__)
+
+# Idle workers re-check the queue at least this often (seconds)
+POLL_INTERVAL = 1.0
+
+# Identifies this process's claims (unique even if a PID is reused)
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Serializes enqueue and claim so a save never edits a job being claimed
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_stop = threading.Event()
+_workers: List[threading.Thread] = []
+_lease_thread: Optional[threading.Thread] = None
+
+
+def _job_dict(job: ProcessingJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "date": job.entry_date.isoformat(),
+        "status": job.status,
+        "attempts": job.attempts,
+        "run_after": job.run_after.isoformat(),
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "owner": job.owner,
+        "lease_until": job.lease_until.isoformat() if job.lease_until else None,
+    }
+
+
+# ============================================================
+# QUEUE
+# ============================================================
+
+def enqueue_entry(date_str: str, delay: Optional[float] = None) -> int:
+    """
+    Schedules processing of the entry saved for `date_str` (YYYY-MM-DD).
+
+    Args:
+        date_str: Entry date
+        delay: Quiet period before processing, in seconds
+            (default JOB_DEBOUNCE_SECONDS)
+
+    Returns:
+        ID of the queued job (an existing one if it was coalesced)
+    """
+    entry_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    now = datetime.now()
+    run_after = now + timedelta(seconds=JOB_DEBOUNCE_SECONDS if delay is None else delay)
+
+    with _lock, Session(engine) as session:
+        job = session.exec(
+            select(ProcessingJob).where(
+                ProcessingJob.entry_date == entry_date,
+                ProcessingJob.status == "queued"
+            )
+        ).first()
+
+        # Coalesce: the pending run will pick up the latest text. The update
+        # is conditional because another process may have just claimed it.
+        if job is not None and session.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.id == job.id, ProcessingJob.status == "queued")
+            .values(run_after=func.max(ProcessingJob.run_after, run_after), updated_at=now)
+        ).rowcount == 1:
+            session.commit()
+            job_id = job.id
+            metrics.increment("journal.jobs.coalesced")
+        else:
+            job = ProcessingJob(entry_date=entry_date, run_after=run_after)
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            job_id = job.id
+            metrics.increment("journal.jobs.enqueued")
+
+    _wakeup.set()
+    return job_id
+
+
+def has_active_job(date_str: str) -> bool:
+    """Whether the entry for `date_str` has a queued or running job."""
+    entry_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    with Session(engine) as session:
+        return session.exec(
+            select(ProcessingJob.id).where(
+                ProcessingJob.entry_date == entry_date,
+                ProcessingJob.status.in_(("queued", "running"))
+            )
+        ).first() is not None
+
+
+def _claim_next() -> Optional[ProcessingJob]:
+    """
+    Marks the next due job as running under this process's lease.
+    Choosing and claiming is one UPDATE, so no other worker (in this or
+    another process) can take the same job or start the same date.
+    """
+    now = datetime.now()
+    candidate = aliased(ProcessingJob)
+    running = aliased(ProcessingJob)
+    next_id = (
+        select(candidate.id)
+        .where(
+            candidate.status == "queued",
+            candidate.run_after <= now,
+            ~exists().where(running.entry_date == candidate.entry_date, running.status == "running")
+        )
+        .order_by(candidate.run_after)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    with _lock, Session(engine) as session:
+        job_id = session.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.id == next_id, ProcessingJob.status == "queued")
+            .values(
+                status="running",
+                attempts=ProcessingJob.attempts + 1,
+                owner=OWNER,
+                lease_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                started_at=now,
+                updated_at=now
+            )
+            .returning(ProcessingJob.id)
+        ).scalar()
+        session.commit()
+        if job_id is None:
+            return None
+        job = session.get(ProcessingJob, job_id)
+        session.expunge(job)
+        return job
+
+
+def _finish(job_id: int, error: Optional[str] = None) -> None:
+    """Marks a job done, or schedules its retry / marks it failed."""
+    now = datetime.now()
+    with _lock, Session(engine) as session:
+        job = session.get(ProcessingJob, job_id)
+        if job.status != "running" or job.owner != OWNER:
+            # The lease expired (e.g. the machine slept) and the job was requeued
+            logger.warning(f"Job {job.id} ({job.entry_date}) is no longer owned by this process, result dropped")
+            return
+        job.updated_at = now
+        job.error = error
+        job.lease_until = None
+
+        if error is None:
+            job.status = "done"
+            job.finished_at = now
+        else:
+            newer = session.exec(
+                select(ProcessingJob).where(
+                    ProcessingJob.entry_date == job.entry_date,
+                    ProcessingJob.status == "queued"
+                )
+            ).first()
+            if newer is not None:
+                # A later save already queued a run with newer text
+                job.status = "superseded"
+                job.finished_at = now
+            elif job.attempts < JOB_MAX_ATTEMPTS:
+                delay = JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+                job.status = "queued"
+                job.run_after = now + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+                metrics.increment("journal.jobs.retried")
+                logger.warning(f"Job {job.id} ({job.entry_date}) failed, retry in ~{delay:.0f}s: {error}")
+            else:
+                job.status = "failed"
+                job.finished_at = now
+                metrics.increment("journal.jobs.failed")
+                logger.error(f"Job {job.id} ({job.entry_date}) failed after {job.attempts} attempts: {error}")
+
+        session.add(job)
+        session.commit()
+
+
+def _run(job: ProcessingJob) -> None:
+    with Session(engine) as session:
+        entry = session.exec(
+            select(JournalEntry).where(JournalEntry.date == job.entry_date)
+        ).first()
+
+    if entry is None:
+        _finish(job.id, error="Entry not found")
+        return
+
+    start = time.perf_counter()
+    try:
+        process_diary_entry(entry.raw_text, job.entry_date.isoformat())
+    except Exception as e:
+        _finish(job.id, error=str(e) or type(e).__name__)
+    else:
+        _finish(job.id)
+    finally:
+        metrics.observe("journal.jobs.duration", time.perf_counter() - start)
+
+
+# ============================================================
+# WORKERS
+# ============================================================
+
+def _worker_loop() -> None:
+    while not _stop.is_set():
+        try:
+            job = _claim_next()
+        except Exception as e:
+            logger.error(f"Error reading the job queue: {e}", exc_info=True)
+            job = None
+
+        if job is None:
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+
+        logger.info(f"Job {job.id}: processing {job.entry_date} (attempt {job.attempts})")
+        _run(job)
+
+
+def _requeue_expired() -> None:
+    """
+    Jobs whose owner stopped renewing the lease (the process died) are
+    queued again. Jobs without a lease come from before leases existed.
+    """
+    now = datetime.now()
+    with _lock, Session(engine) as session:
+        requeued = session.execute(
+            update(ProcessingJob)
+            .where(
+                ProcessingJob.status == "running",
+                or_(ProcessingJob.lease_until.is_(None), ProcessingJob.lease_until < now)
+            )
+            .values(
+                status="queued",
+                attempts=func.max(ProcessingJob.attempts - 1, 0),
+                owner=None,
+                lease_until=None,
+                updated_at=now
+            )
+        ).rowcount
+        session.commit()
+    if requeued:
+        logger.info(f"Requeued {requeued} interrupted jobs")
+        _wakeup.set()
+
+
+def _renew_leases() -> None:
+    """Extends the lease of every job this process is running."""
+    now = datetime.now()
+    with Session(engine) as session:
+        session.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.owner == OWNER, ProcessingJob.status == "running")
+            .values(lease_until=now + timedelta(seconds=JOB_LEASE_SECONDS))
+        )
+        session.commit()
+
+
+def _lease_loop() -> None:
+    while not _stop.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            _renew_leases()
+            _requeue_expired()
+        except Exception as e:
+            logger.error(f"Error renewing job leases: {e}", exc_info=True)
+
+
+def _release_own() -> None:
+    """Queues again the jobs this process is still running (on shutdown)."""
+    now = datetime.now()
+    with _lock, Session(engine) as session:
+        session.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.owner == OWNER, ProcessingJob.status == "running")
+            .values(
+                status="queued",
+                attempts=func.max(ProcessingJob.attempts - 1, 0),
+                owner=None,
+                lease_until=None,
+                updated_at=now
+            )
+        )
+        session.commit()
+
+
+def start_workers(count: int = JOB_WORKERS) -> None:
+    """Starts the worker threads (call once, after init_db)."""
+    global _lease_thread
+    if _workers:
+        return
+    _requeue_expired()
+    _stop.clear()
+    for i in range(max(1, count)):
+        thread = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+        thread.start()
+        _workers.append(thread)
+    _lease_thread = threading.Thread(target=_lease_loop, name="job-leases", daemon=True)
+    _lease_thread.start()
+    logger.info(f"Started {len(_workers)} job workers ({OWNER})")
+
+
+def stop_workers(timeout: float = 5.0) -> None:
+    """
+    Asks the workers to stop and waits briefly. Jobs still running are
+    queued again right away (their result, if they finish, is dropped).
+    """
+    global _lease_thread
+    _stop.set()
+    _wakeup.set()
+    for thread in _workers:
+        thread.join(timeout)
+    _workers.clear()
+    if _lease_thread is not None:
+        _lease_thread.join(timeout)
+        _lease_thread = None
+    _release_own()
+
+
+# ============================================================
+# STATUS
+# ============================================================
+
+def list_jobs(
+    status: Optional[str] = None,
+    date_str: Optional[str] = None,
+    limit: int = 50
+) -> Dict[str, Any]:
+    """Recent jobs (newest first) plus a count per status."""
+    with Session(engine) as session:
+        query = select(ProcessingJob)
+        if status:
+            query = query.where(ProcessingJob.status == status)
+        if date_str:
+            entry_date: dt_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            query = query.where(ProcessingJob.entry_date == entry_date)
+        jobs = session.exec(query.order_by(ProcessingJob.id.desc()).limit(limit)).all()
+
+        counts = dict(session.exec(
+            select(ProcessingJob.status, func.count()).group_by(ProcessingJob.status)
+        ).all())
+
+        return {
+            "counts": counts,
+            "workers": len(_workers),
+            "jobs": [_job_dict(job) for job in jobs],
+        }
+
+
+def get_job(job_id: int) -> Optional[Dict[str, Any]]:
+    with Session(engine) as session:
+        job = session.get(ProcessingJob, job_id)
+        return _job_dict(job) if job else None
@@ -0,0 +1 @@
+"""Benchmarks de rendimiento (corren sin red: ver replay_server y fakes)."""
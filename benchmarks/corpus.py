@@ -0,0 +1,583 @@
+"""
+Corpus sintético de entradas de diario en español.
+
+Genera un diario completo y determinista (misma semilla → mismos datos)
+para probar la app a 10-100x el tamaño real sin llamar al LLM ni al
+modelo de embeddings:
+
+- Entradas con largo de cola larga (lognormal), párrafos, personas
+  recurrentes y emociones con estacionalidad (varían según el mes y el
+  día de la semana), con días sin escribir.
+- El análisis de cada entrada (resumen, emociones, temas, personas e
+  intensidad) sale de las oraciones elegidas, así que es coherente con
+  el texto, y los chunks son grupos de párrafos con offsets.
+- Embeddings precalculados: vectores normalizados alrededor de un
+  centroide por tema y por emoción, así las búsquedas devuelven vecinos
+  con sentido.
+
+Escribe un directorio de datos con la misma estructura que data/ (los
+.md, diario.db con JournalEntry / EntryAnalysis / EntryChunk, el log de
+análisis, el almacén de chunks, el índice FAISS y su metadata), listo
+para usar con NEXUS_DATA_DIR. 100k entradas tardan alrededor de un minuto.
+
+Uso:
+    python -m benchmarks.corpus DIRECTORIO_DATOS --entradas 100000 [--seed 0] [--desde 2020-01-01]
+    python -m benchmarks.corpus DIRECTORIO_DATOS --anios 3 [--solo-md] [--sin-embeddings]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Primera fecha del corpus si no se indica otra: fija, para que la misma
+# semilla dé los mismos datos cualquier día que se genere
+DESDE_POR_DEFECTO = date(2020, 1, 1)
+
+
+# ============================================================
+# VOCABULARIO
+# ============================================================
+
+APERTURAS = [
+    "Hoy me desperté", "Esta mañana salí", "Pasé la tarde", "Al volver a casa",
+    "Durante el almuerzo", "Antes de dormir", "En el trabajo", "Después de la reunión",
+    "A media mañana", "Por la noche", "Camino al centro", "Apenas llegué",
+]
+
+# (fragmento, tema)
+HECHOS = [
+    ("temprano y preparé café mientras revisaba los pendientes de la semana", "trabajo"),
+    ("terminando el informe que tenía que entregar antes del viernes", "trabajo"),
+    ("en una reunión larga donde se discutió el presupuesto del proyecto", "trabajo"),
+    ("respondiendo correos atrasados y ordenando la agenda del mes", "trabajo"),
+    ("hablando con mi hermana sobre los planes para las vacaciones", "familia"),
+    ("almorzando con mis padres, que estaban de buen humor", "familia"),
+    ("ayudando a mi sobrino con la tarea de matemáticas", "familia"),
+    ("a caminar por el parque y me crucé con varios vecinos del barrio", "descanso"),
+    ("leyendo un libro que me recomendó un amigo hace tiempo", "descanso"),
+    ("viendo una película vieja que siempre me hace reír", "descanso"),
+    ("en el turno con la médica para revisar los análisis", "salud"),
+    ("corriendo cinco kilómetros aunque me dolían las piernas", "salud"),
+    ("cocinando algo nuevo que vi en una receta y salió mejor de lo esperado", "salud"),
+    ("estudiando para el examen del curso de inglés", "estudio"),
+    ("repasando los apuntes de la clase de la semana pasada", "estudio"),
+    ("tomando un café largo con amigos de la facultad", "amistad"),
+    ("escribiéndole a un amigo que hace meses no veía", "amistad"),
+    ("revisando los gastos del mes y haciendo cuentas", "dinero"),
+    ("pagando cuentas atrasadas y armando un presupuesto", "dinero"),
+    ("avanzando con el proyecto personal que tengo pendiente", "proyectos"),
+    ("ordenando papeles que venía postergando desde hacía un mes", "proyectos"),
+]
+
+# (frase, emoción)
+EMOCIONES = [
+    ("Me sentí tranquilo y con la cabeza despejada", "calma"),
+    ("Fue un día sereno, sin apuros", "calma"),
+    ("Sentí algo de ansiedad que no supe explicar del todo", "ansiedad"),
+    ("Tenía el pecho apretado y no podía dejar de pensar en lo pendiente", "ansiedad"),
+    ("Estaba frustrado porque las cosas no salieron como quería", "frustración"),
+    ("Me molestó perder tanto tiempo en algo que no avanzaba", "frustración"),
+    ("Me invadió una alegría simple, sin motivo especial", "alegría"),
+    ("Me reí mucho y volví a casa contento", "alegría"),
+    ("Tuve miedo de no estar a la altura de lo que se espera de mí", "miedo"),
+    ("Me asustó pensar en lo que puede pasar si esto sale mal", "miedo"),
+    ("Quedé confundido sobre qué decisión tomar", "confusión"),
+    ("No termino de entender qué quiero en realidad", "confusión"),
+    ("Sentí tristeza al recordar a alguien que ya no está", "tristeza"),
+    ("Me sentí solo aunque había gente alrededor", "tristeza"),
+    ("Me enojé más de lo que la situación merecía", "enojo"),
+    ("Terminé discutiendo y me quedé con bronca", "enojo"),
+]
+
+REFLEXIONES = [
+    "Creo que necesito darme más tiempo para descansar sin culpa",
+    "Me pregunto si estoy priorizando lo que realmente me importa",
+    "Quizás el problema no es la falta de tiempo sino cómo lo uso",
+    "Noto que cuando duermo bien todo se ve distinto",
+    "Me doy cuenta de que pedir ayuda no es un signo de debilidad",
+    "Tal vez debería escribir más seguido para ordenar las ideas",
+    "Cada vez que comparo mi camino con el de otros termino peor",
+    "Aprendí que los cambios chicos sostenidos valen más que los grandes planes",
+]
+
+PERSONAS = [
+    "Ana", "Lucía", "Martín", "Sofía", "Diego", "Valentina", "Tomás", "Carla",
+    "Julián", "Camila", "Mateo", "Florencia", "Nicolás", "Paula", "Andrés", "Elena",
+]
+
+TEMAS = sorted({tema for _, tema in HECHOS})
+NOMBRES_EMOCIONES = sorted({emocion for _, emocion in EMOCIONES})
+TIPOS_CHUNK = ["hechos", "emociones", "reflexion", "mixto"]
+
+# Mes (1-12) en el que cada emoción es más frecuente: estacionalidad
+PICO_EMOCION = {
+    "alegría": 12, "calma": 1, "ansiedad": 11, "frustración": 6,
+    "miedo": 3, "confusión": 8, "tristeza": 7, "enojo": 5,
+}
+
+# Chunking: párrafos agrupados hasta este largo (como el heurístico)
+MAX_PALABRAS_CHUNK = 120
+
+
+# ============================================================
+# GENERACIÓN
+# ============================================================
+
+@dataclass
+class EntradaSintetica:
+    fecha: date
+    texto: str
+    analisis: Dict[str, Any]
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    # Tema y emoción dominantes (para los embeddings)
+    tema: str = ""
+    emocion: str = ""
+
+    @property
+    def entry_id(self) -> str:
+        return f"entry_{self.fecha:%Y_%m_%d}"
+
+
+class _Entrada:
+    """Acumula texto y etiquetas mientras se genera una entrada."""
+
+    def __init__(self):
+        self.parrafos: List[str] = []
+        self.emociones: Dict[str, int] = {}
+        self.temas: Dict[str, int] = {}
+        self.personas: List[str] = []
+
+
+def _pesos_emociones(fecha: date) -> List[float]:
+    pesos = []
+    for emocion in NOMBRES_EMOCIONES:
+        distancia = 2 * math.pi * (fecha.month - PICO_EMOCION[emocion]) / 12
+        peso = 1 + 0.6 * math.cos(distancia)
+        if fecha.weekday() >= 5 and emocion in ("calma", "alegría"):
+            peso *= 1.5
+        pesos.append(peso)
+    return pesos
+
+
+def _oracion(azar: random.Random, entrada: _Entrada, pesos_emociones: List[float], cercanos: List[str]) -> str:
+    tipo = azar.random()
+    if tipo < 0.45:
+        fragmento, tema = azar.choice(HECHOS)
+        entrada.temas[tema] = entrada.temas.get(tema, 0) + 1
+        oracion = f"{azar.choice(APERTURAS)} {fragmento}"
+        if azar.random() < 0.3:
+            # Personas recurrentes: la mayoría de las menciones son del círculo cercano
+            persona = azar.choice(cercanos) if azar.random() < 0.8 else azar.choice(PERSONAS)
+            if persona not in entrada.personas:
+                entrada.personas.append(persona)
+            oracion += f" junto a {persona}"
+    elif tipo < 0.75:
+        emocion = azar.choices(NOMBRES_EMOCIONES, weights=pesos_emociones)[0]
+        frase = azar.choice([f for f, e in EMOCIONES if e == emocion])
+        entrada.emociones[emocion] = entrada.emociones.get(emocion, 0) + 1
+        oracion = frase
+    else:
+        oracion = azar.choice(REFLEXIONES)
+    return oracion + "."
+
+
+def generar_texto(azar: random.Random, palabras_objetivo: int) -> str:
+    """Párrafos de 2 a 6 oraciones hasta llegar a ~`palabras_objetivo` palabras."""
+    return _generar(azar, palabras_objetivo, date(2020, 1, 1), PERSONAS[:4])[0]
+
+
+def _generar(
+    azar: random.Random,
+    palabras_objetivo: int,
+    fecha: date,
+    cercanos: List[str]
+) -> Tuple[str, _Entrada]:
+    entrada = _Entrada()
+    pesos = _pesos_emociones(fecha)
+    palabras = 0
+    while palabras < palabras_objetivo:
+        parrafo = " ".join(_oracion(azar, entrada, pesos, cercanos) for _ in range(azar.randint(2, 6)))
+        entrada.parrafos.append(parrafo)
+        palabras += len(parrafo.split())
+    return "\n\n".join(entrada.parrafos) + "\n", entrada
+
+
+def largo_de_entrada(azar: random.Random, mediana: int = 250) -> int:
+    """Largos con cola larga (lognormal): la mayoría cortas, algunas muy largas."""
+    return max(30, min(4000, int(azar.lognormvariate(0, 0.6) * mediana)))
+
+
+def _chunks(texto: str, entry_id: str, fecha: date, entrada: _Entrada, azar: random.Random) -> List[Dict[str, Any]]:
+    """Párrafos agrupados hasta MAX_PALABRAS_CHUNK, con offsets sobre `texto`."""
+    from backend.app.modules.journal.core.chunk_store import hash_texto
+
+    rangos = []
+    inicio = 0
+    cursor = 0
+    palabras = 0
+    for parrafo in entrada.parrafos:
+        pos = texto.index(parrafo, cursor)
+        fin = pos + len(parrafo)
+        n = len(parrafo.split())
+        if palabras and palabras + n > MAX_PALABRAS_CHUNK:
+            rangos.append((inicio, cursor))
+            inicio, palabras = pos, 0
+        palabras += n
+        cursor = fin
+    rangos.append((inicio, cursor))
+
+    hash_fuente = hash_texto(texto)
+    chunks = []
+    for i, (a, b) in enumerate(rangos):
+        fragmento = texto[a:b].strip()
+        chunks.append({
+            "chunk_id": f"{entry_id}_chunk_{i}",
+            "entry_id": entry_id,
+            "index": i,
+            "text": fragmento,
+            "start_offset": a,
+            "end_offset": b,
+            "source_hash": hash_fuente,
+            "word_count": len(fragmento.split()),
+            "char_count": len(fragmento),
+            "type": azar.choice(TIPOS_CHUNK),
+            "metadata": {
+                "people": [p for p in entrada.personas if p in fragmento],
+                "date": f"{fecha:%d-%m-%Y}",
+                "source": "synthetic",
+            },
+        })
+    return chunks
+
+
+def generar_entradas(
+    entradas: Optional[int] = None,
+    anios: Optional[float] = None,
+    seed: int = 0,
+    desde: Optional[date] = None,
+    prob_escribir: float = 0.8,
+    con_chunks: bool = True
+) -> Iterator[EntradaSintetica]:
+    """
+    Genera las entradas en orden de fecha.
+
+    Args:
+        entradas: Cantidad exacta de entradas (una por día desde `desde`)
+        anios: En lugar de `entradas`: años de diario, escribiendo cada
+            día con probabilidad `prob_escribir`
+        desde: Primera fecha (por defecto DESDE_POR_DEFECTO: los pesos de
+            las emociones dependen del mes, así que la fecha cambia el texto)
+    """
+    if entradas is None and anios is None:
+        raise ValueError("Indicar entradas o anios")
+    azar = random.Random(seed)
+    dias = entradas if entradas is not None else int(anios * 365.25)
+    if desde is None:
+        desde = DESDE_POR_DEFECTO
+    cercanos = azar.sample(PERSONAS, 5)
+
+    for dia in range(dias):
+        fecha = desde + timedelta(days=dia)
+        if entradas is None and azar.random() > prob_escribir:
+            continue
+        # El círculo cercano cambia lentamente con los años
+        if azar.random() < 0.002:
+            cercanos[azar.randrange(len(cercanos))] = azar.choice(PERSONAS)
+
+        texto, entrada = _generar(azar, largo_de_entrada(azar), fecha, cercanos)
+        emociones = sorted(entrada.emociones, key=lambda e: -entrada.emociones[e])
+        temas = sorted(entrada.temas, key=lambda t: -entrada.temas[t])
+        menciones = sum(entrada.emociones.values())
+        entry_id = f"entry_{fecha:%Y_%m_%d}"
+        analisis = {
+            "summary": " ".join(entrada.parrafos[0].split(". ")[:2])[:240],
+            "emotions": emociones[:4],
+            "topics": temas[:4],
+            "people": entrada.personas or None,
+            "intensity": "alta" if menciones >= 6 else "media" if menciones >= 3 else "baja",
+            "fecha": f"{fecha:%d-%m-%Y}",
+            "id": entry_id,
+            "raw_text": texto,
+            "word_count": len(texto.split()),
+            "char_count": len(texto),
+        }
+        chunks = _chunks(texto, entry_id, fecha, entrada, azar) if con_chunks else []
+        analisis["chunk_count"] = len(chunks)
+        yield EntradaSintetica(
+            fecha=fecha,
+            texto=texto,
+            analisis=analisis,
+            chunks=chunks,
+            tema=temas[0] if temas else TEMAS[0],
+            emocion=emociones[0] if emociones else "calma",
+        )
+
+
+# ============================================================
+# EMBEDDINGS PRECALCULADOS
+# ============================================================
+
+def vectores_sinteticos(
+    claves: List[Tuple[str, str]],
+    dimension: int = 384,
+    seed: int = 0,
+    ruido: float = 0.5
+):
+    """
+    Un vector normalizado (float32) por (tema, emoción): centroide del
+    tema + 0.6 × centroide de la emoción + ruido gaussiano.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centroides_tema = {t: rng.standard_normal(dimension) for t in TEMAS}
+    centroides_emocion = {e: rng.standard_normal(dimension) for e in NOMBRES_EMOCIONES}
+
+    base = np.stack([centroides_tema[t] + 0.6 * centroides_emocion[e] for t, e in claves]) if claves else np.zeros((0, dimension))
+    vectores = (base + ruido * rng.standard_normal(base.shape)).astype("float32")
+    normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+    return vectores / np.where(normas == 0, 1.0, normas)
+
+
+# ============================================================
+# ESCRITURA
+# ============================================================
+
+def escribir_corpus(
+    directorio: Path,
+    entradas: int,
+    seed: int = 0,
+    desde: date = DESDE_POR_DEFECTO
+) -> List[Path]:
+    """
+    Escribe solo los archivos yyyy-mm-dd.md (el analizador hace el resto).
+
+    Returns:
+        Rutas de los archivos escritos
+    """
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for entrada in generar_entradas(entradas, seed=seed, desde=desde, con_chunks=False):
+        ruta = directorio / f"{entrada.fecha.isoformat()}.md"
+        ruta.write_text(entrada.texto, encoding="utf-8")
+        rutas.append(ruta)
+    return rutas
+
+
+def _en_lotes(iterable: Iterable[Any], tamano: int) -> Iterator[List[Any]]:
+    lote = []
+    for elemento in iterable:
+        lote.append(elemento)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class EscritorDatos:
+    """
+    Escribe lotes de entradas en el directorio de datos de la app. Debe
+    crearse con NEXUS_DATA_DIR ya apuntando a ese directorio (las rutas
+    salen de backend.app.config al importarlo).
+    """
+
+    def __init__(self, md: bool = True, db: bool = True, embeddings: bool = True, dimension: int = 384, seed: int = 0):
+        from backend.app import config
+        from backend.app.core.database import engine, init_db
+        from backend.app.modules.journal import models  # noqa: F401 (registra las tablas)
+        from backend.app.modules.journal.core.chunk_store import ChunkStore
+
+        self.config = config
+        self.md = md
+        self.db = db
+        self.embeddings = embeddings
+        self.dimension = dimension
+        self.seed = seed
+
+        for directorio in (config.DATA_DIR, config.RAW_DIR, config.DIARY_ENTRIES_DIR, config.PROCESSED_DIR):
+            directorio.mkdir(parents=True, exist_ok=True)
+        self.engine = engine
+        init_db()
+        self.store = ChunkStore(config.CHUNKS_FILE.with_suffix(".db"))
+        self.ruta_log = config.RAW_DIARY_JSON.with_suffix(".jsonl")
+
+        self._siguiente_id = self._max_id() + 1
+        self._metadata: List[Dict[str, Any]] = []
+        self._indice = None
+        self._lotes = 0
+
+    def _max_id(self) -> int:
+        from sqlalchemy import func, select
+        from backend.app.modules.journal.models import JournalEntry
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(JournalEntry.id))).scalar() or 0
+
+    def escribir(self, lote: List[EntradaSintetica]) -> None:
+        if self.md:
+            for entrada in lote:
+                (self.config.DIARY_ENTRIES_DIR / f"{entrada.fecha.isoformat()}.md").write_text(entrada.texto, encoding="utf-8")
+
+        with open(self.ruta_log, "a", encoding="utf-8") as f:
+            for entrada in lote:
+                f.write(json.dumps(entrada.analisis, ensure_ascii=False) + "\n")
+
+        if self.db:
+            self._escribir_db(lote)
+
+        chunks = [c for entrada in lote for c in entrada.chunks]
+        self.store.reemplazar_entradas({entrada.entry_id: entrada.chunks for entrada in lote})
+        if self.embeddings and chunks:
+            self._indexar(lote, chunks)
+        self._lotes += 1
+
+    def _escribir_db(self, lote: List[EntradaSintetica]) -> None:
+        # Core + executemany: sin objetos ORM ni flush por fila
+        from backend.app.modules.journal.models import EntryAnalysis, EntryChunk, JournalEntry
+        from backend.app.modules.journal.core.chunk_store import sin_texto
+
+        ids = {}
+        filas_entradas = []
+        for entrada in lote:
+            ids[entrada.fecha] = self._siguiente_id
+            self._siguiente_id += 1
+            filas_entradas.append({
+                "id": ids[entrada.fecha], "date": entrada.fecha, "raw_text": entrada.texto,
+                "word_count": entrada.analisis["word_count"], "char_count": entrada.analisis["char_count"],
+            })
+        filas_analisis = [
+            {
+                "entry_id": ids[e.fecha], "summary": e.analisis["summary"], "intensity": e.analisis["intensity"],
+                "emotions": e.analisis["emotions"], "topics": e.analisis["topics"], "people": e.analisis["people"],
+            }
+            for e in lote
+        ]
+        filas_chunks = [
+            {
+                "entry_id": ids[e.fecha], "index": c["index"], "chunk_type": c["type"],
+                "text": sin_texto(c).get("text", ""), "start_offset": c["start_offset"], "end_offset": c["end_offset"],
+                "word_count": c["word_count"], "char_count": c["char_count"], "metadata_json": c["metadata"],
+            }
+            for e in lote for c in e.chunks
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(JournalEntry.__table__.insert(), filas_entradas)
+            conn.execute(EntryAnalysis.__table__.insert(), filas_analisis)
+            if filas_chunks:
+                conn.execute(EntryChunk.__table__.insert(), filas_chunks)
+
+    def _indexar(self, lote: List[EntradaSintetica], chunks: List[Dict[str, Any]]) -> None:
+        import faiss
+        import numpy as np
+        from backend.app.modules.journal.core.chunk_store import sin_texto
+
+        guardados = {c["chunk_id"]: c for e in lote for c in self.store.de_entrada(e.entry_id)}
+        claves = [(e.tema, e.emocion) for e in lote for _ in e.chunks]
+        vectores = vectores_sinteticos(claves, self.dimension, self.seed + self._lotes)
+        ids = np.asarray([guardados[c["chunk_id"]]["vector_id"] for c in chunks], dtype="int64")
+
+        if self._indice is None:
+            self._indice = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        self._indice.add_with_ids(vectores, ids)
+
+        for chunk, vector_id in zip(chunks, ids):
+            self._metadata.append({**sin_texto(chunk), "vector_id": int(vector_id)})
+        self.store.confirmar_indexado(
+            [{**c, "vector_id": int(i)} for c, i in zip(chunks, ids)], []
+        )
+
+    def cerrar(self) -> None:
+        """
+        Recalcula los agregados de emociones y las etiquetas (las
+        inserciones masivas no pasan por db_sync) y escribe el índice FAISS
+        y la metadata (como DiarioVectorIndexer.guardar).
+        """
+        if self.db:
+            from backend.app.modules.journal.core.emotion_stats import reconstruir_conteos
+            from backend.app.modules.journal.core.entry_tags import reconstruir_tags
+            reconstruir_conteos()
+            reconstruir_tags()
+        if self._indice is None:
+            return
+        import faiss
+        faiss.write_index(self._indice, str(self.config.FAISS_INDEX_FILE))
+        with open(self.config.METADATA_FILE, "w", encoding="utf-8") as f:
+            json.dump(self._metadata, f, ensure_ascii=False)
+
+
+def poblar_directorio_datos(
+    directorio: Path,
+    entradas: Optional[int] = None,
+    anios: Optional[float] = None,
+    seed: int = 0,
+    desde: Optional[date] = None,
+    md: bool = True,
+    db: bool = True,
+    embeddings: bool = True,
+    dimension: int = 384,
+    tamano_lote: int = 2000
+) -> int:
+    """
+    Genera el corpus en `directorio` con la estructura de data/.
+    Fija NEXUS_DATA_DIR: llamarla antes de importar módulos de backend
+    (o en un proceso aparte).
+
+    Returns:
+        Cantidad de entradas escritas
+    """
+    os.environ["NEXUS_DATA_DIR"] = str(Path(directorio).resolve())
+    escritor = EscritorDatos(md=md, db=db, embeddings=embeddings, dimension=dimension, seed=seed)
+    total = 0
+    for lote in _en_lotes(generar_entradas(entradas, anios, seed, desde), tamano_lote):
+        escritor.escribir(lote)
+        total += len(lote)
+    escritor.cerrar()
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic Spanish diary corpus")
+    parser.add_argument("directorio", type=Path, help="Directorio de datos (se usa como NEXUS_DATA_DIR)")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--entradas", type=int, help="Cantidad de entradas (una por día)")
+    grupo.add_argument("--anios", type=float, help="Años de diario (con días sin escribir)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--desde", type=date.fromisoformat, default=DESDE_POR_DEFECTO,
+        help=f"Primera fecha, YYYY-MM-DD (por defecto {DESDE_POR_DEFECTO})"
+    )
+    parser.add_argument("--solo-md", action="store_true", help="Solo los .md (para probar el analizador)")
+    parser.add_argument("--sin-md", action="store_true", help="No escribir los .md")
+    parser.add_argument("--sin-embeddings", action="store_true")
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.solo_md:
+        entradas_md = generar_entradas(args.entradas, args.anios, args.seed, args.desde, con_chunks=False)
+        carpeta = args.directorio / "diary" / "entries"
+        carpeta.mkdir(parents=True, exist_ok=True)
+        total = 0
+        for entrada in entradas_md:
+            (carpeta / f"{entrada.fecha.isoformat()}.md").write_text(entrada.texto, encoding="utf-8")
+            total += 1
+    else:
+        total = poblar_directorio_datos(
+            args.directorio,
+            args.entradas,
+            args.anios,
+            args.seed,
+            args.desde,
+            md=not args.sin_md,
+            embeddings=not args.sin_embeddings,
+            dimension=args.dimension
+        )
+    print(f"{total} entradas escritas en {args.directorio} en {time.perf_counter() - inicio:.1f}s")
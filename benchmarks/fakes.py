@@ -0,0 +1,53 @@
+"""
+Dobles deterministas para los benchmarks (sin red ni inferencia).
+
+EncoderHash reemplaza a SentenceTransformer: cada texto se convierte en un
+vector normalizado derivado de los hashes de sus palabras, así textos
+parecidos comparten componentes y las búsquedas devuelven algo razonable.
+El costo es lineal en el largo del texto, sin modelo que cargar.
+"""
+
+import hashlib
+from typing import List, Union
+
+import numpy as np
+
+DIMENSION_POR_DEFECTO = 384  # la de intfloat/multilingual-e5-small
+
+
+class EncoderHash:
+    """Misma interfaz que SentenceTransformer para encode() y la dimensión."""
+
+    def __init__(self, model_name: str = "hash", device: str = "cpu", dimension: int = DIMENSION_POR_DEFECTO):
+        self.model_name = model_name
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _vector(self, texto: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype="float32")
+        for palabra in texto.lower().split():
+            digest = hashlib.blake2b(palabra.encode("utf-8"), digest_size=8).digest()
+            valor = int.from_bytes(digest, "little")
+            vector[valor % self.dimension] += 1.0 if (valor >> 32) & 1 else -1.0
+        return vector
+
+    def encode(
+        self,
+        textos: Union[str, List[str]],
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+        batch_size: int = 32
+    ) -> np.ndarray:
+        unico = isinstance(textos, str)
+        lista = [textos] if unico else list(textos)
+        if lista:
+            matriz = np.stack([self._vector(t) for t in lista])
+        else:
+            matriz = np.zeros((0, self.dimension), dtype="float32")
+        if normalize_embeddings and len(matriz):
+            normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+            matriz = matriz / np.where(normas == 0, 1.0, normas)
+        return matriz[0] if unico else matriz
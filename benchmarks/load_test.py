@@ -0,0 +1,435 @@
+"""
+Prueba de carga HTTP de la API con un LLM local de reemplazo.
+
+Genera un corpus sintético (benchmarks/corpus.py), levanta el servidor de
+replay como proveedor del LLM y la app (backend.app.main) con uvicorn en
+un proceso aparte, con el encoder por hash en lugar del modelo. Después
+simula usuarios concurrentes (cada uno encadena pedidos sin pausa, o con
+--pausa-ms) en tres fases:
+
+- mixto: chat, guardado, estadísticas, listado y lectura según --mezcla.
+- chat_base: solo chat, con la cola de procesamiento vacía.
+- chat_reindex: solo chat mientras la cola procesa una ráfaga de
+  guardados (cada uno reanaliza la entrada y actualiza el índice FAISS
+  dentro del proceso de la API).
+
+Por fase y ruta informa pedidos/s, latencia p50/p95/p99/máx y tasa de
+error. En chat_reindex separa los chats que se solaparon con un job en
+curso (según started_at/finished_at de /api/journal/jobs) de los que no.
+El resultado se guarda en benchmarks/results/ junto con el snapshot de
+/api/metrics de la app.
+
+Uso:
+    python -m benchmarks.load_test [--entradas 5000] [--usuarios 8] [--duracion 30]
+        [--mezcla chat=2,save=1,stats=2,list=2,read=3] [--reindex-guardados 40]
+        [--latency-ms 800] [--ms-per-token 4]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+from benchmarks.pipeline_benchmark import (
+    DIRECTORIO_RESULTADOS,
+    RAIZ,
+    contadores_servidor,
+    git,
+    iniciar_servidor_replay,
+)
+
+PREGUNTAS = [
+    "¿Qué me estuvo generando ansiedad últimamente?",
+    "¿Cómo me sentí las últimas veces que vi a mi familia?",
+    "¿Qué patrones ves en mis días tranquilos?",
+    "¿Cuándo fue la última vez que me enojé y por qué?",
+    "¿Qué aprendí este año sobre descansar?",
+]
+
+MEZCLA_POR_DEFECTO = "chat=2,save=1,stats=2,list=2,read=3"
+TIMEOUT_PEDIDO = 300
+
+
+# ============================================================
+# PROCESO DE LA APP
+# ============================================================
+
+def main_servidor(args: argparse.Namespace) -> None:
+    """Corre la app con uvicorn (el entorno ya apunta al corpus y al LLM falso)."""
+    import uvicorn
+
+    if args.embedder == "hash":
+        # Antes de importar la app: el chat carga el modelo al importarse
+        from benchmarks.fakes import EncoderHash
+        from backend.app.modules.journal.core import embedding_generator, query_engine
+        embedding_generator.SentenceTransformer = EncoderHash
+        query_engine.SentenceTransformer = EncoderHash
+
+    from backend.app.main import app
+    uvicorn.run(app, host="127.0.0.1", port=args.puerto_app, log_level="warning")
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _iniciar_app(args: argparse.Namespace, datos: Path, puerto_llm: int) -> Tuple[subprocess.Popen, str]:
+    puerto = _puerto_libre()
+    entorno = {
+        **os.environ,
+        "NEXUS_DATA_DIR": str(datos),
+        "GROQ_API_URL": f"http://127.0.0.1:{puerto_llm}/openai/v1/chat/completions",
+        "GROQ_API_KEY": "benchmark",
+        "LLM_REQUESTS_PER_MINUTE": str(args.rpm),
+        "LLM_TOKENS_PER_MINUTE": str(args.tpm),
+        "LLM_CACHE_DISABLED": "1",
+        "JOB_WORKERS": str(args.job_workers),
+        # Los guardados se procesan en cuanto llegan (sin esperar ediciones seguidas)
+        "JOB_DEBOUNCE_SECONDS": "0",
+        "DIARY_WATCH_ENABLED": "0",
+    }
+    comando = [
+        sys.executable, "-m", "benchmarks.load_test",
+        "--servidor", "--puerto-app", str(puerto), "--embedder", args.embedder,
+    ]
+    proceso = subprocess.Popen(comando, cwd=RAIZ, env=entorno)
+    base = f"http://127.0.0.1:{puerto}"
+
+    limite = time.monotonic() + 180
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("La app terminó al arrancar")
+        try:
+            if requests.get(f"{base}/api/journal/jobs", params={"limit": 1}, timeout=2).ok:
+                return proceso, base
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proceso.kill()
+    raise RuntimeError("La app no respondió a tiempo")
+
+
+# ============================================================
+# USUARIOS SIMULADOS
+# ============================================================
+
+class Registro:
+    """Pedidos completados: (ruta, inicio, fin, status) con tiempos de time.time()."""
+
+    def __init__(self):
+        self.pedidos: List[Tuple[str, float, float, int]] = []
+        self._lock = threading.Lock()
+
+    def agregar(self, ruta: str, inicio: float, fin: float, status: int) -> None:
+        with self._lock:
+            self.pedidos.append((ruta, inicio, fin, status))
+
+
+# Operación de la mezcla → ruta con la que se informa
+RUTAS = {
+    "chat": "POST /api/journal/chat",
+    "save": "POST /api/journal/diary/save",
+    "stats": "GET /api/journal/stats",
+    "list": "GET /api/journal/diary/list",
+    "read": "GET /api/journal/diary/{date}",
+}
+
+
+class Usuario:
+    """Un cliente con su propia sesión HTTP; un método por operación de la mezcla."""
+
+    def __init__(self, base: str, fechas: List[str], azar: random.Random):
+        self.base = base
+        self.fechas = fechas
+        self.azar = azar
+        self.sesion = requests.Session()
+
+    def chat(self) -> requests.Response:
+        return self.sesion.post(
+            f"{self.base}/api/journal/chat",
+            json={"question": self.azar.choice(PREGUNTAS)},
+            timeout=TIMEOUT_PEDIDO
+        )
+
+    def save(self) -> requests.Response:
+        return guardar_edicion(self.sesion, self.base, self.azar.choice(self.fechas), self.azar)
+
+    def stats(self) -> requests.Response:
+        return self.sesion.get(f"{self.base}/api/journal/stats", timeout=TIMEOUT_PEDIDO)
+
+    def list(self) -> requests.Response:
+        return self.sesion.get(f"{self.base}/api/journal/diary/list", timeout=TIMEOUT_PEDIDO)
+
+    def read(self) -> requests.Response:
+        fecha = self.azar.choice(self.fechas)
+        return self.sesion.get(f"{self.base}/api/journal/diary/{fecha}", timeout=TIMEOUT_PEDIDO)
+
+
+def guardar_edicion(sesion: requests.Session, base: str, fecha: str, azar: random.Random) -> requests.Response:
+    """Edición típica desde la UI: la entrada con un párrafo más al final."""
+    from benchmarks.corpus import generar_texto
+
+    actual = sesion.get(f"{base}/api/journal/diary/{fecha}", timeout=TIMEOUT_PEDIDO).json()
+    texto = actual["text"].rstrip("\n") + "\n\n" + generar_texto(azar, 40)
+    return sesion.post(f"{base}/api/journal/diary/save", json={"text": texto, "date": fecha}, timeout=TIMEOUT_PEDIDO)
+
+
+def correr_fase(
+    base: str,
+    fechas: List[str],
+    mezcla: Dict[str, float],
+    usuarios: int,
+    duracion: float,
+    pausa_s: float,
+    seed: int
+) -> Tuple[Registro, float, float]:
+    """
+    Corre `usuarios` hilos durante `duracion` segundos.
+
+    Returns:
+        Tupla (registro de pedidos, inicio, fin)
+    """
+    registro = Registro()
+    limite = time.monotonic() + duracion
+    operaciones = list(mezcla)
+    pesos = [mezcla[o] for o in operaciones]
+
+    def bucle(numero: int) -> None:
+        azar = random.Random(seed * 1000 + numero)
+        usuario = Usuario(base, fechas, azar)
+        while time.monotonic() < limite:
+            operacion = azar.choices(operaciones, weights=pesos)[0]
+            inicio = time.time()
+            try:
+                status = getattr(usuario, operacion)().status_code
+            except requests.RequestException:
+                status = 0  # sin respuesta (conexión rechazada, timeout)
+            registro.agregar(RUTAS[operacion], inicio, time.time(), status)
+            if pausa_s:
+                time.sleep(pausa_s)
+
+    hilos = [threading.Thread(target=bucle, args=(i,), daemon=True) for i in range(usuarios)]
+    inicio = time.time()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return registro, inicio, time.time()
+
+
+def esperar_cola_vacia(base: str, limite_s: float = 600) -> None:
+    limite = time.monotonic() + limite_s
+    while time.monotonic() < limite:
+        conteos = requests.get(f"{base}/api/journal/jobs", params={"limit": 1}, timeout=30).json()["counts"]
+        if not conteos.get("queued") and not conteos.get("running"):
+            return
+        time.sleep(1)
+    print("⚠ La cola de procesamiento no se vació a tiempo", flush=True)
+
+
+def intervalos_de_jobs(base: str) -> List[Tuple[float, float]]:
+    """[inicio, fin] de los jobs ejecutados (la app usa hora local sin zona)."""
+    jobs = requests.get(f"{base}/api/journal/jobs", params={"limit": 500}, timeout=30).json()["jobs"]
+    intervalos = []
+    for job in jobs:
+        if job["started_at"]:
+            inicio = datetime.fromisoformat(job["started_at"]).timestamp()
+            fin = datetime.fromisoformat(job["finished_at"]).timestamp() if job["finished_at"] else time.time()
+            intervalos.append((inicio, fin))
+    return intervalos
+
+
+# ============================================================
+# REPORTE
+# ============================================================
+
+def resumir(pedidos: List[Tuple[str, float, float, int]], duracion_s: float) -> Dict[str, Any]:
+    from backend.app.modules.journal.core.run_report import percentil
+
+    por_ruta: Dict[str, List[Tuple[float, int]]] = {}
+    for ruta, inicio, fin, status in pedidos:
+        por_ruta.setdefault(ruta, []).append((fin - inicio, status))
+
+    resumen = {}
+    for ruta, muestras in sorted(por_ruta.items()):
+        latencias = [l for l, _ in muestras]
+        errores = sum(1 for _, s in muestras if not 200 <= s < 300)
+        resumen[ruta] = {
+            "requests": len(muestras),
+            "rps": round(len(muestras) / duracion_s, 2) if duracion_s else 0.0,
+            "error_rate": round(errores / len(muestras), 4),
+            "p50_ms": round(percentil(latencias, 50) * 1000, 1),
+            "p95_ms": round(percentil(latencias, 95) * 1000, 1),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 1),
+            "max_ms": round(max(latencias) * 1000, 1),
+        }
+    return resumen
+
+
+def _solapa(inicio: float, fin: float, intervalos: List[Tuple[float, float]]) -> bool:
+    return any(inicio < b and a < fin for a, b in intervalos)
+
+
+def _imprimir_fase(nombre: str, resumen: Dict[str, Any]) -> None:
+    print(f"\n{nombre}")
+    print(f"    {'ruta':<32}{'n':>6}{'req/s':>8}{'err':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'máx':>9}  (ms)")
+    for ruta, datos in resumen.items():
+        print(
+            f"    {ruta:<32}{datos['requests']:>6}{datos['rps']:>8}{datos['error_rate'] * 100:>6.1f}%"
+            f"{datos['p50_ms']:>9}{datos['p95_ms']:>9}{datos['p99_ms']:>9}{datos['max_ms']:>9}"
+        )
+
+
+# ============================================================
+# ORQUESTADOR
+# ============================================================
+
+def _parsear_mezcla(texto: str) -> Dict[str, float]:
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        if nombre.strip() not in RUTAS:
+            raise argparse.ArgumentTypeError(f"Operación desconocida en la mezcla: {nombre!r}")
+        mezcla[nombre.strip()] = float(peso or 1)
+    return mezcla
+
+
+def main(args: argparse.Namespace) -> None:
+    from benchmarks.corpus import poblar_directorio_datos
+
+    directorio = Path(tempfile.mkdtemp(prefix="nexus-load-"))
+    datos = directorio / "data"
+    print(f"→ Corpus sintético: {args.entradas} entradas...", flush=True)
+    poblar_directorio_datos(datos, entradas=args.entradas, seed=args.seed)
+
+    # Siempre con respuestas sintéticas: no hace falta grabar nada
+    args.cassette, args.record = directorio / "cassette.jsonl", False
+    replay, puerto_llm = iniciar_servidor_replay(args)
+    app = None
+    fases: Dict[str, Any] = {}
+    try:
+        app, base = _iniciar_app(args, datos, puerto_llm)
+        fechas = requests.get(f"{base}/api/journal/diary/list", timeout=60).json()
+
+        print(f"→ Fase mixto: {args.usuarios} usuarios, {args.duracion:.0f}s...", flush=True)
+        registro, inicio, fin = correr_fase(base, fechas, args.mezcla, args.usuarios, args.duracion, args.pausa_ms / 1000, args.seed)
+        fases["mixed"] = {"duration_s": round(fin - inicio, 1), "routes": resumir(registro.pedidos, fin - inicio)}
+        esperar_cola_vacia(base)
+
+        solo_chat = {"chat": 1.0}
+        print(f"→ Fase chat_base: {args.usuarios_chat} usuarios, {args.duracion:.0f}s...", flush=True)
+        registro, inicio, fin = correr_fase(base, fechas, solo_chat, args.usuarios_chat, args.duracion, args.pausa_ms / 1000, args.seed + 1)
+        fases["chat_base"] = {"duration_s": round(fin - inicio, 1), "routes": resumir(registro.pedidos, fin - inicio)}
+
+        print(f"→ Fase chat_reindex: {args.reindex_guardados} guardados + {args.usuarios_chat} usuarios de chat...", flush=True)
+        azar = random.Random(args.seed)
+        sesion = requests.Session()
+        for fecha in azar.sample(fechas, min(args.reindex_guardados, len(fechas))):
+            guardar_edicion(sesion, base, fecha, azar)
+        registro, inicio, fin = correr_fase(base, fechas, solo_chat, args.usuarios_chat, args.duracion, args.pausa_ms / 1000, args.seed + 2)
+        intervalos = intervalos_de_jobs(base)
+        durante = [p for p in registro.pedidos if _solapa(p[1], p[2], intervalos)]
+        fuera = [p for p in registro.pedidos if not _solapa(p[1], p[2], intervalos)]
+        # Tiempo con algún job en curso (los jobs corren en paralelo: se unen los intervalos)
+        ocupado, hasta = 0.0, inicio
+        for a, b in sorted(intervalos):
+            a, b = max(a, hasta), min(b, fin)
+            if b > a:
+                ocupado += b - a
+                hasta = b
+        fases["chat_reindex"] = {
+            "duration_s": round(fin - inicio, 1),
+            "routes": resumir(registro.pedidos, fin - inicio),
+            "during_reindex": resumir(durante, ocupado),
+            "outside_reindex": resumir(fuera, fin - inicio - ocupado),
+            "reindex_busy_s": round(ocupado, 1),
+        }
+        esperar_cola_vacia(base)
+
+        metricas_app = requests.get(f"{base}/api/metrics", timeout=30).json()
+        contadores_llm = contadores_servidor(puerto_llm)
+    finally:
+        if app is not None:
+            app.terminate()
+            app.wait(timeout=30)
+        replay.terminate()
+        replay.wait(timeout=10)
+        if not args.conservar:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    informe = {
+        "commit": commit,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "params": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items() if k not in ("servidor", "puerto_app")},
+        "phases": fases,
+        "app_metrics": metricas_app,
+        "llm_server": contadores_llm,
+    }
+    DIRECTORIO_RESULTADOS.mkdir(parents=True, exist_ok=True)
+    ruta = DIRECTORIO_RESULTADOS / f"load_{datetime.now():%Y%m%d_%H%M%S}_{commit}.json"
+    ruta.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print("=" * 60)
+    print(f"PRUEBA DE CARGA ({commit}{' + cambios' if informe['dirty'] else ''})")
+    print("=" * 60)
+    _imprimir_fase("mixto", fases["mixed"]["routes"])
+    _imprimir_fase("chat_base", fases["chat_base"]["routes"])
+    _imprimir_fase(f"chat_reindex (jobs en curso {fases['chat_reindex']['reindex_busy_s']}s)", fases["chat_reindex"]["routes"])
+    _imprimir_fase("    durante un job", fases["chat_reindex"]["during_reindex"])
+    _imprimir_fase("    sin jobs en curso", fases["chat_reindex"]["outside_reindex"])
+    print(f"\nResultado guardado en {ruta}")
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+def parser_argumentos() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="HTTP load test with a local LLM stand-in")
+    parser.add_argument("--entradas", type=int, default=5000, help="Tamaño del corpus sintético")
+    parser.add_argument("--usuarios", type=int, default=8, help="Usuarios concurrentes de la fase mixta")
+    parser.add_argument("--usuarios-chat", type=int, default=4, help="Usuarios concurrentes de las fases de chat")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos por fase")
+    parser.add_argument("--pausa-ms", type=float, default=0.0, help="Pausa de cada usuario entre pedidos")
+    parser.add_argument("--mezcla", type=_parsear_mezcla, default=_parsear_mezcla(MEZCLA_POR_DEFECTO),
+                        help=f"Pesos por operación (por defecto {MEZCLA_POR_DEFECTO})")
+    parser.add_argument("--reindex-guardados", type=int, default=40, help="Guardados que disparan la fase chat_reindex")
+    parser.add_argument("--job-workers", type=int, default=2, help="JOB_WORKERS de la app")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--ms-per-token", type=float, default=4.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rpm", type=int, default=100_000, help="LLM_REQUESTS_PER_MINUTE (alto = sin limitador)")
+    parser.add_argument("--tpm", type=int, default=100_000_000, help="LLM_TOKENS_PER_MINUTE")
+    parser.add_argument("--embedder", choices=["hash", "real"], default="hash")
+    parser.add_argument("--conservar", action="store_true", help="No borrar el directorio de datos temporal")
+    # Uso interno: proceso de la app
+    parser.add_argument("--servidor", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--puerto-app", type=int, help=argparse.SUPPRESS)
+    return parser
+
+
+if __name__ == "__main__":
+    argumentos = parser_argumentos().parse_args()
+    if argumentos.servidor:
+        main_servidor(argumentos)
+    else:
+        main(argumentos)
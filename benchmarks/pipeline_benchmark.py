@@ -0,0 +1,368 @@
+"""
+Benchmark de ingesta de punta a punta, sin llamar al proveedor real.
+
+Levanta el servidor de replay (benchmarks/replay_server.py) como
+proveedor del LLM, genera un corpus sintético en un directorio de datos
+temporal (NEXUS_DATA_DIR) y mide, cada escenario en su propio proceso:
+
+- batch: procesar_carpeta_diarios sobre todo el corpus (como el CLI).
+- entradas: process_diary_entry entrada por entrada (como la cola de la
+  API), primero las nuevas y luego editadas (camino incremental).
+
+Por escenario informa entradas/min, pico de RSS y los tiempos por etapa
+del reporte de la corrida (p50/p95), además de los contadores del
+servidor (aciertos del cassette, respuestas sintéticas, 429 inyectados).
+El resultado se guarda en benchmarks/results/ con el commit actual, para
+comparar entre commits con --comparar.
+
+Los embeddings usan por defecto un encoder por hash (benchmarks/fakes.py):
+mide el pipeline, no el modelo. Con --embedder real se carga el modelo.
+
+Uso:
+    python -m benchmarks.pipeline_benchmark [--escenario batch|entradas|todos] [--entradas 200]
+        [--workers 4] [--latency-ms 800] [--rate-429 0.02] [--cassette RUTA] [--record]
+    python -m benchmarks.pipeline_benchmark --comparar ANTERIOR.json NUEVO.json
+
+Para grabar respuestas reales una vez (necesita GROQ_API_KEY):
+    python -m benchmarks.pipeline_benchmark --record --entradas 50
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+RAIZ = Path(__file__).resolve().parents[1]
+DIRECTORIO_RESULTADOS = RAIZ / "benchmarks" / "results"
+CASSETTE_POR_DEFECTO = RAIZ / "benchmarks" / "cassettes" / "corpus.jsonl"
+MODELO = "qwen/qwen3-32b"
+ESCENARIOS = ("batch", "entradas")
+
+
+# ============================================================
+# PROCESO HIJO (un escenario)
+# ============================================================
+
+def _pico_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _preparar_hijo(embedder: str) -> None:
+    from backend.app.core.database import init_db
+    # Como en el startup de la app: los modelos se registran antes de crear las tablas
+    from backend.app.modules.journal import models  # noqa: F401
+    init_db()
+    if embedder == "hash":
+        from backend.app.modules.journal.core import embedding_generator
+        from benchmarks.fakes import EncoderHash
+        embedding_generator.SentenceTransformer = EncoderHash
+
+
+def escenario_batch(args: argparse.Namespace) -> Dict[str, Any]:
+    from backend.app.config import ANALYZER_WORKERS, CHUNKS_FILE, DIARY_ENTRIES_DIR, RAW_DIARY_JSON
+    from backend.app.modules.journal.core.diary_analyzer import procesar_carpeta_diarios
+    from backend.app.modules.journal.core.run_report import cargar_reportes
+
+    estadisticas = procesar_carpeta_diarios(
+        carpeta=DIARY_ENTRIES_DIR,
+        ruta_salida=RAW_DIARY_JSON,
+        ruta_chunks=CHUNKS_FILE,
+        modelo=MODELO,
+        workers=ANALYZER_WORKERS,
+        indexar=args.indexar
+    )
+    reportes = cargar_reportes(1)
+    return {"stats": estadisticas, "report": reportes[0] if reportes else None}
+
+
+def _procesar_entradas(textos: Dict[str, str], workers: int, reporte) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+    from backend.app.core import metrics
+    from backend.app.modules.journal.services.diary_service import process_diary_entry
+
+    def procesar(fecha: str) -> None:
+        traza = reporte.nueva_traza(fecha)
+        exitosa = True
+        with metrics.usar_traza(traza):
+            try:
+                with metrics.span("service.process_entry"):
+                    process_diary_entry(textos[fecha], fecha)
+            except Exception:
+                exitosa = False
+        reporte.cerrar_traza(traza, exitosa)
+
+    # Las fechas son distintas: como la cola de la API con JOB_WORKERS hilos
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(procesar, sorted(textos)))
+
+
+def escenario_entradas(args: argparse.Namespace) -> Dict[str, Any]:
+    from backend.app.config import DIARY_ENTRIES_DIR, JOB_WORKERS
+    from backend.app.modules.journal.core.run_report import ReporteCorrida
+    from backend.app.modules.journal.services.diary_service import save_entry
+    from benchmarks.corpus import generar_texto
+
+    textos = {}
+    for ruta in sorted(DIARY_ENTRIES_DIR.glob("*.md")):
+        fecha = ruta.stem
+        textos[fecha] = ruta.read_text(encoding="utf-8")
+        save_entry(textos[fecha], fecha)
+
+    fases = {}
+    nuevas = ReporteCorrida(workers=JOB_WORKERS, etapas_raiz=("service.process_entry",))
+    _procesar_entradas(textos, JOB_WORKERS, nuevas)
+    fases["new"] = nuevas.finalizar()
+
+    # Edición típica: un párrafo nuevo al final de cada entrada
+    azar = random.Random(args.seed)
+    editados = {fecha: texto + "\n" + generar_texto(azar, 40) for fecha, texto in textos.items()}
+    for fecha, texto in editados.items():
+        save_entry(texto, fecha)
+    editadas = ReporteCorrida(workers=JOB_WORKERS, etapas_raiz=("service.process_entry",))
+    _procesar_entradas(editados, JOB_WORKERS, editadas)
+    fases["edited"] = editadas.finalizar()
+
+    return {"phases": fases}
+
+
+def main_hijo(args: argparse.Namespace) -> None:
+    _preparar_hijo(args.embedder)
+    inicio = time.perf_counter()
+    resultado = (escenario_batch if args.hijo == "batch" else escenario_entradas)(args)
+    resultado["wall_s"] = round(time.perf_counter() - inicio, 3)
+    resultado["peak_rss_mb"] = _pico_rss_mb()
+    Path(args.resultado).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+# ============================================================
+# ORQUESTADOR
+# ============================================================
+
+def git(*argumentos: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *argumentos], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def iniciar_servidor_replay(args: argparse.Namespace) -> Tuple[subprocess.Popen, int]:
+    comando = [
+        sys.executable, "-m", "benchmarks.replay_server",
+        "--cassette", str(args.cassette),
+        "--mode", "record" if args.record else "replay",
+        "--port", "0",
+        "--latency-ms", str(args.latency_ms),
+        "--ms-per-token", str(args.ms_per_token),
+        "--jitter", str(args.jitter),
+        "--rate-429", str(args.rate_429),
+        "--retry-after", str(args.retry_after),
+        "--seed", str(args.seed),
+    ]
+    proceso = subprocess.Popen(comando, cwd=RAIZ, stdout=subprocess.PIPE, text=True)
+    linea = proceso.stdout.readline().strip()
+    if not linea.startswith("LISTENING"):
+        proceso.kill()
+        raise RuntimeError(f"El servidor de replay no arrancó: {linea!r}")
+    return proceso, int(linea.split()[1])
+
+
+def contadores_servidor(puerto: int) -> Dict[str, int]:
+    try:
+        return requests.get(f"http://127.0.0.1:{puerto}/stats", timeout=5).json()
+    except requests.RequestException:
+        return {}
+
+
+def _correr_escenario(
+    escenario: str,
+    args: argparse.Namespace,
+    puerto: int,
+    directorio: Path
+) -> Dict[str, Any]:
+    from benchmarks.corpus import escribir_corpus
+
+    datos = directorio / escenario / "data"
+    escribir_corpus(datos / "diary" / "entries", args.entradas, args.seed)
+
+    entorno = {
+        **os.environ,
+        "NEXUS_DATA_DIR": str(datos),
+        "GROQ_API_URL": f"http://127.0.0.1:{puerto}/openai/v1/chat/completions",
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "benchmark") if args.record else "benchmark",
+        "LLM_REQUESTS_PER_MINUTE": str(args.rpm),
+        "LLM_TOKENS_PER_MINUTE": str(args.tpm),
+        "LLM_CACHE_DISABLED": "1",
+        "ANALYZER_WORKERS": str(args.workers),
+        "JOB_WORKERS": str(args.job_workers),
+    }
+    salida = directorio / f"{escenario}.json"
+    antes = contadores_servidor(puerto)
+    comando = [
+        sys.executable, "-m", "benchmarks.pipeline_benchmark",
+        "--hijo", escenario,
+        "--resultado", str(salida),
+        "--embedder", args.embedder,
+        "--seed", str(args.seed),
+    ]
+    if args.indexar:
+        comando.append("--indexar")
+
+    print(f"→ Escenario {escenario}: {args.entradas} entradas...", flush=True)
+    subprocess.run(comando, cwd=RAIZ, env=entorno, check=True)
+
+    resultado = json.loads(salida.read_text(encoding="utf-8"))
+    despues = contadores_servidor(puerto)
+    resultado["server"] = {k: v - antes.get(k, 0) for k, v in despues.items()}
+    return resultado
+
+
+def _resumen(escenario: str, resultado: Dict[str, Any]) -> List[str]:
+    reportes = (
+        {"": resultado.get("report")} if escenario == "batch"
+        else {f" ({fase})": r for fase, r in (resultado.get("phases") or {}).items()}
+    )
+    lineas = []
+    for sufijo, reporte in reportes.items():
+        if not reporte:
+            continue
+        lineas.append(
+            f"{escenario}{sufijo}: {reporte['entries']['per_min']} entradas/min, "
+            f"{reporte['entries']['failed']} fallidas, espera LLM {reporte['time']['llm_wait_s']:.1f}s, "
+            f"CPU {reporte['time']['cpu_s']:.1f}s"
+        )
+        for etapa, datos in reporte["stages"].items():
+            lineas.append(f"    {etapa:<28} p50={datos['p50_s']:.3f}s p95={datos['p95_s']:.3f}s n={datos['count']}")
+    lineas.append(f"{escenario}: pared {resultado['wall_s']:.1f}s, pico RSS {resultado['peak_rss_mb']} MB, servidor {resultado.get('server')}")
+    return lineas
+
+
+def main(args: argparse.Namespace) -> None:
+    escenarios = ESCENARIOS if args.escenario == "todos" else (args.escenario,)
+    directorio = Path(tempfile.mkdtemp(prefix="nexus-bench-"))
+    servidor, puerto = iniciar_servidor_replay(args)
+
+    try:
+        resultados = {e: _correr_escenario(e, args, puerto, directorio) for e in escenarios}
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=10)
+        if not args.conservar:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    informe = {
+        "commit": commit,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "params": {
+            k: (str(v) if isinstance(v, Path) else v)
+            for k, v in vars(args).items()
+            if k not in ("comparar", "hijo", "resultado")
+        },
+        "scenarios": resultados,
+    }
+
+    DIRECTORIO_RESULTADOS.mkdir(parents=True, exist_ok=True)
+    ruta = DIRECTORIO_RESULTADOS / f"{datetime.now():%Y%m%d_%H%M%S}_{commit}.json"
+    ruta.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print("=" * 60)
+    print(f"BENCHMARK DE INGESTA ({commit}{' + cambios' if informe['dirty'] else ''})")
+    print("=" * 60)
+    for escenario, resultado in resultados.items():
+        for linea in _resumen(escenario, resultado):
+            print(linea)
+    print(f"\nResultado guardado en {ruta}")
+
+
+# ============================================================
+# COMPARACIÓN
+# ============================================================
+
+def _reportes_por_nombre(informe: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    reportes = {}
+    for escenario, resultado in informe["scenarios"].items():
+        if resultado.get("report"):
+            reportes[escenario] = resultado["report"]
+        for fase, reporte in (resultado.get("phases") or {}).items():
+            reportes[f"{escenario}/{fase}"] = reporte
+    return reportes
+
+
+def _delta(anterior: float, nuevo: float) -> str:
+    if not anterior:
+        return "   n/a"
+    return f"{(nuevo - anterior) / anterior * 100:+6.1f}%"
+
+
+def comparar(ruta_anterior: Path, ruta_nueva: Path) -> None:
+    anterior = json.loads(Path(ruta_anterior).read_text(encoding="utf-8"))
+    nuevo = json.loads(Path(ruta_nueva).read_text(encoding="utf-8"))
+    print(f"{anterior['commit']} → {nuevo['commit']}")
+
+    for escenario in sorted(set(anterior["scenarios"]) & set(nuevo["scenarios"])):
+        a, b = anterior["scenarios"][escenario], nuevo["scenarios"][escenario]
+        print(f"\n{escenario}: pico RSS {a['peak_rss_mb']} → {b['peak_rss_mb']} MB ({_delta(a['peak_rss_mb'], b['peak_rss_mb'])})")
+
+    reportes_a, reportes_b = _reportes_por_nombre(anterior), _reportes_por_nombre(nuevo)
+    for nombre in sorted(set(reportes_a) & set(reportes_b)):
+        a, b = reportes_a[nombre], reportes_b[nombre]
+        print(f"\n{nombre}: {a['entries']['per_min']} → {b['entries']['per_min']} entradas/min "
+              f"({_delta(a['entries']['per_min'], b['entries']['per_min'])})")
+        for etapa in sorted(set(a["stages"]) & set(b["stages"])):
+            ea, eb = a["stages"][etapa], b["stages"][etapa]
+            print(f"    {etapa:<28} p50 {_delta(ea['p50_s'], eb['p50_s'])}  p95 {_delta(ea['p95_s'], eb['p95_s'])}")
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+def parser_argumentos() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline ingestion pipeline benchmark (record/replay)")
+    parser.add_argument("--escenario", choices=[*ESCENARIOS, "todos"], default="todos")
+    parser.add_argument("--entradas", type=int, default=200, help="Tamaño del corpus sintético")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=4, help="ANALYZER_WORKERS del escenario batch")
+    parser.add_argument("--job-workers", type=int, default=2, help="JOB_WORKERS del escenario entradas")
+    parser.add_argument("--cassette", type=Path, default=CASSETTE_POR_DEFECTO)
+    parser.add_argument("--record", action="store_true", help="Grabar respuestas del proveedor real")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--ms-per-token", type=float, default=4.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rpm", type=int, default=100_000, help="LLM_REQUESTS_PER_MINUTE (alto = sin limitador)")
+    parser.add_argument("--tpm", type=int, default=100_000_000, help="LLM_TOKENS_PER_MINUTE")
+    parser.add_argument("--embedder", choices=["hash", "real"], default="hash")
+    parser.add_argument("--indexar", action="store_true", help="Incluir la etapa de embeddings en batch")
+    parser.add_argument("--conservar", action="store_true", help="No borrar el directorio de datos temporal")
+    parser.add_argument("--comparar", nargs=2, type=Path, metavar=("ANTERIOR", "NUEVO"))
+    # Uso interno: corre un escenario en un proceso aparte
+    parser.add_argument("--hijo", choices=ESCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--resultado", type=Path, help=argparse.SUPPRESS)
+    return parser
+
+
+if __name__ == "__main__":
+    argumentos = parser_argumentos().parse_args()
+    if argumentos.comparar:
+        comparar(*argumentos.comparar)
+    elif argumentos.hijo:
+        main_hijo(argumentos)
+    else:
+        main(argumentos)
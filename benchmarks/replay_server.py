@@ -0,0 +1,304 @@
+"""
+Servidor local que reemplaza al proveedor del LLM en los benchmarks.
+
+Habla el endpoint /chat/completions compatible con OpenAI (el que usan el
+analizador y el chat vía GROQ_API_URL) y responde desde un "cassette":
+
+- record: reenvía cada solicitud al proveedor real (--upstream) y guarda la
+  respuesta en el cassette (una línea JSON por prompt).
+- replay: responde desde el cassette sin red. Los prompts que no están se
+  contestan con una respuesta sintética válida (--on-miss fake) o con 404.
+
+En replay se simula al proveedor: latencia base + por token de respuesta
+con jitter, y 429 con Retry-After con la probabilidad indicada. Todo es
+determinista para una misma semilla y el mismo orden de solicitudes.
+
+GET /stats devuelve los contadores (solicitudes, aciertos, sintéticas, 429).
+
+Uso:
+    python -m benchmarks.replay_server --cassette benchmarks/cassettes/corpus.jsonl \\
+        [--mode replay|record] [--port 8765] [--latency-ms 800] [--ms-per-token 4] \\
+        [--jitter 0.2] [--rate-429 0.05] [--retry-after 1] [--seed 0]
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+
+UPSTREAM_POR_DEFECTO = "https://api.groq.com/openai/v1/chat/completions"
+
+EMOCIONES = ["alegría", "tristeza", "miedo", "enojo", "ansiedad", "frustración", "calma", "confusión"]
+TEMAS = ["trabajo", "familia", "salud", "estudio", "amistad", "descanso", "dinero", "proyectos"]
+
+# Segmentos por chunk en las respuestas sintéticas
+SEGMENTOS_POR_CHUNK = 4
+
+_PATRON_SEGMENTOS = re.compile(r"\((\d+) segmentos, del 0 al (\d+)\)")
+
+
+def clave_prompt(cuerpo: Dict[str, Any]) -> str:
+    """Clave del cassette: modelo, temperatura y mensajes (sin stream)."""
+    datos = {
+        "model": cuerpo.get("model"),
+        "temperature": cuerpo.get("temperature"),
+        "messages": cuerpo.get("messages"),
+    }
+    return hashlib.sha256(json.dumps(datos, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def estimar_tokens(texto: str) -> int:
+    return max(1, len(texto) // 4)
+
+
+# ============================================================
+# RESPUESTAS SINTÉTICAS
+# ============================================================
+
+def _texto_entre_marcas(prompt: str) -> str:
+    inicio = prompt.rfind("<<<")
+    fin = prompt.rfind(">>>")
+    return prompt[inicio + 3:fin] if 0 <= inicio < fin else prompt
+
+
+def _analisis_sintetico(texto: str, azar: random.Random) -> Dict[str, Any]:
+    limpio = " ".join(texto.split())
+    return {
+        "summary": limpio[:240] or None,
+        "emotions": azar.sample(EMOCIONES, azar.randint(1, 3)),
+        "topics": azar.sample(TEMAS, azar.randint(1, 3)),
+        "people": None,
+        "intensity": azar.choice(["baja", "media", "alta"]),
+    }
+
+
+def _chunks_sinteticos(prompt: str, azar: random.Random) -> list:
+    coincidencia = _PATRON_SEGMENTOS.search(prompt)
+    total = int(coincidencia.group(1)) if coincidencia else 1
+    chunks = []
+    for i, desde in enumerate(range(0, total, SEGMENTOS_POR_CHUNK)):
+        chunks.append({
+            "index": i,
+            "type": azar.choice(["hechos", "emociones", "reflexion", "mixto"]),
+            "start_segment": desde,
+            "end_segment": min(desde + SEGMENTOS_POR_CHUNK, total) - 1,
+            "metadata": {"people": []},
+        })
+    return chunks
+
+
+def contenido_sintetico(cuerpo: Dict[str, Any]) -> str:
+    """
+    Respuesta válida para los prompts del analizador (análisis, chunking o
+    combinado) y texto libre para el resto (chat). Depende solo del prompt.
+    """
+    prompt = (cuerpo.get("messages") or [{}])[-1].get("content") or ""
+    azar = random.Random(clave_prompt(cuerpo))
+
+    if "PARTE 1" in prompt and "PARTE 2" in prompt:
+        datos = {
+            "analysis": _analisis_sintetico(_texto_entre_marcas(prompt), azar),
+            "chunks": _chunks_sinteticos(prompt, azar),
+        }
+    elif _PATRON_SEGMENTOS.search(prompt):
+        datos = {"chunks": _chunks_sinteticos(prompt, azar)}
+    elif "TEXTO DEL DIARIO" in prompt:
+        datos = _analisis_sintetico(_texto_entre_marcas(prompt), azar)
+    else:
+        return "Respuesta sintética del servidor de benchmarks. " * azar.randint(5, 30)
+    return json.dumps(datos, ensure_ascii=False)
+
+
+def respuesta_completa(cuerpo: Dict[str, Any], contenido: str) -> Dict[str, Any]:
+    prompt_tokens = estimar_tokens(json.dumps(cuerpo.get("messages"), ensure_ascii=False))
+    completion_tokens = estimar_tokens(contenido)
+    return {
+        "id": "bench-" + clave_prompt(cuerpo)[:12],
+        "object": "chat.completion",
+        "model": cuerpo.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": contenido}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+# ============================================================
+# SERVIDOR
+# ============================================================
+
+class Cassette:
+    """Respuestas grabadas por clave de prompt (archivo JSONL, append-only)."""
+
+    def __init__(self, ruta: Path):
+        self.ruta = Path(ruta)
+        self.respuestas: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if self.ruta.exists():
+            for linea in self.ruta.read_text(encoding="utf-8").splitlines():
+                if linea.strip():
+                    registro = json.loads(linea)
+                    self.respuestas[registro["key"]] = registro["response"]
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        return self.respuestas.get(clave)
+
+    def guardar(self, clave: str, respuesta: Dict[str, Any]) -> None:
+        with self._lock:
+            self.respuestas[clave] = respuesta
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": clave, "response": respuesta}, ensure_ascii=False) + "\n")
+
+
+class ServidorReplay(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, args: argparse.Namespace):
+        super().__init__(direccion, _Manejador)
+        self.args = args
+        self.cassette = Cassette(args.cassette)
+        self.azar = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.contadores = {"requests": 0, "hits": 0, "recorded": 0, "synthetic": 0, "misses": 0, "injected_429": 0}
+
+    def contar(self, nombre: str) -> None:
+        with self.lock:
+            self.contadores[nombre] += 1
+
+    def sortear(self) -> float:
+        with self.lock:
+            return self.azar.random()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    server: ServidorReplay
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _json(self, estado: int, datos: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server.lock:
+                self._json(200, dict(self.server.contadores))
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        args = self.server.args
+        cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        self.server.contar("requests")
+        clave = clave_prompt(cuerpo)
+
+        if args.mode == "record":
+            respuesta = self.server.cassette.obtener(clave)
+            if respuesta is None:
+                upstream = requests.post(
+                    args.upstream,
+                    json={k: v for k, v in cuerpo.items() if k != "stream"},
+                    headers={"Authorization": self.headers.get("Authorization", ""), "Content-Type": "application/json"},
+                    timeout=120
+                )
+                if upstream.status_code != 200:
+                    # Los 429 y errores reales se pasan tal cual: el cliente reintenta
+                    self._json(upstream.status_code, upstream.json(), {
+                        k: v for k, v in upstream.headers.items()
+                        if k.lower() == "retry-after" or k.lower().startswith("x-ratelimit")
+                    })
+                    return
+                respuesta = upstream.json()
+                self.server.cassette.guardar(clave, respuesta)
+                self.server.contar("recorded")
+            else:
+                self.server.contar("hits")
+            self._responder(cuerpo, respuesta)
+            return
+
+        if args.rate_429 and self.server.sortear() < args.rate_429:
+            self.server.contar("injected_429")
+            self._json(429, {"error": {"message": "Rate limit (injected)"}}, {"retry-after": str(args.retry_after)})
+            return
+
+        respuesta = self.server.cassette.obtener(clave)
+        if respuesta is not None:
+            self.server.contar("hits")
+        elif args.on_miss == "fake":
+            self.server.contar("synthetic")
+            respuesta = respuesta_completa(cuerpo, contenido_sintetico(cuerpo))
+        else:
+            self.server.contar("misses")
+            self._json(404, {"error": {"message": "Prompt not in cassette"}})
+            return
+
+        completion_tokens = (respuesta.get("usage") or {}).get("completion_tokens") or 0
+        demora = (args.latency_ms + args.ms_per_token * completion_tokens) / 1000
+        demora *= 1 + args.jitter * (2 * self.server.sortear() - 1)
+        time.sleep(max(0.0, demora))
+        self._responder(cuerpo, respuesta)
+
+    def _responder(self, cuerpo: Dict[str, Any], respuesta: Dict[str, Any]) -> None:
+        if not cuerpo.get("stream"):
+            self._json(200, respuesta)
+            return
+
+        # Streaming (chat con cancelación): SSE con el contenido en trozos
+        contenido = respuesta["choices"][0]["message"]["content"]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for i in range(0, len(contenido), 40):
+            fragmento = {"choices": [{"index": 0, "delta": {"content": contenido[i:i + 40]}}]}
+            self.wfile.write(f"data: {json.dumps(fragmento, ensure_ascii=False)}\n\n".encode("utf-8"))
+        final = {"choices": [], "x_groq": {"usage": respuesta.get("usage") or {}}}
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+
+
+def crear_servidor(args: argparse.Namespace) -> ServidorReplay:
+    return ServidorReplay(("127.0.0.1", args.port), args)
+
+
+def parser_argumentos() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local LLM provider stand-in (record/replay)")
+    parser.add_argument("--cassette", type=Path, required=True, help="Archivo JSONL de respuestas grabadas")
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay")
+    parser.add_argument("--upstream", default=UPSTREAM_POR_DEFECTO, help="Proveedor real (modo record)")
+    parser.add_argument("--on-miss", choices=["fake", "error"], default="fake", help="Prompts que no están en el cassette")
+    parser.add_argument("--port", type=int, default=8765, help="0 = puerto libre")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Latencia base por solicitud")
+    parser.add_argument("--ms-per-token", type=float, default=4.0, help="Latencia extra por token de respuesta")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Variación relativa de la latencia (±)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probabilidad de responder 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After de los 429 inyectados (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+if __name__ == "__main__":
+    args = parser_argumentos().parse_args()
+    servidor = crear_servidor(args)
+    # El puerto real (con --port 0) se anuncia en la primera línea
+    print(f"LISTENING {servidor.server_address[1]}", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1 @@
+"""Suite de pytest-benchmark con baseline y umbral de regresión (ver conftest)."""
@@ -0,0 +1,51 @@
+"""
+Partes del analizador que no dependen del LLM: extraer el JSON de
+respuestas grandes (generadas como las del servidor de replay) y el
+chunking heurístico sobre textos de distintos largos.
+"""
+
+import json
+import random
+
+import pytest
+
+from benchmarks.corpus import generar_texto
+from benchmarks.replay_server import contenido_sintetico
+from backend.app.modules.journal.core.diary_analyzer import (
+    dividir_en_chunks_semanticos,
+    extraer_json_de_respuesta,
+)
+
+# Segmentos del prompt de chunking (≈ 1 chunk cada 4 segmentos en la respuesta)
+SEGMENTOS = [200, 2000, 20000]
+PALABRAS = [300, 3000, 20000]
+
+
+def _respuesta_llm(segmentos: int, con_bloque: bool) -> str:
+    """Respuesta de chunking del LLM falso, con razonamiento previo como qwen3."""
+    prompt = f"Dividí el texto ({segmentos} segmentos, del 0 al {segmentos - 1}) en chunks."
+    contenido = contenido_sintetico({"messages": [{"role": "user", "content": prompt}]})
+    razonamiento = "<think>\n" + "Reviso los segmentos y agrupo por tema. " * (segmentos // 4) + "\n</think>\n"
+    if con_bloque:
+        return f"{razonamiento}Aquí está el resultado:\n```json\n{contenido}\n```\nEspero que sirva."
+    return f"{razonamiento}{contenido}"
+
+
+@pytest.mark.parametrize("con_bloque", [True, False], ids=["bloque", "suelto"])
+@pytest.mark.parametrize("segmentos", SEGMENTOS)
+def test_extraer_json_de_respuesta(medir, segmentos, con_bloque):
+    respuesta = _respuesta_llm(segmentos, con_bloque)
+    extraido = medir(extraer_json_de_respuesta, respuesta)
+    assert len(json.loads(extraido)["chunks"]) == -(-segmentos // 4)
+
+
+@pytest.mark.parametrize("palabras", PALABRAS)
+def test_dividir_en_chunks_semanticos(medir, palabras):
+    texto = generar_texto(random.Random(palabras), palabras)
+    assert medir(dividir_en_chunks_semanticos, texto)
+
+
+def test_dividir_parrafo_unico(medir):
+    """Sin saltos de párrafo: todo el corte pasa por la segmentación en oraciones."""
+    texto = generar_texto(random.Random(0), 5000).replace("\n\n", " ")
+    assert medir(dividir_en_chunks_semanticos, texto)
@@ -0,0 +1,59 @@
+"""
+Lecturas de la API sobre el corpus sintético: /api/journal/stats y
+/api/journal/stats/trends (con todo el stack HTTP), list_entries y
+read_entry.
+"""
+
+import itertools
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.modules.journal.services.diary_service import list_entries, read_entry
+
+
+@pytest.fixture(scope="module")
+def cliente(directorio_datos):
+    # La app carga el índice al importarse: después de generar el corpus
+    from backend.app.main import app
+
+    # Sin `with`: no corren los eventos de startup (workers de la cola, watcher)
+    return TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def fechas(directorio_datos):
+    fechas = list_entries()
+    random.Random(0).shuffle(fechas)
+    return fechas
+
+
+def test_stats(medir, cliente):
+    respuesta = medir(cliente.get, "/api/journal/stats")
+    assert respuesta.status_code == 200
+    assert respuesta.json()["total_entries"] > 0
+
+
+@pytest.mark.parametrize("granularidad", ["day", "week", "month"])
+def test_trends(medir, cliente, granularidad):
+    # Todo el corpus con media móvil, en un rango fijo (sin `end` sería hasta hoy)
+    parametros = {"start": "2000-01-01", "end": "2030-12-31", "granularity": granularidad, "window": 4}
+    respuesta = medir(cliente.get, "/api/journal/stats/trends", params=parametros)
+    assert respuesta.status_code == 200
+    assert respuesta.json()["series"]
+
+
+def test_list_entries(medir, directorio_datos):
+    assert medir(list_entries)
+
+
+def test_read_entry(medir, fechas):
+    ciclo = itertools.cycle(fechas)
+    assert medir(lambda: read_entry(next(ciclo)))["text"]
+
+
+def test_get_diary_http(medir, cliente, fechas):
+    ciclo = itertools.cycle(fechas)
+    respuesta = medir(lambda: cliente.get(f"/api/journal/diary/{next(ciclo)}"))
+    assert respuesta.status_code == 200
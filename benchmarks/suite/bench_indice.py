@@ -0,0 +1,128 @@
+"""
+Búsqueda semántica (DiarioQueryEngine.buscar) a distintos tamaños de
+índice e indexado (DiarioVectorIndexer) completo y por delta.
+"""
+
+import itertools
+import json
+import os
+import random
+import shutil
+
+import faiss
+import numpy as np
+import pytest
+
+from benchmarks.corpus import generar_entradas, vectores_sinteticos
+from backend.app.config import CHUNKS_FILE
+from backend.app.modules.journal.core.chunk_store import ChunkStore
+from backend.app.modules.journal.core.embedding_generator import DiarioVectorIndexer
+from backend.app.modules.journal.core.entry_texts import cargar_textos_de_entradas
+from backend.app.modules.journal.core.query_engine import DiarioQueryEngine
+
+CONSULTAS = [
+    "¿Cuándo me sentí ansioso por el trabajo?",
+    "momentos con mi familia",
+    "días tranquilos leyendo",
+    "discusiones y enojo",
+    "qué aprendí sobre descansar",
+]
+
+# Tamaños del índice (en chunks) para las búsquedas
+TAMANOS_BUSQUEDA = [int(n) for n in os.getenv("BENCH_TAMANOS", "1000,10000,100000").split(",")]
+
+# Entradas editadas por ronda en el benchmark de indexado por delta
+ENTRADAS_EDITADAS = 20
+
+
+# ============================================================
+# BÚSQUEDA
+# ============================================================
+
+@pytest.fixture(scope="session")
+def motores(tmp_path_factory, encoder):
+    """Un DiarioQueryEngine por tamaño, sobre índices con vectores precalculados."""
+    motores = {}
+    for tamano in TAMANOS_BUSQUEDA:
+        directorio = tmp_path_factory.mktemp(f"indice_{tamano}")
+        chunks, claves = [], []
+        for entrada in generar_entradas(tamano, seed=tamano):
+            for chunk in entrada.chunks:
+                chunks.append({**chunk, "vector_id": len(chunks)})
+                claves.append((entrada.tema, entrada.emocion))
+            if len(chunks) >= tamano:
+                break
+        chunks, claves = chunks[:tamano], claves[:tamano]
+
+        indice = faiss.IndexIDMap2(faiss.IndexFlatIP(encoder.dimension))
+        indice.add_with_ids(vectores_sinteticos(claves, encoder.dimension), np.arange(len(chunks), dtype="int64"))
+        faiss.write_index(indice, str(directorio / "index.faiss"))
+        # Con texto: el motor no necesita la DB para materializarlos
+        with open(directorio / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(chunks, f, ensure_ascii=False)
+
+        motores[tamano] = DiarioQueryEngine(
+            model=encoder,
+            ruta_index=directorio / "index.faiss",
+            ruta_metadata=directorio / "metadata.json"
+        )
+    return motores
+
+
+@pytest.mark.parametrize("tamano", TAMANOS_BUSQUEDA)
+def test_buscar(medir, motores, tamano):
+    motor = motores[tamano]
+    consultas = itertools.cycle(CONSULTAS)
+    resultados = medir(lambda: motor.buscar(next(consultas), k=5))
+    assert len(resultados) == 5
+
+
+# ============================================================
+# INDEXADO
+# ============================================================
+
+@pytest.fixture
+def store(directorio_datos, tmp_path):
+    """Copia del almacén del corpus (el indexado lo modifica)."""
+    ruta = tmp_path / "chunks.db"
+    shutil.copy(CHUNKS_FILE.with_suffix(".db"), ruta)
+    return ChunkStore(ruta, cargar_textos=cargar_textos_de_entradas)
+
+
+def test_indexar_completo(medir, benchmark, store, encoder, tmp_path):
+    indexer = DiarioVectorIndexer(model=encoder)
+    chunks = store.contar()
+    medir(indexer.indexar_desde_store, store, tmp_path / "index.faiss", tmp_path / "metadata.json", rondas=3)
+    benchmark.extra_info["chunks"] = chunks
+    benchmark.extra_info["chunks_por_s"] = round(chunks / benchmark.stats.stats.median) if benchmark.stats else None
+    assert indexer.index.ntotal == chunks
+
+
+def test_indexar_delta(medir, store, encoder, tmp_path):
+    """Camino de un guardado desde la API: pocas entradas editadas sobre un índice grande."""
+    ruta_index, ruta_metadata = tmp_path / "index.faiss", tmp_path / "metadata.json"
+    DiarioVectorIndexer(model=encoder).indexar_desde_store(store, ruta_index, ruta_metadata)
+
+    entry_ids = sorted({c["entry_id"] for c in store.todos()})
+    azar = random.Random(0)
+    rondas = itertools.count()
+
+    def editar():
+        ronda = next(rondas)
+        editadas = {}
+        for entry_id in azar.sample(entry_ids, ENTRADAS_EDITADAS):
+            chunks = store.de_entrada(entry_id)
+            for chunk in chunks:
+                chunk.pop("start_offset", None)
+                chunk.pop("end_offset", None)
+                chunk["text"] += f" (editado {ronda})"
+            editadas[entry_id] = chunks
+        store.reemplazar_entradas(editadas)
+        return (DiarioVectorIndexer(model=encoder), ), {}
+
+    medir(
+        lambda indexer: indexer.indexar_delta(store, ruta_index, ruta_metadata),
+        setup=editar,
+        rondas=5
+    )
+    assert store.delta() == ([], [])
@@ -0,0 +1,277 @@
+"""
+Fixtures de la suite de benchmarks (pytest-benchmark).
+
+Todo corre en CPU y sin red:
+- NEXUS_DATA_DIR apunta a un directorio temporal con un corpus sintético
+  (benchmarks/corpus.py), fijado antes de importar cualquier módulo de
+  backend.
+- El LLM no se llama: GROQ_API_URL apunta a un puerto local cerrado y
+  las respuestas grandes salen del generador del servidor de replay.
+- Los embeddings usan EncoderHash en lugar del modelo (fixture sin_modelo).
+
+Regresiones: cada benchmark compara su mínimo con el de la baseline
+(benchmarks/suite/baseline.json), escalado según la velocidad de la
+máquina (un trabajo fijo de CPU medido junto a cada benchmark en las dos
+corridas), y falla si lo supera en más de --regresion-max por ciento
+también al volver a medirlo en pares benchmark/calibración (ver medir).
+"""
+
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+# Antes de cualquier import de backend (config lee el entorno al importarse)
+DIRECTORIO_DATOS = Path(tempfile.mkdtemp(prefix="nexus-bench-"))
+os.environ["NEXUS_DATA_DIR"] = str(DIRECTORIO_DATOS)
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ["GROQ_API_URL"] = "http://127.0.0.1:9/v1/chat/completions"
+os.environ["LLM_CACHE_DISABLED"] = "1"
+os.environ["LLM_LEDGER_DISABLED"] = "1"
+os.environ["HF_HUB_OFFLINE"] = "1"
+os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+import pytest
+
+RUTA_BASELINE = Path(__file__).with_name("baseline.json")
+
+# Entradas del corpus compartido (API e indexado)
+ENTRADAS = int(os.getenv("BENCH_ENTRADAS", "3000"))
+REGRESION_MAX_PCT = float(os.getenv("BENCH_REGRESSION_PCT", "40"))
+# Diferencias menores a esto son ruido del reloj en los benchmarks de microsegundos
+TOLERANCIA_ABSOLUTA_S = 0.0001
+
+_medidas: Dict[str, Dict[str, float]] = {}
+
+
+# ============================================================
+# OPCIONES
+# ============================================================
+
+def pytest_addoption(parser):
+    grupo = parser.getgroup("nexus", "Baseline de benchmarks")
+    grupo.addoption("--baseline", default=str(RUTA_BASELINE), help="Archivo JSON de la baseline")
+    grupo.addoption(
+        "--actualizar-baseline", action="store_true",
+        help="Guardar los mínimos de esta corrida como nueva baseline"
+    )
+    grupo.addoption(
+        "--regresion-max", type=float, default=REGRESION_MAX_PCT,
+        help="Porcentaje sobre la baseline a partir del cual un benchmark falla"
+    )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if config.getoption("--actualizar-baseline") and _medidas:
+        ruta = Path(config.getoption("--baseline"))
+        anterior = _cargar_baseline(ruta).get("benchmarks", {})
+        ruta.write_text(json.dumps({
+            "commit": _commit_actual(),
+            "cpu": f"{platform.machine()} x{os.cpu_count()}",
+            "python": platform.python_version(),
+            "benchmarks": {**anterior, **_medidas},
+        }, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    shutil.rmtree(DIRECTORIO_DATOS, ignore_errors=True)
+
+
+# ============================================================
+# BASELINE
+# ============================================================
+
+def _cargar_baseline(ruta: Path) -> Dict[str, Any]:
+    if not ruta.exists():
+        return {}
+    return json.loads(ruta.read_text(encoding="utf-8"))
+
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+# Vueltas del trabajo de calibración (≈ 15 ms en una máquina de escritorio)
+_VUELTAS_CALIBRACION = 200_000
+
+# Medición en pares (baseline y confirmación de una regresión): cuánto
+# dura en total y tandas del benchmark de al menos _TANDA_PAR_S. En una
+# máquina compartida el mínimo de una ventana de ~5 s es estable; el de
+# unos pocos cientos de ms no.
+_TIEMPO_PARES_S = float(os.getenv("BENCH_TIEMPO_PARES_S", "5"))
+_TANDA_PAR_S = 0.015
+_TOPE_CALIBRACION_PAR_S = 0.2
+
+
+def _calibracion(repeticiones: int = 5) -> float:
+    """
+    Mejor de `repeticiones` de un trabajo fijo de CPU: la velocidad de la
+    máquina en este momento.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        total = 0
+        for i in range(_VUELTAS_CALIBRACION):
+            total += i * i % 7
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def _medir_en_pares(
+    funcion: Callable[..., Any],
+    args: tuple,
+    kwargs: dict,
+    setup: Callable = None
+) -> Tuple[float, float]:
+    """
+    Alterna una calibración y una tanda corta del benchmark durante
+    _TIEMPO_PARES_S (al menos 3 pares), sin GC. Los dos mínimos salen de
+    la misma ventana, así que su cociente no depende de cómo cambie la
+    velocidad de la máquina durante la corrida.
+
+    Returns:
+        (mínimo del benchmark, mínimo de la calibración)
+    """
+    minimo = calibracion = float("inf")
+    pares = 0
+    inicio_pares = time.perf_counter()
+    gc.disable()
+    try:
+        while pares < 3 or time.perf_counter() - inicio_pares < _TIEMPO_PARES_S:
+            pares += 1
+            inicio_tanda = time.perf_counter()
+            while True:
+                if setup is not None:
+                    args, kwargs = setup()
+                inicio = time.perf_counter()
+                funcion(*args, **kwargs)
+                fin = time.perf_counter()
+                minimo = min(minimo, fin - inicio)
+                if fin - inicio_tanda >= _TANDA_PAR_S:
+                    break
+            # Tantas vueltas de calibración como tiempo llevó la tanda (con
+            # tope): con benchmarks de segundos, tres vueltas sueltas no alcanzan
+            inicio_calibracion = time.perf_counter()
+            while True:
+                calibracion = min(calibracion, _calibracion(1))
+                if time.perf_counter() - inicio_calibracion >= min(fin - inicio_tanda, _TOPE_CALIBRACION_PAR_S):
+                    break
+    finally:
+        gc.enable()
+    return minimo, calibracion
+
+
+@pytest.fixture
+def medir(benchmark, request) -> Callable[..., Any]:
+    """
+    Corre `funcion` con pytest-benchmark y compara el mínimo con la
+    baseline. Con `rondas` usa el modo pedantic (para funciones lentas o
+    que necesitan `setup` por ronda).
+
+    Para que la comparación no falle por ruido de la máquina:
+    - se compara el mínimo, no la mediana (el ruido solo suma tiempo);
+    - la referencia se escala con una calibración medida junto al
+      benchmark, contra la calibración guardada con esa entrada;
+    - la baseline se mide en pares (_medir_en_pares), y un benchmark que
+      supera el límite se vuelve a medir igual antes de fallar.
+    """
+    clave = f"{Path(request.node.fspath).stem}::{request.node.name}"
+    config = request.config
+    regresion_max = config.getoption("--regresion-max")
+
+    def _medir(funcion: Callable[..., Any], *args, rondas: int = None, setup: Callable = None, **kwargs) -> Any:
+        calibracion = _calibracion()
+        if rondas is not None or setup is not None:
+            # Con setup, los argumentos de cada ronda los devuelve el setup
+            resultado = benchmark.pedantic(
+                funcion, setup=setup, rounds=rondas or 5, iterations=1,
+                **({} if setup else {"args": args, "kwargs": kwargs, "warmup_rounds": 1})
+            )
+        else:
+            resultado = benchmark(funcion, *args, **kwargs)
+
+        if benchmark.stats is None:  # --benchmark-disable
+            return resultado
+
+        if config.getoption("--actualizar-baseline"):
+            minimo, calibracion = _medir_en_pares(funcion, args, kwargs, setup)
+            _medidas[clave] = {"min_s": minimo, "calibracion_s": calibracion}
+            return resultado
+
+        referencia = _cargar_baseline(Path(config.getoption("--baseline"))).get("benchmarks", {}).get(clave)
+        if not isinstance(referencia, dict):
+            return resultado
+
+        def _limite(calibracion_actual: float) -> Tuple[float, float]:
+            esperado = referencia["min_s"] * calibracion_actual / referencia["calibracion_s"]
+            return esperado, max(
+                esperado * (1 + regresion_max / 100),
+                esperado + TOLERANCIA_ABSOLUTA_S
+            )
+
+        minimo = benchmark.stats.stats.min
+        esperado, limite = _limite(min(calibracion, _calibracion()))
+        if minimo > limite:
+            # Puede ser ruido: se confirma midiendo igual que la baseline
+            minimo, calibracion = _medir_en_pares(funcion, args, kwargs, setup)
+            esperado, limite = _limite(calibracion)
+            benchmark.extra_info["confirmado"] = True
+
+        benchmark.extra_info["baseline_s"] = round(esperado, 6)
+        benchmark.extra_info["cambio_pct"] = round((minimo / esperado - 1) * 100, 1)
+        if minimo > limite:
+            pytest.fail(
+                f"Regresión en {clave}: mínimo {minimo * 1000:.3f} ms, "
+                f"baseline {esperado * 1000:.3f} ms (+{(minimo / esperado - 1) * 100:.0f}%, "
+                f"máximo +{regresion_max:.0f}%)",
+                pytrace=False
+            )
+        return resultado
+
+    return _medir
+
+
+# ============================================================
+# DATOS SINTÉTICOS
+# ============================================================
+
+@pytest.fixture(scope="session", autouse=True)
+def sin_modelo():
+    """Ningún módulo carga el modelo de embeddings: se usa EncoderHash."""
+    from benchmarks.fakes import EncoderHash
+    from backend.app.modules.journal.core import embedding_generator, query_engine
+
+    originales = (embedding_generator.SentenceTransformer, query_engine.SentenceTransformer)
+    embedding_generator.SentenceTransformer = EncoderHash
+    query_engine.SentenceTransformer = EncoderHash
+    yield
+    embedding_generator.SentenceTransformer, query_engine.SentenceTransformer = originales
+
+
+@pytest.fixture(scope="session")
+def directorio_datos() -> Path:
+    """
+    Corpus de ENTRADAS entradas: DB, log de análisis, almacén de chunks e
+    índice FAISS (el chat lo carga al importar la app).
+    """
+    from benchmarks.corpus import poblar_directorio_datos
+
+    poblar_directorio_datos(DIRECTORIO_DATOS, entradas=ENTRADAS, seed=0, md=False)
+    return DIRECTORIO_DATOS
+
+
+@pytest.fixture(scope="session")
+def encoder():
+    from benchmarks.fakes import EncoderHash
+    return EncoderHash()
@@ -0,0 +1,136 @@
+"""
+Benchmark: chunking heurístico vs chunking con LLM.
+
+Compara, sobre las entradas ya analizadas, la velocidad del chunker
+heurístico y cuánto coinciden sus cortes con los del LLM.
+
+Referencia LLM:
+- por defecto, los chunks ya guardados en el almacén (no cuesta llamadas)
+- con --llm, se llama a chunkear_con_llm (usa la caché de respuestas)
+
+Uso:
+    python scripts/benchmark_chunking.py [--limite N] [--tolerancia CHARS] [--llm]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Adjust path to import from backend
+sys.path.append(os.getcwd())
+
+from backend.app.config import RAW_DIARY_JSON, CHUNKS_FILE
+from backend.app.modules.journal.core.analysis_log import obtener_log_analisis
+from backend.app.modules.journal.core.chunk_store import obtener_chunk_store
+from backend.app.modules.journal.core.diary_analyzer import chunkear_heuristico, chunkear_con_llm
+
+
+def inicios_de_chunks(texto: str, chunks: List[Dict]) -> Optional[List[int]]:
+    """
+    Offsets de inicio (en el texto original) de cada chunk salvo el primero,
+    es decir, los cortes. None si algún chunk no se encuentra en el texto.
+    """
+    inicios = []
+    cursor = 0
+    for chunk in chunks:
+        cabeza = chunk["text"].strip()[:60]
+        posicion = texto.find(cabeza, cursor)
+        if posicion < 0:
+            return None
+        inicios.append(posicion)
+        cursor = posicion + len(cabeza)
+    return inicios[1:]
+
+
+def coincidencia_de_cortes(referencia: List[int], candidatos: List[int], tolerancia: int) -> Dict[str, float]:
+    """Precisión / recall / F1 de los cortes, emparejando cada uno como máximo una vez."""
+    libres = list(referencia)
+    aciertos = 0
+    for corte in candidatos:
+        cercano = min(libres, key=lambda r: abs(r - corte), default=None)
+        if cercano is not None and abs(cercano - corte) <= tolerancia:
+            libres.remove(cercano)
+            aciertos += 1
+
+    # Una entrada de un solo chunk en ambos lados coincide perfectamente
+    precision = aciertos / len(candidatos) if candidatos else float(not referencia)
+    recall = aciertos / len(referencia) if referencia else float(not candidatos)
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Heuristic vs LLM chunking benchmark")
+    parser.add_argument("--limite", type=int, default=0, help="Máximo de entradas (0 = todas)")
+    parser.add_argument("--tolerancia", type=int, default=40, help="Distancia máxima (caracteres) entre cortes equivalentes")
+    parser.add_argument("--llm", action="store_true", help="Llamar al LLM en vez de usar los chunks guardados")
+    args = parser.parse_args()
+
+    analisis = [a for a in obtener_log_analisis(RAW_DIARY_JSON).todos() if a.get("raw_text") and a.get("id")]
+    if args.limite:
+        analisis = analisis[:args.limite]
+    store = obtener_chunk_store(CHUNKS_FILE)
+
+    tiempo_heuristico = 0.0
+    tiempo_llm = 0.0
+    metricas = []
+    chunks_heuristicos = 0
+    chunks_llm = 0
+    omitidas = 0
+
+    for a in analisis:
+        texto = a["raw_text"]
+
+        inicio = time.perf_counter()
+        heuristicos = chunkear_heuristico(texto, a)
+        tiempo_heuristico += time.perf_counter() - inicio
+
+        if args.llm:
+            inicio = time.perf_counter()
+            try:
+                referencia = chunkear_con_llm(texto)
+            except Exception as e:
+                print(f"  {a['id']}: LLM falló ({e}), se omite")
+                omitidas += 1
+                continue
+            tiempo_llm += time.perf_counter() - inicio
+        else:
+            referencia = [
+                c for c in store.de_entrada(a["id"])
+                if c.get("metadata", {}).get("source", "llm") == "llm"
+            ]
+            if not referencia:
+                omitidas += 1
+                continue
+
+        cortes_ref = inicios_de_chunks(texto, referencia)
+        cortes_heur = inicios_de_chunks(texto, heuristicos)
+        if cortes_ref is None or cortes_heur is None:
+            # Chunks que no son texto literal del original (el LLM reescribió)
+            omitidas += 1
+            continue
+
+        metricas.append(coincidencia_de_cortes(cortes_ref, cortes_heur, args.tolerancia))
+        chunks_heuristicos += len(heuristicos)
+        chunks_llm += len(referencia)
+
+    n = len(metricas)
+    print("=" * 60)
+    print("BENCHMARK DE CHUNKING")
+    print("=" * 60)
+    print(f"Entradas comparadas: {n} (omitidas: {omitidas})")
+    if analisis:
+        print(f"Heurístico: {tiempo_heuristico * 1000:.1f} ms en total, "
+              f"{len(analisis) / tiempo_heuristico if tiempo_heuristico else 0:.0f} entradas/s")
+    if args.llm and n:
+        print(f"LLM:        {tiempo_llm:.1f} s en total, {n / tiempo_llm if tiempo_llm else 0:.2f} entradas/s")
+    if n:
+        print(f"Chunks promedio por entrada: heurístico {chunks_heuristicos / n:.2f}, LLM {chunks_llm / n:.2f}")
+        for clave in ("precision", "recall", "f1"):
+            print(f"Cortes - {clave}: {sum(m[clave] for m in metricas) / n:.3f} (tolerancia {args.tolerancia} caracteres)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import json
 import logging
 import sys
 import os
@@ -12,6 +11,10 @@ from sqlmodel import Session, select
 from backend.app.core.database import engine, init_db
 from backend.app.modules.journal.models import JournalEntry, EntryAnalysis, EntryChunk
 from backend.app.config import DIARY_ENTRIES_DIR, RAW_DIARY_JSON, CHUNKS_FILE
+from backend.app.modules.journal.core.analysis_log import obtener_log_analisis
+from backend.app.modules.journal.core.chunk_store import obtener_chunk_store, sin_texto
+from backend.app.modules.journal.core.emotion_stats import reconstruir_conteos
+from backend.app.modules.journal.core.entry_tags import reconstruir_tags
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,11 +56,10 @@ def migrate():
         
         session.commit()
         
-        # 2. Load analysis from diario.json
-        if RAW_DIARY_JSON.exists():
+        # 2. Load analysis from the analysis log (imports diario.json on first use)
+        historial = obtener_log_analisis(RAW_DIARY_JSON).todos()
+        if historial:
             logger.info(f"Loading analysis from {RAW_DIARY_JSON}...")
-            with open(RAW_DIARY_JSON, "r", encoding="utf-8") as f:
-                historial = json.load(f)
             
             for item in historial:
                 try:
@@ -97,11 +99,10 @@ def migrate():
         
         session.commit()
         
-        # 3. Load chunks from chunks.json
-        if CHUNKS_FILE.exists():
-            logger.info(f"Loading chunks from {CHUNKS_FILE}...")
-            with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
-                chunks_data = json.load(f)
+        # 3. Load chunks from the chunk store (imports chunks.json on first use)
+        chunks_data = obtener_chunk_store(CHUNKS_FILE).todos()
+        if chunks_data:
+            logger.info(f"Loading {len(chunks_data)} chunks from chunk store...")
             
             for c in chunks_data:
                 try:
@@ -134,7 +135,9 @@ def migrate():
                         entry_id=entry.id,
                         index=c.get("index", 0),
                         chunk_type=c.get("type", "mixto"),
-                        text=c.get("text", ""),
+                        text=sin_texto(c).get("text", ""),
+                        start_offset=c.get("start_offset"),
+                        end_offset=c.get("end_offset"),
                         word_count=c.get("word_count", 0),
                         char_count=c.get("char_count", 0),
                         metadata_json=c.get("metadata", {})
@@ -144,7 +147,11 @@ def migrate():
                     logger.error(f"Error processing chunk: {e}")
         
         session.commit()
-        logger.info("Migration completed.")
+
+    # Analyses were inserted directly, not through db_sync: rebuild the derived tables
+    reconstruir_conteos()
+    reconstruir_tags()
+    logger.info("Migration completed.")
 
 if __name__ == "__main__":
     migrate()
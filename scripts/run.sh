@@ -59,15 +59,12 @@ run_pipeline() {
     
     mkdir -p data/diary/entries data/diary/processed data/raw
     
-    echo "1/3 Analizando archivos..."
+    echo "1/2 Analizando archivos nuevos o editados..."
     python3 -m backend.app.modules.journal.core.diary_analyzer
     
-    echo "2/3 Generando embeddings..."
+    echo "2/2 Actualizando índice vectorial (solo cambios)..."
     python3 -m backend.app.modules.journal.core.embedding_generator
     
-    echo "3/3 Actualizando índice vectorial..."
-    python3 -m backend.app.modules.journal.core.query_engine --build-index
-    
     echo -e "${GREEN}✅ Procesamiento de Journal completado.${NC}"
 }
 
@@ -88,6 +85,11 @@ start_frontend() {
     wait
 }
 
+start_watch() {
+    echo -e "\n${GREEN}👀 Vigilando data/diary/entries (Ctrl-C para salir)...${NC}"
+    python3 -m backend.app.modules.journal.services.diary_watcher
+}
+
 start_cli() {
     echo -e "\n${GREEN}💬 Iniciando Chat en Terminal (Journal)...${NC}"
     python3 -m backend.app.modules.journal.core.rag_chat_engine_api
@@ -103,6 +105,7 @@ echo "2) 💻 CLI Mode (Procesar + Chat por terminal)"
 echo "3) 🔄 Solo Actualizar Datos (Para nuevas entradas manuales)"
 echo "4) 🛰️ Solo Lanzar Frontend (Sin procesar)"
 echo "5) 🗨️ Solo Lanzar CLI (Sin procesar)"
+echo "6) 👀 Modo Vigilancia (Procesa cada .md nuevo o editado al guardarlo)"
 echo "q) Salir"
 read -p "> " choice
 
@@ -124,6 +127,9 @@ case $choice in
     5)
         start_cli
         ;;
+    6)
+        start_watch
+        ;;
     q)
         exit 0
         ;;
@@ -0,0 +1,95 @@
+"""
+Regresión: guardar una entrada mientras se procesa la versión anterior.
+
+El job de v1 termina después de que el usuario guardó v2: sincronizar el
+análisis de v1 no debe devolver la entrada a v1 (el job de v2, que lee
+JournalEntry.raw_text al correr, reprocesaría el texto viejo). Los chunks
+de v1 se siguen leyendo del texto analizado del log.
+
+Corre sobre un directorio de datos temporal:
+    python scripts/test_db_sync.py   (o con pytest)
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# Antes de importar backend: config lee el entorno al importarse
+DIRECTORIO_DATOS = tempfile.mkdtemp(prefix="nexus-test-")
+os.environ["NEXUS_DATA_DIR"] = DIRECTORIO_DATOS
+atexit.register(shutil.rmtree, DIRECTORIO_DATOS, ignore_errors=True)
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["LLM_CACHE_DISABLED"] = "1"
+os.environ["LLM_LEDGER_DISABLED"] = "1"
+
+# Añadir el directorio raíz al path para poder importar backend
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.app.config import RAW_DIARY_JSON
+from backend.app.core.database import init_db
+from backend.app.modules.journal.core.chunk_store import hash_texto, materializar_textos
+from backend.app.modules.journal.core.db_sync import sincronizar_lote
+from backend.app.modules.journal.core.diary_analyzer import guardar_analisis
+from backend.app.modules.journal.core.entry_texts import cargar_textos_de_entradas
+from backend.app.modules.journal.services.diary_service import read_entry, save_entry
+
+FECHA = "2024-03-05"
+ENTRY_ID = "entry_2024_03_05"
+TEXTO_V1 = "Hoy fui al parque con Ana. Después trabajé en el proyecto hasta tarde."
+TEXTO_V2 = "Corregido: hoy fui al parque con Ana y con Luis. Después descansé."
+
+
+def _analisis_v1() -> dict:
+    return {
+        "fecha": FECHA,
+        "raw_text": TEXTO_V1,
+        "summary": "Parque y trabajo",
+        "intensity": "media",
+        "emotions": ["calma"],
+        "topics": ["trabajo"],
+        "people": ["Ana"],
+    }
+
+
+def _chunks_v1() -> list:
+    fin = TEXTO_V1.index(".") + 1
+    return [{
+        "chunk_id": f"{ENTRY_ID}_chunk_0",
+        "entry_id": ENTRY_ID,
+        "index": 0,
+        "type": "evento",
+        "text": TEXTO_V1[:fin],
+        "start_offset": 0,
+        "end_offset": fin,
+        "source_hash": hash_texto(TEXTO_V1),
+        "word_count": len(TEXTO_V1[:fin].split()),
+        "char_count": fin,
+        "metadata": {},
+    }]
+
+
+def test_guardar_durante_procesamiento():
+    init_db()
+    save_entry(TEXTO_V1, FECHA)
+    save_entry(TEXTO_V2, FECHA)
+
+    # Termina el job de v1 (DB y log de análisis, como process_diary_entry)
+    sincronizar_lote([_analisis_v1()], _chunks_v1())
+    guardar_analisis(_analisis_v1(), RAW_DIARY_JSON, sincronizar_db=False)
+
+    entrada = read_entry(FECHA)
+    assert entrada["text"] == TEXTO_V2, "el análisis de v1 revirtió el guardado de v2"
+    assert entrada["char_count"] == len(TEXTO_V2)
+
+    # Los offsets de v1 se resuelven contra el texto analizado, no contra v2
+    chunks = [{k: v for k, v in c.items() if k != "text"} for c in _chunks_v1()]
+    materializar_textos(chunks, cargar_textos_de_entradas)
+    assert chunks[0]["text"] == _chunks_v1()[0]["text"]
+    assert not chunks[0].get("stale")
+
+
+if __name__ == "__main__":
+    test_guardar_durante_procesamiento()
+    print("✅ ÉXITO: el guardado posterior se conserva y los chunks usan el texto analizado.")